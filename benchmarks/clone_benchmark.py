@@ -0,0 +1,69 @@
+'''Compare UE template clone strategies on a synthetic template tree
+
+usage: python benchmarks/clone_benchmark.py [--dirs N] [--files N] [--size KB] [--dir PATH]
+'''
+import argparse
+
+import os
+
+import shutil
+
+import sys
+
+import tempfile
+
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pmt.clone import Cloner, supportedStrategies, REFLINK, HARDLINK, COPY
+
+def makeTemplate(root, dirs, files, sizeKB):
+    '''build a fake UE project: Content and DerivedDataCache trees of binary files'''
+    payload = os.urandom(sizeKB * 1024)
+    for top in ("Content", "DerivedDataCache"):
+        for d in range(dirs):
+            folder = os.path.join(root, top, "Dir{:04d}".format(d))
+            os.makedirs(folder)
+            for f in range(files):
+                with open(os.path.join(folder, "Asset{:04d}.uasset".format(f)), "wb") as asset:
+                    asset.write(payload)
+
+    with open(os.path.join(root, "UE4Project.uproject"), "w") as uproject:
+        uproject.write("{}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=20, help="directories per top level folder")
+    parser.add_argument("--files", type=int, default=20, help="files per directory")
+    parser.add_argument("--size", type=int, default=256, help="file size in KB")
+    parser.add_argument("--dir", default=None, help="scratch directory on the filesystem to test")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="pmt_clone_bench", dir=args.dir)
+    try:
+        template = os.path.join(scratch, "UE4Project")
+        makeTemplate(template, args.dirs, args.files, args.size)
+        supported = supportedStrategies(template, scratch)
+        print("supported strategies: {}".format(", ".join(sorted(supported))))
+
+        for strategy in (COPY, HARDLINK, REFLINK):
+            if strategy not in supported:
+                print("{:<9} skipped (unsupported)".format(strategy))
+                continue
+
+            target = os.path.join(scratch, "clone_" + strategy)
+            cloner = Cloner(strategy)
+            start = time.perf_counter()
+            cloner.clone(template, target)
+            elapsed = time.perf_counter() - start
+
+            methods = ", ".join("{} {} files/{:.1f}MB".format(method, count, cloner.bytes[method] / 2**20)
+                                for method, count in cloner.counts.items() if count)
+            print("{:<9} {:8.3f}s  {}".format(strategy, elapsed, methods))
+            shutil.rmtree(target)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
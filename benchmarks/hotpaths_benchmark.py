@@ -0,0 +1,246 @@
+'''Benchmarks for the scaffolding, asset and rename hot paths on synthetic trees
+
+usage: python benchmarks/hotpaths_benchmark.py [--dirs N] [--ue-dirs N] [--assets N] [--runs N]
+                                               [--output FILE] [--compare BASELINE] [--threshold FRACTION]
+
+everything runs in a temporary directory (PMT_ROOT and the tool folder), so it works on
+any box. results are written as JSON; with --compare the run fails if any benchmark's
+median got slower than the baseline by more than the threshold.
+'''
+import argparse
+
+import json
+
+import os
+
+import platform
+
+import shutil
+
+import statistics
+
+import sys
+
+import tempfile
+
+import time
+
+import xml.etree.ElementTree as ET
+
+from unittest import mock
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import pmt.config
+
+import pmt.launcher
+
+import pmt.models
+
+from pmt.models import Folder, Project, Asset, createAssets
+
+from pmt.trash import Trash
+
+FANOUT = 10 # subfolders per synthetic folder
+
+def synthesizeProjectConfig(path, dirs):
+    '''ProjectConfig.xml with dirs folders, FANOUT children each, breadth first'''
+    root = ET.Element("proj")
+    level = [root]
+    made = 0
+    while made < dirs:
+        nextLevel = []
+        for parent in level:
+            for index in range(FANOUT):
+                if made >= dirs:
+                    break
+                nextLevel.append(ET.SubElement(parent, "dir", name="Dir{}".format(made)))
+                made += 1
+        level = nextLevel
+
+    # the UE4 folder createUEProject copies into
+    ET.SubElement(root, "dir", name="UE4")
+    ET.ElementTree(root).write(path)
+
+def synthesizeUETemplate(path, dirs, filesPerDir=2):
+    '''fake UE4Project with dirs folders under Content'''
+    os.makedirs(path)
+    with open(os.path.join(path, "UE4Project.uproject"), "w") as uproject:
+        uproject.write("{}")
+
+    # engine generated folders, skipped by the utility folder rules
+    for generated in ("Intermediate", "Saved", "DerivedDataCache"):
+        for number in range(FANOUT):
+            os.makedirs(os.path.join(path, generated, "G{}".format(number)))
+
+    level = [os.path.join(path, "Content")]
+    os.mkdir(level[0])
+    made = 0
+    while made < dirs:
+        nextLevel = []
+        for parent in level:
+            for index in range(FANOUT):
+                if made >= dirs:
+                    break
+                folder = os.path.join(parent, "D{}".format(made))
+                os.mkdir(folder)
+                for number in range(filesPerDir):
+                    with open(os.path.join(folder, "A{}.uasset".format(number)), "wb") as asset:
+                        asset.write(b"\0" * 4096)
+                nextLevel.append(folder)
+                made += 1
+        level = nextLevel
+
+def makeToolDir(path, dirs, ueDirs):
+    '''tool folder with the real config/templates and synthetic project layouts'''
+    os.makedirs(path)
+    shutil.copyfile(os.path.join(REPO, "ConfigFileTemplate.xml"), os.path.join(path, "ConfigFileTemplate.xml"))
+    shutil.copytree(os.path.join(REPO, "TemplateAssets"), os.path.join(path, "TemplateAssets"))
+    synthesizeProjectConfig(os.path.join(path, "ProjectConfig.xml"), dirs)
+    synthesizeUETemplate(os.path.join(path, "UE4Project"), ueDirs)
+
+class ScaffoldOnlyProject(Project):
+    '''Project that skips the UE copy so createDirectory is timed alone'''
+    def createUEProject(self, workers=None):
+        self.utilityTargets = []
+
+class PopenStub():
+    '''stands in for subprocess.Popen so opening assets launches nothing'''
+    calls = []
+
+    pid = 0
+
+    def __init__(self, command, *args, **kwargs):
+        PopenStub.calls.append(command)
+
+    def poll(self):
+        # exits straight away, so every open is a fresh launch
+        return 0
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def runOnce(root, args):
+    '''one pass over every hot path, returns name -> seconds'''
+    results = {}
+    projectPath = os.path.join(root, "Bench")
+
+    # scaffold from the synthetic ProjectConfig.xml
+    results["Project.createDirectory"] = timed(lambda: ScaffoldOnlyProject(projectPath))
+
+    # copy the synthetic UE template into the project and inject utility folders
+    project = ScaffoldOnlyProject.__new__(Project)
+    Folder.__init__(project, projectPath)
+    project.cloneStrategy = args.clone_strategy
+    results["Project.createUEProject"] = timed(project.createUEProject)
+
+    # template assets
+    assetFolder = os.path.join(projectPath, "Dir0")
+    names = [os.path.join(assetFolder, "asset{}".format(index)) for index in range(args.assets)]
+    results["Asset.create"] = timed(lambda: [Asset(name, "Maya", "Rig") for name in names])
+
+    # the same number of assets in one bulk call
+    bulkFolder = os.path.join(projectPath, "Dir1")
+    bulkNames = ["bulk{}".format(index) for index in range(args.assets)]
+    results["createAssets (bulk)"] = timed(lambda: createAssets(bulkFolder, bulkNames, "Maya", "Rig"))
+
+    # resolving the application for every asset, without launching anything
+    paths = [name + ".ma" for name in names]
+    with mock.patch.object(pmt.launcher.subprocess, "Popen", PopenStub):
+        results["Asset.open"] = timed(lambda: [Asset(path).open() for path in paths])
+
+    # multi-select rename the way the GUI numbers a selection
+    def renameAll():
+        for index, path in enumerate(paths):
+            Asset(path).rename(os.path.join(assetFolder, "renamed{}.ma".format(index + 1)))
+    results["Asset.rename (multi-select)"] = timed(renameAll)
+
+    # delete a copy of the project both ways
+    shutil.copytree(projectPath, projectPath + "Copy")
+    results["Folder.delete (rmtree)"] = timed(lambda: Folder(projectPath + "Copy").delete())
+    trash = Trash(root)
+    results["Folder.delete (trash)"] = timed(lambda: Folder(projectPath).delete(trash))
+    shutil.rmtree(trash.path)
+
+    return results
+
+def compare(results, meta, baselinePath, threshold):
+    '''names whose median regressed by more than threshold against the baseline file'''
+    with open(baselinePath) as baselineFile:
+        baselineReport = json.load(baselineFile)
+    baseline = baselineReport["results"]
+
+    # sizes have to match for the numbers to mean anything
+    for key in ("dirs", "ueDirs", "assets"):
+        if baselineReport["meta"].get(key) != meta[key]:
+            print("warning: baseline {} is {}, this run {}".format(key, baselineReport["meta"].get(key), meta[key]), file=sys.stderr)
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or not baseline[name]["median"]:
+            continue
+        ratio = result["median"] / baseline[name]["median"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print("{:<30} {:9.4f}s -> {:9.4f}s  {:+6.1f}%  {}".format(name, baseline[name]["median"], result["median"], (ratio - 1) * 100, flag), file=sys.stderr)
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=100, help="folders in the synthetic ProjectConfig.xml (100 to 100000)")
+    parser.add_argument("--ue-dirs", type=int, default=100, help="folders in the synthetic UE template")
+    parser.add_argument("--assets", type=int, default=100, help="assets created, opened and renamed")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--clone-strategy", default="auto")
+    parser.add_argument("--output", help="write the results JSON here as well as to stdout")
+    parser.add_argument("--compare", help="baseline results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="pmt_bench")
+    runs = {}
+    try:
+        toolDir = os.path.join(scratch, "tool")
+        makeToolDir(toolDir, args.dirs, args.ue_dirs)
+        pmt.config.TOOL_DIR = toolDir
+
+        for run in range(args.runs):
+            root = os.path.join(scratch, "root{}".format(run))
+            pmt.models.ensureRoot(root)
+            for name, seconds in runOnce(root, args).items():
+                runs.setdefault(name, []).append(seconds)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results = {name: {"median": statistics.median(times), "min": min(times), "runs": times} for name, times in runs.items()}
+    report = {
+        "meta": {
+            "dirs": args.dirs, "ueDirs": args.ue_dirs, "assets": args.assets, "runs": args.runs,
+            "cloneStrategy": args.clone_strategy, "python": platform.python_version(), "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    for name, result in results.items():
+        print("{:<30} {:9.4f}s".format(name, result["median"]), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(report, outputFile, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if args.compare:
+        regressions = compare(results, report["meta"], args.compare, args.threshold)
+        if regressions:
+            print("{} regression(s) over {:.0%}: {}".format(len(regressions), args.threshold, ", ".join(regressions)), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+'''Time asset index searches over a synthetic index of many rows
+
+usage: python benchmarks/index_benchmark.py [--rows N] [--budget-ms MS] [--dir PATH]
+
+rows are written straight into the database, no files are made. exits with 1 if the
+median of a search is over the budget
+'''
+import argparse
+
+import os
+
+import random
+
+import shutil
+
+import statistics
+
+import sys
+
+import tempfile
+
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pmt.index import AssetIndex
+
+WORDS = ("hero", "villain", "car", "tree", "rock", "house", "sword", "shield", "crate", "lamp",
+         "door", "window", "street", "forest", "castle", "dragon", "robot", "ship", "planet", "city")
+
+KINDS = (("rig", ".ma"), ("model", ".ma"), ("anim", ".ma"), ("sculpt", ".ztl"), ("texture", ".psd"), ("export", ".fbx"))
+
+FILES_PER_FOLDER = 100
+
+# (kind, query): prefix, substring, several words, a typo and letters left out, and words
+# no name holds together, which every search step runs through to the end
+QUERIES = (("prefix", "dragon_h"), ("substring", "sword_mod"), ("words", "castle anim"),
+           ("fuzzy", "dragn_rgi"), ("fuzzy", "vilan_sculpt"), ("no match", "dragon_rig_model"))
+
+def fillIndex(index, rows, seed=1):
+    '''write rows synthetic assets into index, FILES_PER_FOLDER per folder'''
+    generator = random.Random(seed)
+    batch = []
+    for folderNumber in range((rows + FILES_PER_FOLDER - 1) // FILES_PER_FOLDER):
+        project = "Project{:03d}".format(folderNumber % 200)
+        folder = os.path.join(index.root, project, "ArtDepot", "Dir{:05d}".format(folderNumber))
+        files = []
+        for number in range(min(FILES_PER_FOLDER, rows - folderNumber * FILES_PER_FOLDER)):
+            kind, extension = generator.choice(KINDS)
+            name = "{}_{}_{}_v{:03d}{}".format(generator.choice(WORDS), generator.choice(WORDS), kind, number, extension)
+            files.append((name, generator.randrange(2**20, 2**28), time.time()))
+        batch.append((folder, time.time(), [(os.path.join(folder, name), name, name.lower(), project, folder, extension, None, size, mtime)
+                                            for name, size, mtime in files for extension in [os.path.splitext(name)[1]]]))
+        if len(batch) >= 256:
+            index._writeFolders(batch)
+            batch = []
+    index._writeFolders(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--dir", default=None, help="scratch directory on the filesystem to test")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="pmt_index_bench", dir=args.dir)
+    try:
+        index = AssetIndex(scratch)
+        start = time.perf_counter()
+        fillIndex(index, args.rows)
+        print("indexed {} rows in {:.1f}s, fts5 {}".format(index.count(), time.perf_counter() - start, "on" if index.hasFts else "off"))
+
+        over = False
+        for kind, query in QUERIES:
+            times = []
+            for run in range(args.runs):
+                start = time.perf_counter()
+                results = index.search(query)
+                times.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(times)
+            over = over or median > args.budget_ms
+            print("{:<10} {:<16} {:8.1f}ms  {:4d} results, first {}".format(
+                kind, query, median, len(results), results[0].name if results else "-"))
+        index.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if over:
+        print("over the {:.0f}ms budget".format(args.budget_ms))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
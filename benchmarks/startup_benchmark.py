@@ -0,0 +1,109 @@
+'''Startup time report: import cost per module and wall-clock to first paint, checked against a budget
+
+usage: python benchmarks/startup_benchmark.py [--runs N] [--budget FILE] [--top N]
+
+every measurement runs in a fresh interpreter. budgets are in milliseconds in
+startup_budget.json; the script exits with 1 if a median is over its budget.
+first paint needs PyQt5 and runs offscreen against a temporary PMT_ROOT.
+'''
+import argparse
+
+import json
+
+import os
+
+import re
+
+import shutil
+
+import statistics
+
+import subprocess
+
+import sys
+
+import tempfile
+
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(REPO, "benchmarks", "startup_budget.json")
+
+# "import time: self | cumulative | name" lines written by -X importtime
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def importTimes(module, env):
+    '''cumulative microseconds per top level import of a module in a fresh interpreter'''
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                             cwd=REPO, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        return None
+    times = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(2)), len(match.group(3)))
+    return times
+
+def firstPaint(env):
+    '''milliseconds from launching PMT.py to its first event loop turn after show'''
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(REPO, "PMT.py")], cwd=REPO, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in process.stdout:
+        if line.startswith("first paint"):
+            elapsed = (time.perf_counter() - start) * 1000
+            break
+    else:
+        elapsed = None
+    process.wait()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=DEFAULT_BUDGET)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed per module")
+    args = parser.parse_args()
+
+    with open(args.budget) as budgetFile:
+        budget = json.load(budgetFile)
+
+    root = tempfile.mkdtemp(prefix="pmt_startup")
+    env = dict(os.environ, PMT_ROOT=root, PMT_STARTUP_PROBE="1", QT_QPA_PLATFORM="offscreen")
+    results = {}
+    try:
+        for module in ("pmt.models", "PMT", "pmt.gui"):
+            runs = [importTimes(module, env) for _ in range(args.runs)]
+            if None in runs:
+                print("import {}: failed (missing dependency?)".format(module))
+                continue
+
+            results["import " + module] = statistics.median(run[module][0] for run in runs) / 1000
+            print("import {}: {:.1f} ms".format(module, results["import " + module]))
+
+            # slowest direct dependencies of the last run
+            last = runs[-1]
+            top = sorted(((cumulative, name) for name, (cumulative, depth) in last.items() if depth == 2),
+                         reverse=True)[:args.top]
+            for cumulative, name in top:
+                print("    {:8.1f} ms  {}".format(cumulative / 1000, name))
+
+        paints = [firstPaint(env) for _ in range(args.runs)]
+        if None in paints:
+            print("first paint: failed (is PyQt5 installed?)")
+        else:
+            results["first paint"] = statistics.median(paints)
+            print("first paint: {:.1f} ms".format(results["first paint"]))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    over = {name: ms for name, ms in results.items() if name in budget and ms > budget[name]}
+    for name, ms in over.items():
+        print("OVER BUDGET {}: {:.1f} ms > {} ms".format(name, ms, budget[name]))
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+'''Non-GUI building blocks of the Project Management Tool
+
+names are imported from their modules on first use, so importing one module
+doesn't load every subsystem
+'''
+import importlib
+
+# public name -> module it lives in
+_exports = {
+    "Operation": "pmt.scaffold", "ScaffoldPlan": "pmt.scaffold", "ScaffoldEngine": "pmt.scaffold", "ScaffoldResult": "pmt.scaffold",
+    "Cloner": "pmt.clone", "supportedStrategies": "pmt.clone",
+    "ConfigError": "pmt.config", "ConfigService": "pmt.config", "ToolConfig": "pmt.config", "configService": "pmt.config",
+    "getConfig": "pmt.config", "ConfigResolver": "pmt.config", "configResolver": "pmt.config", "collapseConfigs": "pmt.config",
+    "Job": "pmt.jobs", "JobCancelled": "pmt.jobs", "JobQueue": "pmt.jobs",
+    "Trash": "pmt.trash", "TrashEntry": "pmt.trash", "TrashPurger": "pmt.trash", "removeTree": "pmt.trash",
+    "AssetIndex": "pmt.index", "AssetRecord": "pmt.index", "Crawler": "pmt.index", "IndexWatcher": "pmt.index",
+    "Folder": "pmt.models", "Project": "pmt.models", "Asset": "pmt.models", "ROOT": "pmt.models", "ensureRoot": "pmt.models",
+    "createAssets": "pmt.models", "expandNames": "pmt.models", "TemplatePool": "pmt.templates", "templatePool": "pmt.templates",
+    "Launcher": "pmt.launcher", "LaunchPolicy": "pmt.launcher", "appLauncher": "pmt.launcher", "serveOpenRequests": "pmt.launcher",
+    "InjectionRules": "pmt.inject", "resync": "pmt.inject",
+    "Journal": "pmt.journal", "renameAll": "pmt.models", "deleteAll": "pmt.models", "runJournal": "pmt.models", "rollbackJournal": "pmt.models",
+    "RenamePattern": "pmt.rename", "RenamePlan": "pmt.rename", "RenameError": "pmt.rename", "planRenames": "pmt.rename",
+    "applyRenames": "pmt.rename", "batchRename": "pmt.rename",
+    "HashStore": "pmt.dedup", "findDuplicates": "pmt.dedup", "dedupe": "pmt.dedup", "breakLink": "pmt.dedup",
+    "ArchiveRules": "pmt.archive", "archiveProject": "pmt.archive", "restoreArchive": "pmt.archive",
+    "Manifest": "pmt.sync", "planSync": "pmt.sync", "syncRoots": "pmt.sync",
+    "TempPolicy": "pmt.tempgc", "TempCollector": "pmt.tempgc", "planCollection": "pmt.tempgc",
+    "DependencyGraph": "pmt.deps", "rewriteReferences": "pmt.deps",
+    "VersionStore": "pmt.versions", "Version": "pmt.versions", "VersionError": "pmt.versions",
+    "UsageReport": "pmt.usage", "scanUsage": "pmt.usage",
+    "PreviewCache": "pmt.previews", "PreviewService": "pmt.previews", "registerExtractor": "pmt.previews",
+    "Tracer": "pmt.trace", "span": "pmt.trace", "summarize": "pmt.trace",
+    "ManifestItem": "pmt.batch", "BatchReport": "pmt.batch", "loadManifest": "pmt.batch", "runManifest": "pmt.batch",
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError("module 'pmt' has no attribute '{}'".format(name))
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
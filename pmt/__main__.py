@@ -0,0 +1,5 @@
+import sys
+
+from pmt.cli import main
+
+sys.exit(main())
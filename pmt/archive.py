@@ -0,0 +1,329 @@
+'''Streams projects into .tar.gz or .zip archives and back, leaving out what can be regenerated
+
+archives hold the project folder with its Tools/config.xml layout. Temp folders are kept
+empty, UE caches (inject.DEFAULT_EXCLUDES) and PMT's own .pmt_ files are left out, and more
+patterns can be excluded, written like the utility rules: a name anywhere, or a path
+relative to the project when it has a slash.
+
+.tar.gz archives are compressed on every core: the tar stream is cut into blocks that are
+gzipped as separate members in parallel, which gzip, tar and 7-Zip read as one stream.
+small files are read ahead on a worker pool, big ones are streamed in chunks, so memory
+stays bounded however large the files are. .zip archives are compressed one file at a
+time, for Explorer
+'''
+import gzip
+
+import os
+
+import shutil
+
+import tarfile
+
+import time
+
+import zipfile
+
+from collections import deque
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.inject import DEFAULT_EXCLUDES, compilePatterns, matchesAny
+
+from pmt.trace import span
+
+# emptied rather than left out, so the folder layout comes back
+EMPTIED = ("Temp",)
+
+ALWAYS_EXCLUDED = (".pmt_*",)
+
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+# uncompressed tar bytes per gzip member
+DEFAULT_BLOCK_BYTES = 4 * 2**20
+
+# files up to this size are read ahead in parallel, bigger ones are streamed
+READ_AHEAD_FILE_BYTES = 4 * 2**20
+
+# bytes of read-ahead files held at once
+READ_AHEAD_BYTES = 64 * 2**20
+
+CHUNK_BYTES = 1 * 2**20
+
+# already compressed, stored as they are in zips
+STORED_EXTENSIONS = (".zip", ".7z", ".gz", ".jpg", ".jpeg", ".png", ".mp4", ".mov", ".uasset", ".umap")
+
+TAR_GZ = ".tar.gz"
+ZIP = ".zip"
+
+PART_PREFIX = ".pmt_part_"
+
+class ArchiveError(ValueError):
+    '''raised for an archive that can't be written or restored'''
+
+def archiveFormat(path):
+    lower = path.lower()
+    if lower.endswith(TAR_GZ) or lower.endswith(".tgz"):
+        return TAR_GZ
+    if lower.endswith(ZIP):
+        return ZIP
+    raise ArchiveError("{} isn't a .tar.gz or .zip".format(path))
+
+class ArchiveRules():
+    '''which folders and files of a project go into its archive'''
+    def __init__(self, exclude=DEFAULT_EXCLUDES, emptied=EMPTIED):
+        self.exclude = tuple(exclude)
+        self.emptied = tuple(emptied)
+        self._exclude = compilePatterns(ALWAYS_EXCLUDED + self.exclude)
+        self._emptied = compilePatterns(self.emptied)
+
+    def excluded(self, relPath):
+        return matchesAny(self._exclude, relPath)
+
+    def isEmptied(self, relPath):
+        return matchesAny(self._emptied, relPath)
+
+def walkProject(project, rules):
+    '''(path, archive name, is folder) of everything archived, folders before their contents'''
+    project = os.path.abspath(project)
+    base = os.path.basename(project)
+    stack = [(project, "")]
+    while stack:
+        directory, relPath = stack.pop()
+        yield directory, base + ("/" + relPath if relPath else ""), True
+        if relPath and rules.isEmptied(relPath):
+            continue
+
+        with os.scandir(directory) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+        folders = []
+        for entry in entries:
+            childPath = relPath + "/" + entry.name if relPath else entry.name
+            if rules.excluded(childPath):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                folders.append((entry.path, childPath))
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, base + "/" + childPath, False
+        stack.extend(reversed(folders))
+
+class ParallelGzipWriter():
+    '''file object writing what it's given as gzip members compressed on a worker pool, in order'''
+    def __init__(self, fileobj, workers=DEFAULT_WORKERS, blockBytes=DEFAULT_BLOCK_BYTES, level=6):
+        self.fileobj = fileobj
+        self.blockBytes = blockBytes
+        self.level = level
+        self.maxPending = workers * 2 # blocks compressed or waiting, bounds memory
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-gzip")
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.blockBytes:
+            self._submit(bytes(self._buffer[:self.blockBytes]))
+            del self._buffer[:self.blockBytes]
+        return len(data)
+
+    def _submit(self, block):
+        # zlib lets go of the GIL while it compresses
+        self._pending.append(self._pool.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self._pending) > self.maxPending:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self.fileobj.write(self._pending.popleft().result())
+        self._pool.shutdown()
+
+    def abort(self):
+        '''drop the blocks still waiting and stop the pool, nothing more is written'''
+        self._buffer = bytearray()
+        self._pending.clear()
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+
+def readAhead(entries, workers):
+    '''(path, name, isFolder, data) of entries, data is read in parallel for small files, None for the rest'''
+    def read(path):
+        with open(path, "rb") as readFile:
+            return readFile.read()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-read") as pool:
+        window = deque()
+        held = 0
+        for path, name, isFolder in entries:
+            size = 0
+            future = None
+            if not isFolder:
+                size = os.path.getsize(path)
+                if size <= READ_AHEAD_FILE_BYTES:
+                    future = pool.submit(read, path)
+            window.append((path, name, isFolder, future, size if future else 0))
+            held += size if future else 0
+
+            # hand out the oldest once enough is in flight
+            while window and (held > READ_AHEAD_BYTES or len(window) > workers * 8):
+                item = window.popleft()
+                held -= item[4]
+                yield item[0], item[1], item[2], item[3].result() if item[3] else None
+        while window:
+            item = window.popleft()
+            yield item[0], item[1], item[2], item[3].result() if item[3] else None
+
+def archiveProject(project, archivePath, rules=None, workers=DEFAULT_WORKERS, progress=None):
+    '''write project to archivePath (.tar.gz or .zip), returns the number of files archived'''
+    rules = rules or ArchiveRules()
+    kind = archiveFormat(archivePath)
+    entries = list(walkProject(project, rules))
+    files = sum(1 for entry in entries if not entry[2])
+    partPath = os.path.join(os.path.dirname(os.path.abspath(archivePath)), PART_PREFIX + os.path.basename(archivePath))
+
+    with span("archive.write", path=project, format=kind, files=files) as archiveSpan:
+        done = 0
+        try:
+            with open(partPath, "wb") as archiveFile:
+                if kind == TAR_GZ:
+                    with ParallelGzipWriter(archiveFile, workers) as writer, tarfile.open(fileobj=writer, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                        for path, name, isFolder, data in readAhead(entries, workers):
+                            info = tar.gettarinfo(path, name)
+                            if isFolder:
+                                tar.addfile(info)
+                                continue
+                            if data is not None:
+                                info.size = len(data)
+                                tar.addfile(info, _BytesReader(data))
+                            else:
+                                with open(path, "rb") as fileobj:
+                                    tar.addfile(info, fileobj)
+                            archiveSpan.add("bytes", info.size)
+                            done += 1
+                            if progress:
+                                progress(done, files)
+                else:
+                    with zipfile.ZipFile(archiveFile, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                        for path, name, isFolder in entries:
+                            info = zipfile.ZipInfo.from_file(path, name)
+                            if isFolder:
+                                archive.writestr(info, b"")
+                                continue
+                            if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+                                info.compress_type = zipfile.ZIP_STORED
+                            else:
+                                info.compress_type = zipfile.ZIP_DEFLATED
+                            with open(path, "rb") as source, archive.open(info, "w", force_zip64=True) as target:
+                                shutil.copyfileobj(source, target, CHUNK_BYTES)
+                            archiveSpan.add("bytes", info.file_size)
+                            done += 1
+                            if progress:
+                                progress(done, files)
+            # only a finished archive gets its name
+            os.replace(partPath, archivePath)
+        except BaseException:
+            try:
+                os.remove(partPath)
+            except OSError:
+                pass
+            raise
+    return files
+
+class _BytesReader():
+    '''read() over bytes already in memory, for tarfile.addfile'''
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.position = 0
+
+    def read(self, size=-1):
+        end = len(self.data) if size is None or size < 0 else self.position + size
+        chunk = self.data[self.position:end].tobytes()
+        self.position += len(chunk)
+        return chunk
+
+def safeTarget(destination, name):
+    '''where an archived name goes under destination, refusing names that would leave it'''
+    parts = name.replace("\\", "/").strip("/").split("/")
+    if not parts or any(part in ("", ".", "..") for part in parts) or os.path.isabs(name) or ":" in parts[0]:
+        raise ArchiveError("unsafe name in archive: {}".format(name))
+    return os.path.join(destination, *parts)
+
+def writeMember(source, target, mtime):
+    '''stream a file into place under a temporary name, so a cut-short restore leaves no half files'''
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    part = os.path.join(os.path.dirname(target), PART_PREFIX + os.path.basename(target))
+    with open(part, "wb") as targetFile:
+        shutil.copyfileobj(source, targetFile, CHUNK_BYTES)
+    os.utime(part, (mtime, mtime))
+    os.replace(part, target)
+
+class Restore():
+    '''the project folder an archive is restored to, checked on the first name read'''
+    def __init__(self, archivePath, destination):
+        self.archivePath = archivePath
+        self.destination = destination
+        self.project = None
+
+    def target(self, name):
+        target = safeTarget(self.destination, name)
+        project = name.replace("\\", "/").strip("/").split("/")[0]
+        if self.project is None:
+            # restoring over an existing project would mix two versions of it
+            if os.path.exists(os.path.join(self.destination, project)):
+                raise ArchiveError("{} already exists in {}, restore somewhere else or move it first".format(project, self.destination))
+            self.project = project
+        elif project != self.project:
+            raise ArchiveError("{} holds more than one project folder".format(self.archivePath))
+        return target
+
+def restoreArchive(archivePath, destination, progress=None):
+    '''extract an archive straight into destination, returns the project folder it made
+
+    the archive is read once from start to end, files are written to their place as they come
+    '''
+    kind = archiveFormat(archivePath)
+    restore = Restore(archivePath, os.path.abspath(destination))
+
+    with span("archive.restore", path=archivePath, format=kind) as restoreSpan:
+        done = 0
+        if kind == TAR_GZ:
+            # tarfile's own gz stream stops after the first gzip member, GzipFile reads them all
+            with gzip.open(archivePath, "rb") as gzipFile, tarfile.open(fileobj=gzipFile, mode="r|") as tar:
+                for member in tar:
+                    target = restore.target(member.name)
+                    if member.isdir():
+                        os.makedirs(target, exist_ok=True)
+                    elif member.isfile():
+                        writeMember(tar.extractfile(member), target, member.mtime)
+                        restoreSpan.add("bytes", member.size)
+                        done += 1
+                        if progress:
+                            progress(done, 0)
+        else:
+            with zipfile.ZipFile(archivePath) as archive:
+                members = archive.infolist()
+                files = sum(1 for member in members if not member.is_dir())
+                for member in members:
+                    target = restore.target(member.filename)
+                    if member.is_dir():
+                        os.makedirs(target, exist_ok=True)
+                        continue
+                    with archive.open(member) as source:
+                        writeMember(source, target, time.mktime(member.date_time + (0, 0, -1)))
+                    restoreSpan.add("bytes", member.file_size)
+                    done += 1
+                    if progress:
+                        progress(done, files)
+        restoreSpan.set(files=done)
+
+    if restore.project is None:
+        raise ArchiveError("{} is empty".format(archivePath))
+    return os.path.join(restore.destination, restore.project)
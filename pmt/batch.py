@@ -0,0 +1,124 @@
+'''Bulk project, folder and asset creation from a production manifest'''
+import csv
+
+import json
+
+import os
+
+import time
+
+from pmt.clone import AUTO
+
+from pmt.jobs import Job, JobQueue
+
+from pmt.models import Folder, Project, Asset
+
+DEFAULT_WORKERS = 4
+
+PROJECT = "project"
+FOLDER = "folder"
+ASSET = "asset"
+KINDS = (PROJECT, FOLDER, ASSET)
+
+class ManifestError(ValueError):
+    '''raised for a manifest entry that can't be run'''
+
+class ManifestItem():
+    '''one thing to create, paths are absolute'''
+    def __init__(self, kind, path, app=None, assetType=None):
+        if kind not in KINDS:
+            raise ManifestError("unknown item type '{}', expected one of {}".format(kind, ", ".join(KINDS)))
+        if kind == ASSET and not (app and assetType):
+            raise ManifestError("asset {} needs an app and an assetType".format(path))
+
+        self.kind = kind
+        self.path = path
+        self.app = app
+        self.assetType = assetType
+
+    @classmethod
+    def fromDict(cls, entry, root):
+        '''item from a manifest row, relative paths are under root'''
+        kind = (entry.get("type") or "").strip().lower()
+        path = entry.get("path") or entry.get("name")
+        if not path:
+            raise ManifestError("manifest entry without a path: {}".format(entry))
+        return cls(kind, os.path.join(root, path), entry.get("app") or None, entry.get("assetType") or None)
+
+    def __repr__(self):
+        return "ManifestItem({}, {})".format(self.kind, self.path)
+
+def loadManifest(manifest, root):
+    '''read a .json (list of objects, or {"items": [...]}) or .csv manifest
+
+    every entry has a type (project, folder or asset) and a path, assets also an app and assetType
+    '''
+    with open(manifest, newline="") as manifestFile:
+        if os.path.splitext(manifest)[1].lower() == ".csv":
+            entries = list(csv.DictReader(manifestFile))
+        else:
+            entries = json.load(manifestFile)
+            if isinstance(entries, dict):
+                entries = entries["items"]
+
+    return [ManifestItem.fromDict(entry, root) for entry in entries]
+
+def createItem(job, item, cloneStrategy=AUTO, scaffoldWorkers=None):
+    '''create one manifest item, returns the path that was created'''
+    if item.kind == PROJECT:
+        progress = lambda done, total, phase: job.setProgress(done, total, phase)
+        return Project(item.path, scaffoldWorkers, progress, cloneStrategy).path
+    if item.kind == FOLDER:
+        return Folder(item.path).path
+    return Asset(item.path, item.app, item.assetType).path
+
+class BatchReport():
+    '''outcome and timing of every item of a run'''
+    def __init__(self, jobs, seconds):
+        self.jobs = jobs # (item, job) pairs in manifest order
+        self.seconds = seconds
+
+    @property
+    def failed(self):
+        return [job for item, job in self.jobs if job.status != Job.DONE]
+
+    def toDict(self):
+        items = []
+        for item, job in self.jobs:
+            items.append({
+                "type": item.kind,
+                "path": item.path,
+                "created": job.result,
+                "status": job.status,
+                "seconds": round(job.seconds, 4),
+                "error": job.error,
+            })
+        return {
+            "total": len(self.jobs),
+            "ok": len(self.jobs) - len(self.failed),
+            "failed": len(self.failed),
+            "seconds": round(self.seconds, 4),
+            "items": items,
+        }
+
+def runManifest(items, workers=DEFAULT_WORKERS, cloneStrategy=AUTO, scaffoldWorkers=None, progress=None):
+    '''create every item in parallel, returns a BatchReport
+
+    items run in manifest order as far as their paths allow: an asset waits for the
+    project or folder it's created in, unrelated items run at the same time
+    '''
+    queue = JobQueue(workers)
+    if progress:
+        queue.listeners.append(progress)
+
+    start = time.perf_counter()
+    jobs = []
+    try:
+        for item in items:
+            job = Job("{} {}".format(item.kind, item.path), [item.path], createItem, item, cloneStrategy, scaffoldWorkers)
+            jobs.append((item, queue.submit(job)))
+        queue.wait()
+    finally:
+        queue.shutdown()
+
+    return BatchReport(jobs, time.perf_counter() - start)
@@ -0,0 +1,570 @@
+'''Command line interface, run with python -m pmt'''
+import argparse
+
+import json
+
+import os
+
+import sys
+
+import time
+
+import pmt.config
+
+import pmt.trace
+
+from pmt.batch import ManifestItem, loadManifest, runManifest, KINDS
+
+from pmt.clone import STRATEGIES, AUTO
+
+from pmt.config import collapseConfigs, configMode, toolPath, COPY
+
+from pmt.models import ROOT, Asset, ensureRoot, runJournal, rollbackJournal
+
+from pmt.journal import Journal
+
+from pmt.trash import Trash, TrashPurger, Throttle
+
+from pmt.index import AssetIndex, isSkipped
+
+from pmt.inject import resync, DEFAULT_EXCLUDES
+
+from pmt.previews import PreviewCache, PreviewService, hasExtractor
+
+from pmt.rename import RenamePattern, RenameError, planRenames, applyRenames
+
+from pmt.usage import scanUsage, formatBytes, BREAKDOWNS
+
+from pmt.dedup import findDuplicates, dedupe, DedupError, STRATEGIES as DEDUP_STRATEGIES, DEFAULT_MIN_BYTES
+
+from pmt.archive import ArchiveRules, ArchiveError, archiveProject, restoreArchive, DEFAULT_WORKERS as ARCHIVE_WORKERS
+
+from pmt.tempgc import TempPolicy, planCollection, collect
+
+from pmt.sync import syncRoots, SyncError, DEFAULT_WORKERS as SYNC_WORKERS
+
+from pmt.deps import DependencyGraph, rewriteReferences
+
+from pmt.versions import VersionStore, VersionError, STRATEGIES as VERSION_STRATEGIES
+
+def runCommand(args):
+    # make sure the root exists with its config before anything is created in it
+    ensureRoot(args.root)
+    items = loadManifest(args.manifest, args.root)
+
+    def progress(job):
+        if job.finished and not args.quiet:
+            print("{:<9} {:8.3f}s  {}".format(job.status, job.seconds, job.name), file=sys.stderr)
+
+    report = runManifest(items, args.workers, args.clone_strategy, args.scaffold_workers, progress)
+    json.dump(report.toDict(), sys.stdout, indent=2)
+    print()
+    return 1 if report.failed else 0
+
+def newCommand(args):
+    # a manifest of one
+    ensureRoot(args.root)
+    item = ManifestItem(args.type, os.path.join(args.root, args.path), args.app, args.asset_type)
+    report = runManifest([item], 1, args.clone_strategy)
+    json.dump(report.toDict(), sys.stdout, indent=2)
+    print()
+    return 1 if report.failed else 0
+
+def collapseConfigsCommand(args):
+    removed = collapseConfigs(args.root, args.dry_run)
+    for configPath in removed:
+        print(configPath)
+    print("{} {} redundant config(s)".format("would remove" if args.dry_run else "removed", len(removed)))
+
+def trashCommand(args):
+    trash = Trash(args.root)
+
+    if args.action == "list":
+        for entry in trash.entries():
+            size = "?" if entry.size is None else "{:.1f}MB".format(entry.size / 2**20)
+            print("{}  {}  {:>10}  {}".format(entry.id, time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.deleted)), size, entry.original))
+
+    elif args.action == "restore":
+        # by entry id, or the newest entry deleted from a path
+        entry = next((entry for entry in trash.entries() if entry.id == args.item), None) or trash.find(args.item)
+        if entry is None:
+            print("nothing in the trash for {}".format(args.item))
+            return 1
+        print("restored {}".format(trash.restore(entry)))
+
+    elif args.action == "purge":
+        # purge everything, or apply the age limit only
+        maxAge = args.max_age * 24 * 60 * 60 if args.max_age is not None else -1
+        purged = TrashPurger(trash, maxAge=maxAge, opsPerSecond=args.rate).purgeOnce()
+        print("purged {} entries".format(len(purged)))
+
+def indexCommand(args):
+    index = AssetIndex(args.root)
+    try:
+        if not args.no_update:
+            changed, removed = index.reconcile()
+            print("index: {} folders updated, {} removed, {} assets".format(changed, removed, index.count()))
+
+        if args.search:
+            records = index.search(args.search, args.limit)
+        elif args.project or args.dcc or args.ext:
+            records = index.query(args.project, args.dcc, args.ext, limit=args.limit)
+        else:
+            return
+        for record in records:
+            print("{}\t{}\t{}".format(record.path, record.dcc or "", record.size))
+    finally:
+        index.close()
+
+def resyncCommand(args):
+    projectConfig = toolPath("ProjectConfig.xml")
+    configTemplate = toolPath("ConfigFileTemplate.xml") if configMode(projectConfig) == COPY else None
+
+    for project in args.projects:
+        report = resync(project, projectConfig, configTemplate, args.workers, args.dry_run)
+        for target in report.added:
+            if target.missing or not target.hasConfig:
+                print("{} {}".format("would add" if args.dry_run else "added", target.relPath))
+        print("{}: {} directories new and {} gone since the last sync".format(project, len(report.added), len(report.removed)))
+
+def journalCommand(args):
+    journals = Journal.unfinished(args.directory)
+    if args.ids:
+        journals = [journal for journal in journals if journal.id in args.ids]
+
+    if args.action == "list":
+        for journal in journals:
+            print("{}  {:<8} {:>7}/{:<7} {}".format(journal.id, journal.kind, len(journal.completed), len(journal.steps), journal.target))
+        return
+
+    if args.action == "rollback" and not args.ids:
+        print("give the ids of the jobs to roll back, see journal list")
+        return 1
+
+    if not journals:
+        print("no interrupted jobs in {}".format(args.directory))
+        return 1
+
+    for journal in journals:
+        if args.action == "resume":
+            runJournal(journal, workers=args.workers)
+            print("resumed {} {} {}".format(journal.id, journal.kind, journal.target))
+        else:
+            failed = rollbackJournal(journal)
+            print("rolled back {} {} {}".format(journal.id, journal.kind, journal.target))
+            for path in failed:
+                print("  not in the trash, can't restore {}".format(path))
+
+def renameCommand(args):
+    try:
+        pattern = RenamePattern(args.pattern, args.find, args.replace, args.start, args.step)
+        plan = planRenames(args.paths, pattern)
+    except RenameError as error:
+        print(error)
+        return 1
+
+    for old, new in plan.renames:
+        print("{} -> {}".format(old, os.path.basename(new)))
+    for path, reason in plan.conflicts:
+        print("conflict {}: {}".format(path, reason))
+    print("{} to rename, {} unchanged, {} conflict(s), {} in cycles".format(
+        len(plan.renames), len(plan.unchanged), len(plan.conflicts), sum(len(cycle) for cycle in plan.cycles())))
+
+    if not plan.ok:
+        return 1
+
+    # scenes using the renamed paths, read before anything moves
+    graph = None
+    if args.update_references:
+        graph = DependencyGraph(args.update_references)
+        graph.update()
+        for dependency in graph.dependents([old for old, new in plan.renames]):
+            print("{} uses {}".format(dependency.scene, dependency.target))
+
+    try:
+        if not args.dry_run:
+            # journaled next to the paths unless told otherwise
+            journalDir = args.journal_dir or os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in args.paths])
+            applyRenames(plan, journalDir)
+            if graph:
+                scenes, references = rewriteReferences(graph, plan.renames)
+                print("{} reference(s) updated in {} scene(s)".format(references, scenes))
+    finally:
+        if graph:
+            graph.close()
+
+def usageCommand(args):
+    report = scanUsage(args.root, args.workers, args.full)
+    rows = report.breakdown(args.by)[:args.top]
+    if args.json:
+        json.dump({"root": report.root, "bytes": report.totalBytes, "files": report.totalFiles,
+                   args.by: [{"name": key, "files": files, "bytes": size} for key, files, size in rows]}, sys.stdout, indent=2)
+        print()
+        return
+
+    total = report.totalBytes or 1
+    print("{:<48} {:>10} {:>9} {:>7}".format(args.by, "size", "files", "share"))
+    for key, files, size in rows:
+        print("{:<48} {:>10} {:>9} {:>6.1f}%".format(key, formatBytes(size), files, 100.0 * size / total))
+    print("{} in {} files, {} of {} folders listed, the rest unchanged since the last scan".format(
+        formatBytes(report.totalBytes), report.totalFiles, report.listed, len(report.directories)))
+
+def dedupCommand(args):
+    report = findDuplicates(args.root, int(args.min_mb * 2**20), args.workers)
+    for group in report.groups[:args.top]:
+        print("{} x {}".format(len(group.files), formatBytes(group.size)))
+        for path in group.paths:
+            print("  {}".format(path))
+    print("{} duplicate groups, {} reclaimable ({} files considered, {} hashed in full)".format(
+        len(report.groups), formatBytes(report.reclaimable), report.scanned, report.hashed))
+
+    if not args.apply:
+        return
+    try:
+        result = dedupe(report, args.strategy)
+    except DedupError as error:
+        print(error)
+        return 1
+    for path, reason in result.skipped:
+        print("skipped {}: {}".format(path, reason))
+    print("linked {} files, {} freed".format(result.linked, formatBytes(result.bytes)))
+
+def archiveCommand(args):
+    # UE caches stay excluded, --exclude adds to them
+    rules = ArchiveRules(DEFAULT_EXCLUDES + tuple(args.exclude))
+    try:
+        files = archiveProject(args.project, args.output, rules, args.workers)
+    except ArchiveError as error:
+        print(error)
+        return 1
+    print("{} files archived to {} ({})".format(files, args.output, formatBytes(os.path.getsize(args.output))))
+
+def restoreCommand(args):
+    try:
+        project = restoreArchive(args.archive, args.into)
+    except ArchiveError as error:
+        print(error)
+        return 1
+    print("restored {}".format(project))
+
+def syncCommand(args):
+    rules = ArchiveRules(DEFAULT_EXCLUDES + tuple(args.exclude))
+    try:
+        result = syncRoots(args.source, args.target, rules, args.workers, args.hashes, args.verify, args.dry_run)
+    except SyncError as error:
+        print(error)
+        return 1
+
+    plan = result.plan
+    for old, new in plan.folderRenames + plan.renames:
+        print("rename {} -> {}".format(old, new))
+    for relPath in plan.deletes:
+        print("delete {}".format(relPath))
+    if args.dry_run:
+        for relPath in plan.copies:
+            print("copy {}".format(relPath))
+    for relPath, reason in result.skipped:
+        print("skipped {}: {}".format(relPath, reason))
+    print("{} folder and {} file renames, {} deletes, {} of {} files copied ({})".format(
+        len(plan.folderRenames), len(plan.renames), len(plan.deletes), result.copied, len(plan.copies), formatBytes(result.bytes if not args.dry_run else plan.copyBytes)))
+    if result.skipped:
+        return 1
+
+def tempCommand(args):
+    # ProjectConfig.xml's policy, with the limits given here instead
+    policy = TempPolicy.fromConfig()
+    if args.max_age_days is not None:
+        policy.maxAge = args.max_age_days * 24 * 60 * 60
+    if args.max_folder_mb is not None:
+        policy.maxFolderBytes = args.max_folder_mb * 2**20
+    if args.max_project_mb is not None:
+        policy.maxProjectBytes = args.max_project_mb * 2**20
+    if args.exclude:
+        policy = TempPolicy(policy.maxAge, policy.maxFolderBytes, policy.maxProjectBytes, policy.exclude + tuple(args.exclude))
+
+    report = planCollection(args.root, policy, args.workers)
+    print("{:<40} {:>8} {:>10} {:>10}".format("project", "folders", "size", "to remove"))
+    for project, folders, size, reclaim in report.byProject():
+        print("{:<40} {:>8} {:>10} {:>10}".format(project or "(root)", folders, formatBytes(size), formatBytes(reclaim)))
+    print("{} Temp folders, {} in {} files, {} files ({}) to remove".format(
+        len(report.folders), formatBytes(report.totalBytes), report.totalFiles, len(report.doomed), formatBytes(report.reclaimBytes)))
+
+    if not args.apply:
+        return
+    result = collect(report, args.workers, Throttle(args.ops_per_second) if args.ops_per_second else None)
+    for path, reason in result.skipped:
+        print("skipped {}: {}".format(path, reason))
+    print("removed {} files, {} freed".format(result.removed, formatBytes(result.bytes)))
+
+def depsCommand(args):
+    graph = DependencyGraph(args.root, workers=args.workers)
+    try:
+        if not args.no_update:
+            parsed, removed = graph.update()
+            print("deps: {} scene(s) read, {} removed".format(parsed, removed))
+
+        if args.uses:
+            dependencies = graph.dependents(args.uses)
+        elif args.of:
+            dependencies = graph.dependencies(args.of)
+        elif args.missing:
+            dependencies = graph.missing()
+        else:
+            return
+        for dependency in dependencies:
+            print("{}\t{}\t{}".format(dependency.scene, dependency.kind, dependency.target))
+    finally:
+        graph.close()
+
+def versionsCommand(args):
+    if not os.path.isfile(args.path):
+        print("{} isn't a file".format(args.path))
+        return 1
+    store = VersionStore(os.path.dirname(os.path.abspath(args.path)), args.strategy)
+    name = os.path.basename(args.path)
+
+    try:
+        if args.action == "save":
+            version = store.save(args.path, args.note)
+            print("saved {} {} ({})".format(name, version.label, store.resolvedStrategy()))
+        elif args.action == "list":
+            for version in store.versions(name):
+                print("{}\t{}\t{}\t{}".format(version.label, time.strftime("%Y-%m-%d %H:%M", time.localtime(version.saved)),
+                                              formatBytes(version.size), version.note))
+        elif args.action == "prune":
+            print("{} freed".format(formatBytes(store.prune(name, args.keep))))
+        elif args.number is None:
+            print("give the version number to {}".format(args.action))
+            return 1
+        elif args.action == "restore":
+            version = store.restore(args.path, args.number)
+            print("restored {} {}".format(name, version.label))
+        else:
+            # opened like any asset, from a copy in the folder's Temp folder
+            Asset(args.path).open(args.number)
+    except VersionError as error:
+        print(error)
+        return 1
+
+def previewsCommand(args):
+    cache = PreviewCache(args.cache)
+    if args.action == "clear":
+        cache.clear()
+        print("cleared {}".format(cache.folder))
+        return
+    if args.action == "size":
+        print("{}: {:.1f} MB of {:.0f} MB".format(cache.folder, cache.totalBytes() / 2**20, cache.maxBytes / 2**20))
+        return
+
+    if not args.directory:
+        print("give the folder to generate thumbnails for")
+        return 1
+
+    # every asset with a preview, outside utility and hidden folders
+    paths = []
+    for folder, dirs, files in os.walk(args.directory):
+        dirs[:] = [name for name in dirs if not isSkipped(name) and not name.startswith(".")]
+        paths.extend(os.path.join(folder, name) for name in files if hasExtractor(name))
+
+    service = PreviewService(cache, workers=args.workers)
+    try:
+        previews = service.previewAll(paths)
+    finally:
+        service.shutdown()
+    print("{} thumbnails, {} assets without a preview".format(sum(1 for data in previews if data), sum(1 for data in previews if not data)))
+
+def metricsCommand(args):
+    since = time.time() - args.days * 24 * 60 * 60 if args.days is not None else None
+    summary = pmt.trace.summarize(args.log, since)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return
+
+    print("{:<28} {:>7} {:>10} {:>10} {:>10}".format("operation", "count", "p50 ms", "p95 ms", "max ms"))
+    for name, stats in summary.items():
+        print("{:<28} {:>7} {:>10.2f} {:>10.2f} {:>10.2f}".format(name, stats["count"], stats["p50"] * 1000, stats["p95"] * 1000, stats["max"] * 1000))
+
+def buildParser():
+    parser = argparse.ArgumentParser(prog="python -m pmt", description="Project Management Tool")
+    parser.add_argument("--tool-dir", help="folder with ProjectConfig.xml, the templates and UE4Project, default: working directory")
+    parser.add_argument("--trace", metavar="FILE", help="record timing spans to a Chrome trace (chrome://tracing, ui.perfetto.dev) and the metrics log")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # bulk creation from a manifest
+    run = commands.add_parser("run", help="create the projects, folders and assets listed in a CSV/JSON manifest")
+    run.add_argument("manifest", help="manifest file, .csv or .json")
+    run.add_argument("--root", default=ROOT, help="folder relative manifest paths are in, default: %(default)s")
+    run.add_argument("--workers", type=int, default=4, help="items created at the same time")
+    run.add_argument("--scaffold-workers", type=int, default=None, help="filesystem workers per project scaffold")
+    run.add_argument("--clone-strategy", choices=STRATEGIES, default=AUTO, help="how the UE4 template is copied")
+    run.add_argument("--quiet", action="store_true", help="no per-item lines on stderr")
+    run.set_defaults(func=runCommand)
+
+    # single item
+    new = commands.add_parser("new", help="create one project, folder or asset")
+    new.add_argument("type", choices=KINDS)
+    new.add_argument("path", help="path relative to the root")
+    new.add_argument("--root", default=ROOT, help="default: %(default)s")
+    new.add_argument("--app", help="asset application, e.g. Maya")
+    new.add_argument("--asset-type", help="asset type, e.g. Rig")
+    new.add_argument("--clone-strategy", choices=STRATEGIES, default=AUTO)
+    new.set_defaults(func=newCommand)
+
+    # config migration for layered mode
+    collapse = commands.add_parser("collapse-configs", help="remove config copies identical to the config they inherit")
+    collapse.add_argument("root", help="directory to migrate, e.g. C:\\PMTTemp")
+    collapse.add_argument("--dry-run", action="store_true", help="only list the configs that would be removed")
+    collapse.set_defaults(func=collapseConfigsCommand)
+
+    # trash of instant deletes
+    trash = commands.add_parser("trash", help="list, restore or purge deleted folders")
+    trash.add_argument("action", choices=("list", "restore", "purge"))
+    trash.add_argument("root", help="PMT root holding the trash, e.g. C:\\PMTTemp")
+    trash.add_argument("item", nargs="?", help="entry id or original path to restore")
+    trash.add_argument("--max-age", type=float, default=None, help="purge: only entries older than this many days")
+    trash.add_argument("--rate", type=int, default=None, help="purge: max unlinks per second")
+    trash.set_defaults(func=trashCommand)
+
+    # asset index and search
+    index = commands.add_parser("index", help="update the asset index and search it")
+    index.add_argument("root", help="PMT root holding the index, e.g. C:\\PMTTemp")
+    index.add_argument("--search", help="prefix, substring and fuzzy search on asset names")
+    index.add_argument("--project", help="only assets in this project")
+    index.add_argument("--dcc", help="only assets opened by this dcc")
+    index.add_argument("--ext", help="only assets with this extension")
+    index.add_argument("--limit", type=int, default=200)
+    index.add_argument("--no-update", action="store_true", help="query without reconciling with the disk first")
+    index.set_defaults(func=indexCommand)
+
+    # utility folders for directories added to existing projects
+    resyncParser = commands.add_parser("resync", help="give directories added to projects since the last sync their Temp/Tools folders")
+    resyncParser.add_argument("projects", nargs="+", help="project folders, e.g. C:\\PMTTemp\\MyProject")
+    resyncParser.add_argument("--workers", type=int, default=None, help="filesystem workers")
+    resyncParser.add_argument("--dry-run", action="store_true", help="only list the directories that would get utility folders")
+    resyncParser.set_defaults(func=resyncCommand)
+
+    # interrupted jobs
+    journal = commands.add_parser("journal", help="list, resume or roll back interrupted project creations, renames and deletes")
+    journal.add_argument("action", choices=("list", "resume", "rollback"))
+    journal.add_argument("directory", help="folder holding the .pmt_journal, the root for renames/deletes and a project's parent for projects")
+    journal.add_argument("ids", nargs="*", help="journal ids, default: every interrupted job")
+    journal.add_argument("--workers", type=int, default=None, help="resume: filesystem workers")
+    journal.set_defaults(func=journalCommand)
+
+    # pattern renames
+    rename = commands.add_parser("rename", help="rename paths from a pattern, checked for conflicts before anything moves")
+    rename.add_argument("pattern", help="e.g. \"{parent}_{name:lower}_{n:3}\", tokens: name ext parent date n")
+    rename.add_argument("paths", nargs="+", help="files or folders, numbered in this order")
+    rename.add_argument("--find", default=None, help="regular expression replaced in the old name before the pattern")
+    rename.add_argument("--replace", default="", help="replacement for --find, \\1 for groups")
+    rename.add_argument("--start", type=int, default=1, help="first counter value")
+    rename.add_argument("--step", type=int, default=1, help="counter increment")
+    rename.add_argument("--journal-dir", default=None, help="folder for the rename journal, default: the folder holding the paths")
+    rename.add_argument("--dry-run", action="store_true", help="only print the renames and conflicts")
+    rename.add_argument("--update-references", metavar="ROOT", default=None, help="point the Maya scenes under ROOT using the renamed paths at the new ones")
+    rename.set_defaults(func=renameCommand)
+
+    # disk usage
+    usage = commands.add_parser("usage", help="disk usage by project, DCC folder, extension or kind (Temp, Tools, trash, UE generated)")
+    usage.add_argument("root", help="folder to scan, e.g. C:\\PMTTemp")
+    usage.add_argument("--by", choices=BREAKDOWNS, default="project")
+    usage.add_argument("--top", type=int, default=50, help="rows to show")
+    usage.add_argument("--workers", type=int, default=8)
+    usage.add_argument("--full", action="store_true", help="list every folder instead of reusing unchanged ones from the last scan")
+    usage.add_argument("--json", action="store_true")
+    usage.set_defaults(func=usageCommand)
+
+    # identical files
+    dedup = commands.add_parser("dedup", help="find identical files under a root and link them together")
+    dedup.add_argument("root", help="folder to search, e.g. C:\\PMTTemp")
+    dedup.add_argument("--apply", action="store_true", help="replace duplicates by links, without it only the report is printed")
+    dedup.add_argument("--strategy", choices=DEDUP_STRATEGIES, default="auto", help="auto only uses reflinks")
+    dedup.add_argument("--min-mb", type=float, default=DEFAULT_MIN_BYTES / 2**20, help="ignore smaller files")
+    dedup.add_argument("--top", type=int, default=20, help="groups to list")
+    dedup.add_argument("--workers", type=int, default=8)
+    dedup.set_defaults(func=dedupCommand)
+
+    # project archives
+    archive = commands.add_parser("archive", help="write a project to a .tar.gz or .zip without Temp contents and UE caches")
+    archive.add_argument("project", help="project folder")
+    archive.add_argument("output", help="archive to write, .tar.gz or .zip")
+    archive.add_argument("--exclude", action="append", default=[], help="also leave out this name or project-relative path, can be repeated")
+    archive.add_argument("--workers", type=int, default=ARCHIVE_WORKERS, help="threads compressing .tar.gz blocks")
+    archive.set_defaults(func=archiveCommand)
+
+    restore = commands.add_parser("restore", help="extract a project archive")
+    restore.add_argument("archive", help=".tar.gz or .zip written by archive")
+    restore.add_argument("--into", default=ROOT, help="folder the project folder is restored in")
+    restore.set_defaults(func=restoreCommand)
+
+    # mirroring
+    sync = commands.add_parser("sync", help="mirror a root into another folder, copying only what changed and renaming what was renamed")
+    sync.add_argument("source", help="root to mirror, e.g. C:\\PMTTemp")
+    sync.add_argument("target", help="folder mirroring it, e.g. a share")
+    sync.add_argument("--exclude", action="append", default=[], help="also leave out this name or root-relative path, can be repeated")
+    sync.add_argument("--hashes", action="store_true", help="keep content hashes, renames then also have to match content")
+    sync.add_argument("--verify", action="store_true", help="scan the target instead of trusting its manifest")
+    sync.add_argument("--dry-run", action="store_true", help="only print what would change")
+    sync.add_argument("--workers", type=int, default=SYNC_WORKERS, help="threads scanning and copying")
+    sync.set_defaults(func=syncCommand)
+
+    # Temp folder cleanup
+    temp = commands.add_parser("temp", help="report or remove old files in Temp folders, by the tempPolicy of ProjectConfig.xml")
+    temp.add_argument("root", help="folder to clean, e.g. C:\\PMTTemp")
+    temp.add_argument("--apply", action="store_true", help="remove the files, without it only the report is printed")
+    temp.add_argument("--max-age-days", type=float, default=None, help="remove files older than this")
+    temp.add_argument("--max-folder-mb", type=float, default=None, help="keep at most this much of the newest files per Temp folder")
+    temp.add_argument("--max-project-mb", type=float, default=None, help="keep at most this much of the newest files per project")
+    temp.add_argument("--exclude", action="append", default=[], help="project name or glob to leave alone, can be repeated")
+    temp.add_argument("--workers", type=int, default=8)
+    temp.add_argument("--ops-per-second", type=float, default=None, help="limit deletes per second")
+    temp.set_defaults(func=tempCommand)
+
+    # Maya scene dependencies
+    deps = commands.add_parser("deps", help="what the Maya ASCII scenes under a root reference, and which scenes use a file")
+    deps.add_argument("root", help="folder whose scenes are read, e.g. C:\\PMTTemp")
+    deps.add_argument("--uses", nargs="+", default=None, help="list the scenes using these files or anything in these folders")
+    deps.add_argument("--of", default=None, help="list what this scene references")
+    deps.add_argument("--missing", action="store_true", help="list references and file paths that don't exist")
+    deps.add_argument("--no-update", action="store_true", help="query without reading changed scenes first")
+    deps.add_argument("--workers", type=int, default=8, help="threads reading scenes")
+    deps.set_defaults(func=depsCommand)
+
+    # asset versions
+    versions = commands.add_parser("versions", help="save, list, open, restore or prune the saved versions of an asset")
+    versions.add_argument("action", choices=("save", "list", "open", "restore", "prune"))
+    versions.add_argument("path", help="the asset, e.g. C:\\PMTTemp\\MyProject\\ArtDepot\\Maya\\rig.ma")
+    versions.add_argument("number", nargs="?", type=int, default=None, help="open, restore: version number")
+    versions.add_argument("--note", default="", help="save: what changed")
+    versions.add_argument("--keep", type=int, default=10, help="prune: newest versions to keep")
+    versions.add_argument("--strategy", choices=VERSION_STRATEGIES, default=AUTO, help="save: reflink clones or content-addressed chunks")
+    versions.set_defaults(func=versionsCommand)
+
+    # asset thumbnails
+    previews = commands.add_parser("previews", help="fill, measure or clear the asset thumbnail cache")
+    previews.add_argument("action", choices=("warm", "size", "clear"))
+    previews.add_argument("directory", nargs="?", help="warm: folder whose assets get thumbnails")
+    previews.add_argument("--cache", default=None, help="cache folder, default: PMT_PREVIEW_CACHE or ~/.pmt/previews")
+    previews.add_argument("--workers", type=int, default=4)
+    previews.set_defaults(func=previewsCommand)
+
+    # timing summaries of traced runs
+    metrics = commands.add_parser("metrics", help="p50/p95 durations per operation from the metrics log of traced runs")
+    metrics.add_argument("--log", default=None, help="metrics log, default: PMT_METRICS_LOG or ~/.pmt/metrics.jsonl")
+    metrics.add_argument("--days", type=float, default=None, help="only operations from the last this many days")
+    metrics.add_argument("--json", action="store_true")
+    metrics.set_defaults(func=metricsCommand)
+
+    return parser
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    if args.tool_dir:
+        pmt.config.TOOL_DIR = os.path.abspath(args.tool_dir)
+    if args.trace:
+        pmt.trace.enable(args.trace)
+    try:
+        return args.func(args)
+    finally:
+        pmt.trace.flush()
@@ -0,0 +1,151 @@
+'''Clone strategies for copying large template trees'''
+import os
+
+import shutil
+
+import tempfile
+
+from fnmatch import fnmatch
+
+from pmt.trace import span
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+# ioctl request number for FICLONE on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+AUTO = "auto"
+STRATEGIES = (AUTO, REFLINK, HARDLINK, COPY)
+
+# files are written under this prefix next to their target, then renamed into place
+PART_PREFIX = ".pmt_part_"
+
+# template content that is never edited in place and can be shared between projects
+DEFAULT_HARDLINK_PATTERNS = ("DerivedDataCache/*",)
+
+def reflinkFile(src, dst):
+    '''clone src into dst sharing blocks, raises OSError if unsupported'''
+    with open(src, "rb") as srcFile, open(dst, "wb") as dstFile:
+        reflinkOpenFile(srcFile, dstFile)
+
+def reflinkOpenFile(srcFile, dstFile):
+    '''clone an open file into another one opened for writing, raises OSError if unsupported'''
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    fcntl.ioctl(dstFile.fileno(), FICLONE, srcFile.fileno())
+
+def sameDevice(source, target):
+    return os.stat(source).st_dev == os.stat(target).st_dev
+
+def supportedStrategies(source, target):
+    '''detect which strategies work between the source tree and target directory'''
+    supported = {COPY}
+
+    # links and clones never cross filesystems
+    if not sameDevice(source, target):
+        return supported
+
+    # probe with scratch files in the target directory
+    probeDir = tempfile.mkdtemp(prefix=".pmt_probe", dir=target)
+    try:
+        probe = os.path.join(probeDir, "probe")
+        with open(probe, "wb") as probeFile:
+            probeFile.write(b"pmt")
+
+        try:
+            os.link(probe, os.path.join(probeDir, "link"))
+            supported.add(HARDLINK)
+        except OSError:
+            pass
+
+        try:
+            reflinkFile(probe, os.path.join(probeDir, "clone"))
+            supported.add(REFLINK)
+        except OSError:
+            pass
+    finally:
+        shutil.rmtree(probeDir, ignore_errors=True)
+
+    return supported
+
+class Cloner():
+    '''copies a tree with reflinks, hardlinks for immutable files, or plain copies'''
+    def __init__(self, strategy=AUTO, hardlinkPatterns=DEFAULT_HARDLINK_PATTERNS):
+        if strategy not in STRATEGIES:
+            raise ValueError("unknown clone strategy '{}', expected one of {}".format(strategy, ", ".join(STRATEGIES)))
+
+        self.strategy = strategy
+        self.hardlinkPatterns = tuple(hardlinkPatterns)
+        self.source = None
+        self.resume = False
+        self.counts = {REFLINK: 0, HARDLINK: 0, COPY: 0}
+        self.bytes = {REFLINK: 0, HARDLINK: 0, COPY: 0}
+
+    def clone(self, source, target, resume=False):
+        '''copy the source directory to target, which must not exist yet
+
+        resume finishes an interrupted clone into an existing target, only creating the files
+        that are missing
+        '''
+        self.source = source
+        self.resume = resume
+        supported = supportedStrategies(source, os.path.dirname(os.path.abspath(target)))
+
+        # reflink everything it can; a hardlink shares the inode with the template and every
+        # other project, so AUTO only hardlinks files matched by the rules where there are no reflinks
+        self.useReflink = self.strategy in (AUTO, REFLINK) and REFLINK in supported
+        self.useHardlink = ((self.strategy == HARDLINK or (self.strategy == AUTO and not self.useReflink))
+                            and HARDLINK in supported and bool(self.hardlinkPatterns))
+
+        with span("clone.copytree", source=source, target=target) as cloneSpan:
+            shutil.copytree(source, target, copy_function=self.copyFile, dirs_exist_ok=resume)
+            cloneSpan.set(files=sum(self.counts.values()), bytes=sum(self.bytes.values()),
+                          reflinks=self.counts[REFLINK], hardlinks=self.counts[HARDLINK], copies=self.counts[COPY])
+        return target
+
+    def isImmutable(self, src):
+        '''check a template file against the hardlink glob rules'''
+        relPath = os.path.relpath(src, self.source).replace(os.sep, "/")
+        return any(fnmatch(relPath, pattern) for pattern in self.hardlinkPatterns)
+
+    def copyFile(self, src, dst):
+        '''copy_function for shutil.copytree'''
+        size = os.path.getsize(src)
+
+        # files only appear under their name once complete, so one that's there is either
+        # finished or edited since, and is never written over
+        if self.resume and os.path.lexists(dst):
+            return dst
+
+        part = os.path.join(os.path.dirname(dst), PART_PREFIX + os.path.basename(dst))
+        if self.useReflink:
+            try:
+                reflinkFile(src, part)
+                shutil.copystat(src, part)
+                os.replace(part, dst)
+                return self._count(REFLINK, size, dst)
+            except OSError:
+                # e.g. a file on a different subvolume, copy this one instead
+                pass
+
+        if self.useHardlink and self.isImmutable(src):
+            try:
+                os.link(src, dst)
+                return self._count(HARDLINK, size, dst)
+            except OSError:
+                pass
+
+        shutil.copy2(src, part)
+        os.replace(part, dst)
+        return self._count(COPY, size, dst)
+
+    def _count(self, method, size, dst):
+        self.counts[method] += 1
+        self.bytes[method] += size
+        return dst
@@ -0,0 +1,323 @@
+'''Process-wide cache of parsed tool config files and layered config resolution'''
+import os
+
+import re
+
+import threading
+
+import xml.etree.ElementTree as ET
+
+from collections import OrderedDict
+
+from pmt.trace import span
+
+# number of parsed configs kept in memory
+DEFAULT_CACHE_SIZE = 256
+
+# number of resolved directories kept in memory
+DEFAULT_RESOLVED_SIZE = 4096
+
+# folder holding ProjectConfig.xml, ConfigFileTemplate.xml, UE4Project and TemplateAssets,
+# the working directory unless set
+TOOL_DIR = None
+
+# root of every project, PMT_ROOT overrides it e.g. for benchmarks
+ROOT = os.environ.get("PMT_ROOT", "C:\\PMTTemp")
+
+# PMT's own folders under a root, e.g. the trash and the version stores
+PMT_PREFIX = ".pmt_"
+
+# config modes, set with the configMode attribute of ProjectConfig.xml
+COPY = "copy" # every folder gets its own copy of the config template
+LAYERED = "layered" # folders only hold a config to override their ancestors
+
+class ConfigError(LookupError):
+    '''raised when a config has no entry for a dcc, file type or template'''
+
+class ToolConfig():
+    '''parsed Tools/config.xml with hash indexes for the asset lookups'''
+    def __init__(self, path=None):
+        self.path = path
+        self.dccs = {} # dcc name -> dcc element, in config order
+
+        if path is not None:
+            root = ET.parse(path).getroot()
+            for dcc in root.iterfind("./applications/dcc"):
+                self.dccs.setdefault(dcc.get("name"), dcc)
+
+        self._index()
+
+    def _index(self):
+        self.versions = {} # dcc -> path of the first version
+        self.fileTypes = {} # dcc -> file types in config order
+        self.extensions = {} # lower case extension -> dcc
+        self.templates = {} # (dcc, assetType) -> template path
+
+        for name, dcc in self.dccs.items():
+            version = dcc.find("./version")
+            if version is not None:
+                self.versions[name] = version.text
+
+            self.fileTypes[name] = [fileType.text for fileType in dcc.iterfind("./fileType")]
+            for fileType in self.fileTypes[name]:
+                # first dcc listing an extension wins, like the xpath search did
+                self.extensions.setdefault(fileType.lower(), name)
+
+            for template in dcc.iterfind("./template"):
+                self.templates[(name, template.get("name"))] = template.text
+
+    def overlay(self, override):
+        '''new config where the dccs defined in override replace ours'''
+        merged = ToolConfig()
+        merged.path = override.path
+        merged.dccs = dict(self.dccs)
+        merged.dccs.update(override.dccs)
+        merged._index()
+        return merged
+
+    def dccForExtension(self, extension):
+        '''dcc that opens files with this extension, case insensitive'''
+        try:
+            return self.extensions[extension.lower()]
+        except KeyError:
+            raise ConfigError("no application for '{}' in {}".format(extension, self.path))
+
+    def applicationForExtension(self, extension):
+        '''path of the application version that opens this extension'''
+        dcc = self.dccForExtension(extension)
+        try:
+            return self.versions[dcc]
+        except KeyError:
+            raise ConfigError("no version for '{}' in {}".format(dcc, self.path))
+
+    def fileType(self, dcc):
+        '''default (first) file type of a dcc'''
+        fileTypes = self.fileTypes.get(dcc)
+        if not fileTypes:
+            raise ConfigError("no file type for '{}' in {}".format(dcc, self.path))
+        return fileTypes[0]
+
+    def template(self, dcc, assetType):
+        '''template file for an asset type of a dcc'''
+        try:
+            return self.templates[(dcc, assetType)]
+        except KeyError:
+            raise ConfigError("no '{}' template for '{}' in {}".format(assetType, dcc, self.path))
+
+class ConfigService():
+    '''LRU of parsed configs, keyed by path and invalidated when the file changes'''
+    def __init__(self, maxSize=DEFAULT_CACHE_SIZE):
+        self.maxSize = maxSize
+        self._cache = OrderedDict() # path -> (stamp, ToolConfig)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, stamp=None):
+        '''parsed config for path, parsing it only if it is new or changed'''
+        path = os.path.abspath(path)
+        if stamp is None:
+            stamp = fileStamp(path)
+
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry and entry[0] == stamp:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # parse outside the lock so other configs aren't held up
+        with span("config.parse", path=path):
+            config = ToolConfig(path)
+
+        with self._lock:
+            self._cache[path] = (stamp, config)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.maxSize:
+                self._cache.popitem(last=False)
+
+        return config
+
+    def invalidate(self, path=None):
+        '''drop one config, or everything'''
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(os.path.abspath(path), None)
+
+class ConfigResolver():
+    '''resolves the config of a directory from the configs above it, up to its PMT root'''
+    def __init__(self, service, maxSize=DEFAULT_RESOLVED_SIZE, roots=(ROOT,)):
+        self.service = service
+        self.maxSize = maxSize
+        self.roots = set(os.path.normcase(os.path.abspath(root)) for root in roots)
+        self._resolved = OrderedDict() # (directory, layered) -> (chain stamps, ToolConfig)
+        self._lock = threading.Lock()
+
+    def addRoot(self, root):
+        '''stop walking up at root, nothing above a PMT root configures it'''
+        with self._lock:
+            self.roots.add(os.path.normcase(os.path.abspath(root)))
+
+    def chain(self, directory):
+        '''(config path, stamp) of every level from directory up to its root, or the drive root outside one'''
+        levels = []
+        directory = os.path.abspath(directory)
+        while True:
+            configPath = folderConfigPath(directory)
+            levels.append((configPath, fileStamp(configPath, None)))
+
+            # every level is a stat, slow on shares
+            parent = os.path.dirname(directory)
+            if parent == directory or os.path.normcase(directory) in self.roots:
+                return levels
+            directory = parent
+
+    def findConfig(self, directory):
+        '''nearest config file at or above directory, None if there is none'''
+        for configPath, stamp in self.chain(directory):
+            if stamp is not None:
+                return configPath
+        return None
+
+    def resolve(self, directory, layered=True):
+        '''config of directory with overrides applied from the top down, or only the nearest one'''
+        directory = os.path.abspath(directory)
+        levels = tuple(self.chain(directory))
+        key = (directory, layered)
+
+        # reuse the memo unless a config on the chain was added, changed or removed
+        with self._lock:
+            entry = self._resolved.get(key)
+            if entry and entry[0] == levels:
+                self._resolved.move_to_end(key)
+                return entry[1]
+
+        resolved = None
+        if layered:
+            for configPath, stamp in reversed(levels):
+                if stamp is None:
+                    continue
+                layer = self.service.get(configPath, stamp)
+                resolved = layer if resolved is None else resolved.overlay(layer)
+        else:
+            for configPath, stamp in levels:
+                if stamp is not None:
+                    resolved = self.service.get(configPath, stamp)
+                    break
+
+        if resolved is None:
+            raise ConfigError("no Tools config at or above {}".format(directory))
+
+        with self._lock:
+            self._resolved[key] = (levels, resolved)
+            while len(self._resolved) > self.maxSize:
+                self._resolved.popitem(last=False)
+
+        return resolved
+
+    def invalidate(self):
+        with self._lock:
+            self._resolved.clear()
+
+def fileStamp(path, *default):
+    '''(mtime, size) of a file, used to notice changed configs'''
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        if default:
+            return default[0]
+        raise
+    return (stat.st_mtime_ns, stat.st_size)
+
+# shared by every Asset in the process
+configService = ConfigService()
+configResolver = ConfigResolver(configService)
+
+def toolPath(*parts):
+    '''path of a file shipped with the tool, parts may use either slash like the configs do'''
+    parts = [part for path in parts for part in re.split(r"[\\/]+", path) if part]
+    return os.path.join(TOOL_DIR or os.getcwd(), *parts)
+
+def folderConfigPath(folder):
+    '''location of a folder's tool config'''
+    return os.path.join(folder, "Tools", "config.xml")
+
+def getConfig(folder):
+    '''resolved config of a folder
+
+    layered mode layers its own config over its ancestors'. in copy mode every folder holds
+    a full copy, so only the nearest config counts: a copy that removed a dcc doesn't get it
+    back from above
+    '''
+    return configResolver.resolve(folder, layered=configMode() != COPY)
+
+# ProjectConfig.xml path -> (stamp, mode)
+_modes = {}
+
+def configMode(projectConfig=None):
+    '''config mode set on the root of ProjectConfig.xml, copy if unset'''
+    if projectConfig is None:
+        projectConfig = toolPath("ProjectConfig.xml")
+
+    stamp = fileStamp(projectConfig, None)
+    if stamp is None:
+        return COPY
+
+    # only reparse when the project config changed
+    cached = _modes.get(projectConfig)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    mode = ET.parse(projectConfig).getroot().get("configMode", COPY)
+    _modes[projectConfig] = (stamp, mode)
+    return mode
+
+def needsConfig(folder, mode=None):
+    '''whether a new folder should get its own copy of the config template'''
+    if (mode or configMode()) == COPY:
+        return True
+    return configResolver.findConfig(os.path.dirname(os.path.abspath(folder))) is None
+
+def collapseConfigs(root, dryRun=False):
+    '''remove configs that are byte-identical to the nearest config above them'''
+    root = os.path.abspath(root)
+    removed = []
+
+    # the config root inherits, if any
+    inherited = {}
+    above = configResolver.findConfig(os.path.dirname(root))
+    if above:
+        with open(above, "rb") as configFile:
+            inherited[root] = configFile.read()
+
+    for directory, dirs, files in os.walk(root, topdown=True):
+        # Tools folders hold the configs themselves, PMT's own folders (trash, versions,
+        # sync manifests) keep theirs so a restored folder comes back as it was
+        dirs[:] = [name for name in dirs if name != "Tools" and not name.startswith(PMT_PREFIX)]
+
+        content = inherited.get(directory)
+        configPath = folderConfigPath(directory)
+        try:
+            with open(configPath, "rb") as configFile:
+                own = configFile.read()
+        except FileNotFoundError:
+            own = None
+
+        if own is not None:
+            if own == content:
+                removed.append(configPath)
+                if not dryRun:
+                    os.remove(configPath)
+            else:
+                content = own
+
+        # children compare against the nearest remaining config
+        for name in dirs:
+            inherited[os.path.join(directory, name)] = content
+        inherited.pop(directory, None)
+
+    configResolver.invalidate()
+    return removed
@@ -0,0 +1,318 @@
+'''Finds identical files under a root and makes them share their storage
+
+files are only compared with files of the same size, then by a hash of their first
+PREFIX_BYTES, and only what still matches is hashed in full. hashes are kept in
+.pmt_dedup.db at the root with each file's size and mtime, so unchanged files are never
+read twice. Temp and Tools folders are left alone: a hardlinked config.xml would change
+every folder's config at once.
+
+duplicates are replaced by reflinks where the filesystem has them, which stay separate
+files that only share blocks until one is written. hardlinks work everywhere but are one
+file under several names, so PMT breaks the link before it opens one (breakLink)
+'''
+import hashlib
+
+import os
+
+import shutil
+
+import sqlite3
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.clone import REFLINK, HARDLINK, AUTO, reflinkFile, supportedStrategies
+
+from pmt.index import Crawler
+
+from pmt.trash import hidePath
+
+from pmt.trace import span
+
+DEDUP_NAME = ".pmt_dedup.db"
+
+# smaller files aren't worth a link
+DEFAULT_MIN_BYTES = 1 * 2**20
+
+DEFAULT_WORKERS = 8
+
+# bytes hashed to tell apart files of the same size before hashing them in full
+PREFIX_BYTES = 64 * 2**10
+
+CHUNK_BYTES = 1 * 2**20
+
+# replacement files are made next to the duplicate under this prefix
+TEMP_PREFIX = ".pmt_dedup_"
+
+STRATEGIES = (AUTO, REFLINK, HARDLINK)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    prefix TEXT,
+    digest TEXT
+);
+"""
+
+class DedupError(ValueError):
+    '''raised when duplicates can't be linked with the requested strategy'''
+
+def hashFile(path, limit=None):
+    '''blake2b of a file read in chunks, only the first limit bytes if given'''
+    digest = hashlib.blake2b(digest_size=20)
+    remaining = limit
+    with open(path, "rb") as hashedFile:
+        while remaining is None or remaining > 0:
+            chunk = hashedFile.read(CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+class HashStore():
+    '''content hashes of files, valid while a file's size and mtime are unchanged'''
+    def __init__(self, root, dbPath=None):
+        self.dbPath = dbPath or os.path.join(os.path.abspath(root), DEDUP_NAME)
+        self._lock = threading.Lock()
+
+        created = not os.path.exists(self.dbPath)
+        self.db = sqlite3.connect(self.dbPath, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+        if created:
+            hidePath(self.dbPath)
+
+    def get(self, path, size, mtime):
+        '''(prefix, digest) of a file if it hasn't changed since it was hashed, either may be None'''
+        with self._lock:
+            row = self.db.execute("SELECT size, mtime, prefix, digest FROM hashes WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime:
+            return None, None
+        return row[2], row[3]
+
+    def put(self, rows):
+        '''(path, size, mtime, prefix, digest) rows'''
+        with self._lock:
+            self.db.executemany("INSERT OR REPLACE INTO hashes (path, size, mtime, prefix, digest) VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+class DuplicateGroup():
+    '''files with the same content'''
+    def __init__(self, digest, size, files):
+        self.digest = digest
+        self.size = size
+        self.files = files # (path, mtime) as they were hashed, the first one is kept
+
+    @property
+    def paths(self):
+        return [path for path, mtime in self.files]
+
+    @property
+    def reclaimable(self):
+        '''bytes freed by linking, files already hardlinked together count once'''
+        inodes = set()
+        for path in self.paths:
+            try:
+                info = os.stat(path)
+                inodes.add((info.st_dev, info.st_ino))
+            except OSError:
+                continue
+        return self.size * max(0, len(inodes) - 1)
+
+    def __repr__(self):
+        return "DuplicateGroup({} x {} bytes)".format(len(self.files), self.size)
+
+class DedupReport():
+    '''duplicate groups under a root, biggest saving first'''
+    def __init__(self, root, groups, scanned, hashed):
+        self.root = root
+        self.groups = groups
+        self.scanned = scanned # files big enough to consider
+        self.hashed = hashed # files hashed in full, the rest came from the store or were told apart sooner
+
+    @property
+    def reclaimable(self):
+        return sum(group.reclaimable for group in self.groups)
+
+class DedupResult():
+    '''what dedupe did'''
+    def __init__(self):
+        self.linked = 0
+        self.bytes = 0
+        self.skipped = [] # (path, reason)
+
+def findDuplicates(root, minBytes=DEFAULT_MIN_BYTES, workers=DEFAULT_WORKERS, progress=None, store=None):
+    '''groups of identical files under root, without changing anything'''
+    root = os.path.abspath(root)
+    ownStore = store is None
+    store = store or HashStore(root)
+    try:
+        with span("dedup.find", path=root) as findSpan:
+            # only files sharing a size can be duplicates
+            bySize = {}
+            for directory, mtime, subdirs, files in Crawler(root, workers).crawl():
+                for name, size, fileMtime in files:
+                    if size >= minBytes:
+                        bySize.setdefault(size, []).append((os.path.join(directory, name), size, fileMtime))
+            candidates = [entry for entries in bySize.values() if len(entries) > 1 for entry in entries]
+            scanned = sum(len(entries) for entries in bySize.values())
+
+            known = dict((entry[0], store.get(*entry)) for entry in candidates)
+
+            def prefixOf(entry):
+                prefix, digest = known[entry[0]]
+                if prefix is None:
+                    prefix = hashFile(entry[0], PREFIX_BYTES)
+                    known[entry[0]] = (prefix, digest)
+                return entry, prefix
+
+            def digestOf(entry):
+                prefix, digest = known[entry[0]]
+                if digest is None:
+                    # a file that fits in the prefix was already read in full
+                    digest = prefix if entry[1] <= PREFIX_BYTES else hashFile(entry[0])
+                    known[entry[0]] = (prefix, digest)
+                return entry, digest
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                byPrefix = {}
+                for entry, prefix in pool.map(safely(prefixOf), candidates):
+                    if prefix is not None:
+                        byPrefix.setdefault((entry[1], prefix), []).append(entry)
+                if progress:
+                    progress(0, len(candidates))
+
+                matching = [entry for entries in byPrefix.values() if len(entries) > 1 for entry in entries]
+                hashed = sum(1 for entry in matching if known[entry[0]][1] is None and entry[1] > PREFIX_BYTES)
+                byDigest = {}
+                for done, (entry, digest) in enumerate(pool.map(safely(digestOf), matching)):
+                    if digest is not None:
+                        byDigest.setdefault((entry[1], digest), []).append(entry)
+                    if progress:
+                        progress(done + 1, len(matching))
+
+            store.put([entry + known[entry[0]] for entry in candidates])
+
+            groups = [DuplicateGroup(digest, size, sorted((entry[0], entry[2]) for entry in entries))
+                      for (size, digest), entries in byDigest.items() if len(entries) > 1]
+            groups.sort(key=lambda group: group.size * (len(group.files) - 1), reverse=True)
+            findSpan.set(files=scanned, candidates=len(candidates), hashed=hashed, groups=len(groups))
+    finally:
+        if ownStore:
+            store.close()
+    return DedupReport(root, groups, scanned, hashed)
+
+def sameContents(path, other):
+    '''whether two files hold the same bytes, read side by side'''
+    with open(path, "rb") as pathFile, open(other, "rb") as otherFile:
+        while True:
+            chunk = pathFile.read(CHUNK_BYTES)
+            if chunk != otherFile.read(CHUNK_BYTES):
+                return False
+            if not chunk:
+                return True
+
+def safely(hashOf):
+    '''hashOf returning (entry, None) for a file removed or locked while hashing'''
+    def wrapper(entry):
+        try:
+            return hashOf(entry)
+        except OSError:
+            return entry, None
+    return wrapper
+
+def dedupe(report, strategy=AUTO, progress=None):
+    '''replace duplicates by links to the first file of their group
+
+    files changed since they were hashed are skipped, and whole groups whose kept file changed;
+    contents are compared before each replacement, which is one rename so a duplicate is never missing
+    '''
+    if strategy == AUTO:
+        if REFLINK not in supportedStrategies(report.root, report.root):
+            raise DedupError("{} has no reflinks, hardlinks need strategy={}".format(report.root, HARDLINK))
+        strategy = REFLINK
+    if strategy not in (REFLINK, HARDLINK):
+        raise DedupError("unknown strategy '{}', use one of {}".format(strategy, ", ".join(STRATEGIES)))
+
+    result = DedupResult()
+    total = sum(len(group.files) - 1 for group in report.groups)
+    with span("dedup.link", path=report.root, strategy=strategy) as linkSpan:
+        for group in report.groups:
+            keeper, keeperMtime = group.files[0]
+            for path, mtime in group.files[1:]:
+                reason = linkDuplicate(keeper, keeperMtime, path, mtime, group.size, strategy)
+                if reason:
+                    result.skipped.append((path, reason))
+                else:
+                    result.linked += 1
+                    result.bytes += group.size
+                if progress:
+                    progress(result.linked + len(result.skipped), total)
+        linkSpan.set(linked=result.linked, bytes=result.bytes, skipped=len(result.skipped))
+    return result
+
+def linkDuplicate(keeper, keeperMtime, path, mtime, size, strategy):
+    '''replace path by a link to keeper, both as they were hashed; returns why it was skipped or None'''
+    try:
+        info = os.stat(path)
+        keeperInfo = os.stat(keeper)
+    except OSError as error:
+        return str(error)
+    if keeperInfo.st_size != size or keeperInfo.st_mtime != keeperMtime:
+        return "{} changed since it was hashed".format(keeper)
+    if info.st_size != size or info.st_mtime != mtime:
+        return "changed since it was hashed"
+    if (info.st_dev, info.st_ino) == (keeperInfo.st_dev, keeperInfo.st_ino):
+        return "already linked"
+
+    temp = os.path.join(os.path.dirname(path), TEMP_PREFIX + os.path.basename(path))
+    try:
+        if strategy == HARDLINK:
+            os.link(keeper, temp)
+        else:
+            reflinkFile(keeper, temp)
+            # the duplicate keeps its own dates and permissions
+            shutil.copystat(path, temp)
+
+        # the bytes decide, not the hashes: the duplicate's own data is gone after the rename
+        if not sameContents(temp, path):
+            os.remove(temp)
+            return "contents differ from {}".format(keeper)
+        info = os.stat(path)
+        if info.st_size != size or info.st_mtime != mtime:
+            os.remove(temp)
+            return "changed since it was hashed"
+        os.replace(temp, path)
+    except OSError as error:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return str(error)
+    return None
+
+def breakLink(path):
+    '''give a hardlinked file its own copy before it's opened for writing, True if it had to'''
+    try:
+        if os.stat(path).st_nlink < 2:
+            return False
+    except OSError:
+        return False
+
+    temp = os.path.join(os.path.dirname(path), TEMP_PREFIX + os.path.basename(path))
+    with span("dedup.break", path=path):
+        shutil.copy2(path, temp)
+        os.replace(temp, path)
+    return True
@@ -0,0 +1,397 @@
+'''Dependency graph of Maya ASCII scenes: the scenes they reference and the files they read
+
+.ma files are memory mapped and searched with expressions anchored at line starts, so a
+scene of hundreds of MB is paged through rather than read in. two kinds of statements
+make edges:
+
+  file -rdi 1 -ns "rig" -rfn "rigRN" -typ "mayaAscii" "C:/PMTTemp/Hero/ArtDepot/Maya/rig.ma";
+  setAttr ".ftn" -type "string" "sourceimages/wood.png";
+
+references (file -r, and the -rdi placeholders written before them), and the paths of
+file textures, image planes, caches and other nodes with a file name attribute. relative
+paths are resolved from the scene's folder, then the folders above it (a Maya project's
+workspace). edges are kept in .pmt_deps.db at the root, and a scene is parsed again only
+when its size or mtime change
+'''
+import mmap
+
+import os
+
+import re
+
+import sqlite3
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.index import Crawler, escapeLike
+
+from pmt.trash import hidePath
+
+from pmt.trace import span
+
+DEPS_NAME = ".pmt_deps.db"
+
+SCENE_EXTENSIONS = (".ma",)
+
+DEFAULT_WORKERS = 8
+
+# edge kinds
+REFERENCE = "reference"
+FILE = "file"
+
+# rewritten scenes are written next to the original under this prefix
+TEMP_PREFIX = ".pmt_deps_"
+
+# a whole file command, quoted strings may hold ';' e.g. -op "v=0;"
+FILE_COMMAND = re.compile(rb'^[ \t]*file[ \t](?:[^;"]|"(?:[^"\\]|\\.)*")*;', re.MULTILINE)
+
+REFERENCE_FLAG = re.compile(rb'[ \t]-(?:r|rdi|reference|referenceDepthInfo)[ \t]')
+
+QUOTED = re.compile(rb'"((?:[^"\\]|\\.)*)"')
+
+# string attributes holding a path: file texture, image plane, gpu/alembic cache, cache file
+PATH_ATTRIBUTE = re.compile(rb'^[ \t]*setAttr[ \t]+"\.(?:ftn|fileTextureName|imn|imageName|cfn|cacheFileName|fn)"[ \t]+-type[ \t]+"string"[ \t]+"((?:[^"\\]|\\.)*)"', re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edges (
+    scene TEXT NOT NULL,
+    target TEXT NOT NULL,
+    targetKey TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edgesTarget ON edges (targetKey);
+CREATE INDEX IF NOT EXISTS edgesScene ON edges (scene);
+"""
+
+def pathKey(path):
+    return os.path.normcase(os.path.normpath(path))
+
+def isAbsolute(path):
+    # Windows drive paths count on every platform, scenes travel between machines
+    return os.path.isabs(path) or re.match(r"^[A-Za-z]:[\\/]", path) is not None
+
+def decode(raw):
+    '''a path as written in the scene, Maya escapes backslashes in strings'''
+    return raw.decode("utf-8", "surrogateescape").replace("\\\\", "\\")
+
+def resolvePath(path, scene):
+    '''absolute path a scene's reference or file name points at'''
+    path = os.path.expandvars(path)
+    if isAbsolute(path):
+        return os.path.normpath(path)
+
+    # relative to the scene, else to the nearest folder above it where it exists
+    relative = os.path.normpath(path.replace("\\", "/"))
+    folder = os.path.dirname(os.path.abspath(scene))
+    base = folder
+    while True:
+        if os.path.exists(os.path.join(base, relative)):
+            return os.path.normpath(os.path.join(base, relative))
+        parent = os.path.dirname(base)
+        if parent == base:
+            return os.path.normpath(os.path.join(folder, relative))
+        base = parent
+
+def parseScene(path):
+    '''(kind, raw path, resolved path) of everything a .ma scene depends on'''
+    edges = []
+    seen = set()
+
+    def add(kind, raw):
+        raw = decode(raw)
+        if raw and (kind, raw) not in seen:
+            seen.add((kind, raw))
+            edges.append((kind, raw, resolvePath(raw, path)))
+
+    with open(path, "rb") as sceneFile:
+        if os.fstat(sceneFile.fileno()).st_size == 0:
+            return edges
+        with mmap.mmap(sceneFile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in FILE_COMMAND.finditer(data):
+                command = match.group(0)
+                if REFERENCE_FLAG.search(command):
+                    # the path is the last argument
+                    strings = QUOTED.findall(command)
+                    if strings:
+                        add(REFERENCE, strings[-1])
+            for match in PATH_ATTRIBUTE.finditer(data):
+                add(FILE, match.group(1))
+    return edges
+
+class Dependency():
+    '''a scene depending on a file'''
+    def __init__(self, scene, target, kind, raw):
+        self.scene = scene
+        self.target = target # absolute
+        self.kind = kind # REFERENCE or FILE
+        self.raw = raw # as written in the scene
+
+    def __repr__(self):
+        return "Dependency({} -> {})".format(self.scene, self.target)
+
+class DependencyGraph():
+    '''what the scenes under a root reference, cached in SQLite and updated incrementally'''
+    def __init__(self, root, dbPath=None, workers=DEFAULT_WORKERS):
+        self.root = os.path.abspath(root)
+        self.dbPath = dbPath or os.path.join(self.root, DEPS_NAME)
+        self.workers = workers
+        self._lock = threading.RLock()
+
+        created = not os.path.exists(self.dbPath)
+        self.db = sqlite3.connect(self.dbPath, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+        if created:
+            hidePath(self.dbPath)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def findScenes(self):
+        '''(path, size, mtime) of every scene under the root'''
+        for directory, mtime, subdirs, files in Crawler(self.root, self.workers).crawl():
+            for name, size, fileMtime in files:
+                if os.path.splitext(name)[1].lower() in SCENE_EXTENSIONS:
+                    yield os.path.join(directory, name), size, fileMtime
+
+    def update(self, scenes=None, progress=None):
+        '''parse the scenes that are new or changed, drop the ones gone; returns (parsed, removed)
+
+        scenes are (path, size, mtime) of every scene under the root, found with a crawl if not given
+        '''
+        scenes = list(self.findScenes() if scenes is None else scenes)
+        with self._lock:
+            known = dict((row[0], (row[1], row[2])) for row in self.db.execute("SELECT path, size, mtime FROM scenes"))
+        current = set(path for path, size, mtime in scenes)
+        changed = [scene for scene in scenes if known.get(scene[0]) != (scene[1], scene[2])]
+        removed = [path for path in known if path not in current]
+        with span("deps.update", path=self.root) as updateSpan:
+            self._apply(changed, removed, progress)
+            updateSpan.set(scenes=len(scenes), parsed=len(changed), removed=len(removed))
+        return len(changed), len(removed)
+
+    def updateFolders(self, folders, progress=None):
+        '''update the scenes directly in folders, e.g. the ones an IndexWatcher pass changed; returns (parsed, removed)
+
+        only those folders are listed and only their rows are read, a folder that is gone drops
+        every scene below it
+        '''
+        changed = []
+        removed = []
+        scenes = 0
+        for folder in set(os.path.abspath(folder) for folder in folders):
+            with self._lock:
+                # a range over the primary key, rather than a LIKE that can't use it
+                rows = self.db.execute("SELECT path, size, mtime FROM scenes WHERE path > ? AND path < ?",
+                                       (folder + os.sep, folder + chr(ord(os.sep) + 1))).fetchall()
+            try:
+                entries = [entry for entry in os.scandir(folder) if os.path.splitext(entry.name)[1].lower() in SCENE_EXTENSIONS]
+            except (FileNotFoundError, NotADirectoryError):
+                removed.extend(row[0] for row in rows)
+                continue
+            current = {}
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        info = entry.stat()
+                        current[entry.path] = (info.st_size, info.st_mtime)
+                except FileNotFoundError:
+                    # gone since it was listed, dropped below
+                    pass
+            known = dict((row[0], (row[1], row[2])) for row in rows if os.path.dirname(row[0]) == folder)
+            changed.extend((path, size, mtime) for path, (size, mtime) in current.items() if known.get(path) != (size, mtime))
+            removed.extend(path for path in known if path not in current)
+            scenes += len(current)
+
+        with span("deps.update", path=self.root) as updateSpan:
+            self._apply(changed, removed, progress)
+            updateSpan.set(folders=len(folders), scenes=scenes, parsed=len(changed), removed=len(removed))
+        return len(changed), len(removed)
+
+    def _apply(self, changed, removed, progress=None):
+        '''parse the changed (path, size, mtime) scenes in parallel and forget the removed ones'''
+        def parse(scene):
+            try:
+                return scene, parseScene(scene[0])
+            except OSError:
+                # removed or locked while parsing, tried again next update
+                return scene, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            batch = []
+            for done, (scene, edges) in enumerate(pool.map(parse, changed)):
+                if edges is not None:
+                    batch.append((scene, edges))
+                if len(batch) >= 100:
+                    self._write(batch)
+                    batch = []
+                if progress:
+                    progress(done + 1, len(changed))
+            self._write(batch)
+
+        with self._lock:
+            for path in removed:
+                self.db.execute("DELETE FROM edges WHERE scene = ?", (path,))
+                self.db.execute("DELETE FROM scenes WHERE path = ?", (path,))
+            self.db.commit()
+
+    def updateFromIndex(self, index, progress=None):
+        '''update from the scenes an AssetIndex knows, without crawling the root'''
+        scenes = [(record.path, record.size, record.mtime) for extension in SCENE_EXTENSIONS
+                  for record in index.query(extension=extension)]
+        return self.update(scenes, progress)
+
+    def refreshScene(self, path):
+        '''parse one scene again, e.g. after rewriting it'''
+        info = os.stat(path)
+        self._write([((path, info.st_size, info.st_mtime), parseScene(path))])
+
+    def _write(self, batch):
+        with self._lock:
+            for (path, size, mtime), edges in batch:
+                self.db.execute("DELETE FROM edges WHERE scene = ?", (path,))
+                self.db.executemany("INSERT INTO edges (scene, target, targetKey, kind, raw) VALUES (?, ?, ?, ?, ?)",
+                                    [(path, target, pathKey(target), kind, raw) for kind, raw, target in edges])
+                self.db.execute("INSERT OR REPLACE INTO scenes (path, size, mtime) VALUES (?, ?, ?)", (path, size, mtime))
+            self.db.commit()
+
+    def dependents(self, paths, ignoreInside=False):
+        '''Dependency of every scene using one of paths, or anything inside them if they're folders
+
+        ignoreInside leaves out scenes that are among paths themselves, e.g. when they're deleted too
+        '''
+        found = []
+        keys = [pathKey(os.path.abspath(path)) for path in paths]
+        with self._lock:
+            for key in keys:
+                rows = self.db.execute("SELECT scene, target, kind, raw FROM edges WHERE targetKey = ? OR targetKey LIKE ? ESCAPE '\\' ORDER BY scene",
+                                       (key, escapeLike(key + os.sep) + "%")).fetchall()
+                found.extend(Dependency(*row) for row in rows)
+        if ignoreInside:
+            found = [dependency for dependency in found if not insidePaths(pathKey(dependency.scene), keys)]
+        return found
+
+    def dependencies(self, scene):
+        '''Dependency of everything a scene uses'''
+        with self._lock:
+            rows = self.db.execute("SELECT scene, target, kind, raw FROM edges WHERE scene = ? ORDER BY kind, target",
+                                   (os.path.abspath(scene),)).fetchall()
+        return [Dependency(*row) for row in rows]
+
+    def scenesIn(self, paths):
+        '''scenes that are among paths or inside them'''
+        keys = [pathKey(os.path.abspath(path)) for path in paths]
+        with self._lock:
+            scenes = [row[0] for row in self.db.execute("SELECT path FROM scenes")]
+        return [scene for scene in scenes if insidePaths(pathKey(scene), keys)]
+
+    def missing(self):
+        '''Dependency of every reference or file that doesn't exist'''
+        with self._lock:
+            rows = self.db.execute("SELECT scene, target, kind, raw FROM edges ORDER BY scene").fetchall()
+        return [Dependency(*row) for row in rows if not os.path.exists(row[1])]
+
+def insidePaths(key, keys):
+    return any(key == other or key.startswith(other + os.sep) for other in keys)
+
+def rebase(path, renames):
+    '''where path is after renames of it or a folder above it, path if none applies'''
+    key = pathKey(path)
+    for old, new in renames:
+        oldKey = pathKey(old)
+        if key == oldKey:
+            return new
+        if key.startswith(oldKey + os.sep):
+            return os.path.join(new, path[len(oldKey) + 1:])
+    return path
+
+def rewrittenPath(dependency, renames):
+    '''what a scene should say once renames ran, relative paths stay relative'''
+    raw = dependency.raw
+    newTarget = rebase(dependency.target, renames)
+    if "$" not in raw and not isAbsolute(raw):
+        # the folder the path was resolved from, wherever it is now
+        base = os.path.dirname(dependency.scene)
+        while True:
+            if pathKey(os.path.join(base, raw.replace("\\", "/"))) == pathKey(dependency.target):
+                try:
+                    return os.path.relpath(newTarget, rebase(base, renames)).replace(os.sep, "/")
+                except ValueError:
+                    # moved to another drive
+                    break
+            parent = os.path.dirname(base)
+            if parent == base:
+                break
+            base = parent
+    # Maya writes forward slashes, they need no escaping
+    return newTarget.replace("\\", "/")
+
+def rewriteScene(path, replacements):
+    '''replace quoted paths in a scene, streamed line by line; returns how many lines changed'''
+    quoted = [(b'"' + old + b'"', b'"' + new + b'"') for old, new in replacements.items()]
+    temp = os.path.join(os.path.dirname(path), TEMP_PREFIX + os.path.basename(path))
+    changed = 0
+    try:
+        with open(path, "rb") as source, open(temp, "wb") as target:
+            for line in source:
+                if b'"' in line:
+                    before = line
+                    for old, new in quoted:
+                        if old in line:
+                            line = line.replace(old, new)
+                    changed += line is not before
+                target.write(line)
+        # a new file, so hardlinked copies of the scene are left as they were
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    return changed
+
+def rewriteReferences(graph, renames, progress=None):
+    '''fix the paths in scenes broken by renamed files or folders, after the renames ran
+
+    that's the scenes using what was renamed, and the relative paths of scenes that moved;
+    renames are (old path, new path), returns (scenes rewritten, references updated)
+    '''
+    olds = [old for old, new in renames]
+    byScene = {}
+    for dependency in graph.dependents(olds) + [dependency for scene in graph.scenesIn(olds) for dependency in graph.dependencies(scene)]:
+        byScene.setdefault(dependency.scene, {})[dependency.raw] = dependency
+
+    updated = 0
+    with span("deps.rewrite", scenes=len(byScene)) as rewriteSpan:
+        rewritten = 0
+        for done, (scene, dependencies) in enumerate(sorted(byScene.items())):
+            replacements = {}
+            for raw, dependency in dependencies.items():
+                newRaw = rewrittenPath(dependency, renames)
+                if pathKey(newRaw) != pathKey(raw.replace("\\", "/")):
+                    # written back as Maya would, with backslashes escaped
+                    replacements[raw.replace("\\", "\\\\").encode("utf-8", "surrogateescape")] = newRaw.replace("\\", "\\\\").encode("utf-8", "surrogateescape")
+
+            # the scene may have moved too
+            path = rebase(scene, renames)
+            if replacements:
+                updated += rewriteScene(path, replacements)
+                rewritten += 1
+            graph.refreshScene(path)
+            if progress:
+                progress(done + 1, len(byScene))
+        rewriteSpan.set(references=updated)
+    return rewritten, updated
@@ -0,0 +1,1311 @@
+'''Main window of the Project Management Tool, the only module that loads PyQt5'''
+import os
+
+import sqlite3
+
+import sys
+
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from pmt.models import Folder, Project, Asset, ROOT, ensureRoot, createAssets, expandNames, deleteAll, checkNewProject
+
+from pmt.journal import Journal
+
+from pmt.jobs import Job, JobQueue
+
+from pmt.trash import Trash, TrashPurger
+
+from pmt.index import AssetIndex, IndexWatcher
+
+from pmt.launcher import appLauncher
+
+from pmt.treemodel import ProjectTreeModel
+
+from pmt.previews import PreviewService, hasExtractor
+
+from pmt.rename import RenamePattern, RenameError, planRenames, applyRenames
+
+from pmt.usage import scanUsage, formatBytes, BREAKDOWNS
+
+from pmt.archive import archiveProject, restoreArchive
+
+from pmt.tempgc import TempPolicy, TempCollector, planCollection, collect
+
+from pmt.deps import DependencyGraph, rewriteReferences
+
+from pmt.versions import VersionStore
+
+class JobSignals(QtCore.QObject):
+    '''carries job updates from the worker threads to the GUI thread'''
+    jobChanged = QtCore.pyqtSignal(object)
+
+class TempSignals(QtCore.QObject):
+    '''carries the Temp collector's passes from its thread to the GUI thread'''
+    collected = QtCore.pyqtSignal(object, object)
+
+class PreviewSignals(QtCore.QObject):
+    '''carries finished thumbnails from the preview workers to the GUI thread'''
+    previewReady = QtCore.pyqtSignal(object, object)
+
+def scalePreview(data, size):
+    '''PNG bytes of an image scaled to fit size, QImage is safe to use off the GUI thread'''
+    image = QtGui.QImage.fromData(data)
+    if image.isNull():
+        return None
+    image = image.scaled(size, size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+    buffer = QtCore.QBuffer()
+    buffer.open(QtCore.QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(buffer.data())
+
+class RenamePreviewDialog(QtWidgets.QDialog):
+    '''old and new names of a batch rename, the rename only runs if nothing conflicts'''
+    def __init__(self, paths, text, parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.plan = None
+        self.setWindowTitle("Rename {} item(s)".format(len(paths)))
+        self.resize(560, 420)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        # pattern, find and replace, planned again once typing pauses
+        form = QtWidgets.QFormLayout()
+        self.patternField = QtWidgets.QLineEdit(RenamePattern.fromField(text, len(paths)).template, self)
+        self.patternField.setToolTip("tokens: {name} {ext} {parent} {date} {n} {n:3}, cases: {name:upper} {name:lower} {name:title}")
+        self.findField = QtWidgets.QLineEdit(self)
+        self.findField.setPlaceholderText("regular expression, optional")
+        self.replaceField = QtWidgets.QLineEdit(self)
+        self.startField = QtWidgets.QSpinBox(self)
+        self.startField.setRange(0, 10**6)
+        self.startField.setValue(1)
+        form.addRow("Pattern:", self.patternField)
+        form.addRow("Find:", self.findField)
+        form.addRow("Replace:", self.replaceField)
+        form.addRow("Start at:", self.startField)
+        layout.addLayout(form)
+
+        self.table = QtWidgets.QTableWidget(0, 2, self)
+        self.table.setHorizontalHeaderLabels(["Old name", "New name"])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.summary = QtWidgets.QLabel(self)
+        layout.addWidget(self.summary)
+
+        self.buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel, self)
+        self.buttons.button(QtWidgets.QDialogButtonBox.Ok).setText("Rename")
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+
+        self.planTimer = QtCore.QTimer(self)
+        self.planTimer.setSingleShot(True)
+        self.planTimer.setInterval(150)
+        self.planTimer.timeout.connect(self.replan)
+        for field in (self.patternField, self.findField, self.replaceField):
+            field.textChanged.connect(self.planTimer.start)
+        self.startField.valueChanged.connect(self.planTimer.start)
+        self.replan()
+
+    def replan(self):
+        '''plan the renames in memory and show them, conflicts in red'''
+        self.plan = None
+        try:
+            pattern = RenamePattern(self.patternField.text(), self.findField.text() or None,
+                                    self.replaceField.text(), self.startField.value())
+            self.plan = planRenames(self.paths, pattern)
+        except RenameError as error:
+            self.table.setRowCount(0)
+            self.summary.setText(str(error))
+            self.buttons.button(QtWidgets.QDialogButtonBox.Ok).setEnabled(False)
+            return
+
+        rows = [(old, os.path.basename(new), None) for old, new in self.plan.renames]
+        rows += [(path, reason, True) for path, reason in self.plan.conflicts]
+        self.table.setRowCount(len(rows))
+        for row, (old, new, conflict) in enumerate(rows):
+            self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(os.path.basename(old)))
+            item = QtWidgets.QTableWidgetItem(new)
+            if conflict:
+                item.setForeground(QtGui.QBrush(QtCore.Qt.red))
+            self.table.setItem(row, 1, item)
+
+        self.summary.setText("{} to rename, {} unchanged, {} conflict(s), {} swapped through temporary names".format(
+            len(self.plan.renames), len(self.plan.unchanged), len(self.plan.conflicts), len(self.plan.chained)))
+        self.buttons.button(QtWidgets.QDialogButtonBox.Ok).setEnabled(self.plan.ok and bool(self.plan.renames))
+
+class UsageItem(QtWidgets.QTreeWidgetItem):
+    '''usage row sorting by the numbers behind its size and file count columns'''
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn()
+        if column == 0:
+            return self.text(0).lower() < other.text(0).lower()
+        return self.data(column, QtCore.Qt.UserRole) < other.data(column, QtCore.Qt.UserRole)
+
+'''*** Code converted from QT Designer ***'''
+# GUI Class
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        '''sets up the ui'''
+        # background jobs for every filesystem operation
+        self.jobs = JobQueue()
+        self.jobSignals = JobSignals()
+        self.jobSignals.jobChanged.connect(self.jobChanged)
+        self.jobs.listeners.append(self.jobSignals.jobChanged.emit)
+        self.jobRows = {}
+        self.jobCallbacks = {}
+
+        # deleted folders go to the trash, emptied by the purger at a throttled rate
+        self.trash = Trash(ROOT)
+        self.purger = TrashPurger(self.trash, opsPerSecond=500).start()
+
+        # Temp folders are cleaned up on a schedule once the root is ready
+        self.tempCollector = None
+        self.tempSignals = TempSignals()
+        self.tempSignals.collected.connect(self.tempCollected)
+        self.tempReport = None
+
+        # asset index for the search box, opened once the root is ready
+        self.assetIndex = None
+        self.indexWatcher = None
+
+        # scenes and what they reference, consulted before renames and deletes
+        self.dependencyGraph = None
+
+        # thumbnails of the current asset, generated in the background
+        self.previews = PreviewService(scale=scalePreview)
+        self.previewSignals = PreviewSignals()
+        self.previewSignals.previewReady.connect(self.previewReady)
+        self.previewPath = None
+        self.revealingPath = None # search result being selected in the tree
+
+        # Main Window
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(343, 513)
+
+        # Main widget
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+
+        self.horizontalLayout = QtWidgets.QHBoxLayout(self.centralwidget)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+
+        self.verticalLayout = QtWidgets.QVBoxLayout()
+        self.verticalLayout.setObjectName("verticalLayout")
+
+        #Tab Widget
+        self.tabWidget = QtWidgets.QTabWidget(self.centralwidget)
+        self.tabWidget.setEnabled(True)
+
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.tabWidget.sizePolicy().hasHeightForWidth())
+
+        self.tabWidget.setSizePolicy(sizePolicy)
+        self.tabWidget.setObjectName("tabWidget")
+
+
+        '''*******Projects tab********'''
+        self.projectsTab = QtWidgets.QWidget()
+        self.projectsTab.setObjectName("projectsTab")
+
+        self.verticalLayout_4 = QtWidgets.QVBoxLayout(self.projectsTab)
+        self.verticalLayout_4.setObjectName("verticalLayout_4")
+
+        self.projectsLayout = QtWidgets.QVBoxLayout()
+        self.projectsLayout.setObjectName("projectsLayout")
+
+        # New Project Box
+        self.newProjectBox = QtWidgets.QGroupBox(self.projectsTab)
+
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.newProjectBox.sizePolicy().hasHeightForWidth())
+        self.newProjectBox.setSizePolicy(sizePolicy)
+        self.newProjectBox.setMinimumSize(QtCore.QSize(0, 86))
+        self.newProjectBox.setObjectName("newProjectBox")
+
+        self.newProjectLayout = QtWidgets.QGridLayout(self.newProjectBox)
+        self.newProjectLayout.setSizeConstraint(QtWidgets.QLayout.SetDefaultConstraint)
+        self.newProjectLayout.setObjectName("newProjectLayout")
+
+        self.newProjectBoxLayout = QtWidgets.QVBoxLayout()
+        self.newProjectBoxLayout.setSizeConstraint(QtWidgets.QLayout.SetDefaultConstraint)
+        self.newProjectBoxLayout.setObjectName("newProjectBoxLayout")
+
+        self.newProjectNameLayout = QtWidgets.QHBoxLayout()
+        self.newProjectNameLayout.setObjectName("newProjectNameLayout")
+
+        self.newProjectLabel = QtWidgets.QLabel(self.newProjectBox)
+        self.newProjectLabel.setObjectName("newProjectLabel")
+        self.newProjectNameLayout.addWidget(self.newProjectLabel, 0, QtCore.Qt.AlignVCenter)
+
+        self.newProjectField = QtWidgets.QLineEdit(self.newProjectBox)
+        self.newProjectField.setMinimumSize(QtCore.QSize(0, 20))
+        self.newProjectField.setObjectName("newProjectField")
+        self.newProjectNameLayout.addWidget(self.newProjectField)
+        self.newProjectBoxLayout.addLayout(self.newProjectNameLayout)
+
+        self.createProject = QtWidgets.QPushButton(self.newProjectBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.createProject.sizePolicy().hasHeightForWidth())
+        self.createProject.setSizePolicy(sizePolicy)
+        self.createProject.setMinimumSize(QtCore.QSize(100, 23))
+        self.createProject.setObjectName("createProject")
+        self.createProject.clicked.connect(self.newProjectClicked)
+
+        self.newProjectBoxLayout.addWidget(self.createProject, 0, QtCore.Qt.AlignHCenter)
+        self.newProjectLayout.addLayout(self.newProjectBoxLayout, 2, 0, 1, 1)
+        self.projectsLayout.addWidget(self.newProjectBox)
+
+        # Existing Project Box
+        self.existingProjectBox = QtWidgets.QGroupBox(self.projectsTab)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.existingProjectBox.sizePolicy().hasHeightForWidth())
+        self.existingProjectBox.setSizePolicy(sizePolicy)
+        self.existingProjectBox.setMinimumSize(QtCore.QSize(0, 0))
+        self.existingProjectBox.setObjectName("existingProjectBox")
+
+        self.newProjectLayout_4 = QtWidgets.QGridLayout(self.existingProjectBox)
+        self.newProjectLayout_4.setSizeConstraint(QtWidgets.QLayout.SetDefaultConstraint)
+        self.newProjectLayout_4.setObjectName("newProjectLayout_4")
+
+        self.existingProjectLayout = QtWidgets.QVBoxLayout()
+        self.existingProjectLayout.setObjectName("existingProjectLayout")
+        
+        # Project Directory
+        self.projectDirectory = QtWidgets.QTreeView(self.existingProjectBox)
+
+        # self.projectDirectory = QtWidgets.QTreeWidget(self.existingProjectBox)
+
+        '''**********adding project directory code here********'''
+        self.model = ProjectTreeModel(MainWindow) # file directory, root set in rootReady
+        # self.model.setSelectionMode(QtGui.QAbstractItemView.MultiSelection)
+        self.projectDirectory.setModel(self.model) #ties file directory to tree view
+        self.projectDirectory.setUniformRowHeights(True) # no per-row size hints in big folders
+        self.projectDirectory.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection) # allow multiple things selected
+        self.projectDirectory.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectItems) # selects by path
+
+        
+        self.projectDirectory.setObjectName("projectDirectory")
+        self.existingProjectLayout.addWidget(self.projectDirectory)
+
+        spacerItem = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.existingProjectLayout.addItem(spacerItem)
+
+        # Delete Selected Button
+        self.deleteSelectedButton = QtWidgets.QPushButton(self.existingProjectBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.deleteSelectedButton.sizePolicy().hasHeightForWidth())
+        self.deleteSelectedButton.setSizePolicy(sizePolicy)
+        self.deleteSelectedButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.deleteSelectedButton.setLayoutDirection(QtCore.Qt.LeftToRight)
+        self.deleteSelectedButton.setObjectName("deleteSelectedButton")
+        self.deleteSelectedButton.clicked.connect(self.deleteFolderClicked)
+        self.existingProjectLayout.addWidget(self.deleteSelectedButton, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem1 = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.existingProjectLayout.addItem(spacerItem1)
+
+        self.renameSelectedField = QtWidgets.QLineEdit(self.existingProjectBox)
+        self.renameSelectedField.setObjectName("renameSelectedField")
+        self.existingProjectLayout.addWidget(self.renameSelectedField)
+
+        # Rename Selected Button
+        self.renameSelectedButton = QtWidgets.QPushButton(self.existingProjectBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.renameSelectedButton.sizePolicy().hasHeightForWidth())
+        self.renameSelectedButton.setSizePolicy(sizePolicy)
+        self.renameSelectedButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.renameSelectedButton.setObjectName("renameSelectedButton")
+        self.renameSelectedButton.clicked.connect(self.renameFolderClicked)
+
+        self.existingProjectLayout.addWidget(self.renameSelectedButton, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem2 = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.existingProjectLayout.addItem(spacerItem2)
+
+        self.newFolderField = QtWidgets.QLineEdit(self.existingProjectBox)
+        self.newFolderField.setObjectName("newFolderField")
+        self.existingProjectLayout.addWidget(self.newFolderField)
+
+        # New Folder Button
+        self.newFolderButton = QtWidgets.QPushButton(self.existingProjectBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.newFolderButton.sizePolicy().hasHeightForWidth())
+        self.newFolderButton.setSizePolicy(sizePolicy)
+        self.newFolderButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.newFolderButton.setObjectName("newFolderButton")
+        self.newFolderButton.clicked.connect(self.newFolderClicked)
+
+        self.existingProjectLayout.addWidget(self.newFolderButton, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem3 = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.existingProjectLayout.addItem(spacerItem3)
+
+        # Archive Selected and Import Archive Buttons
+        self.archiveSelectedButton = QtWidgets.QPushButton(self.existingProjectBox)
+        self.archiveSelectedButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.archiveSelectedButton.setObjectName("archiveSelectedButton")
+        self.archiveSelectedButton.clicked.connect(self.archiveSelectedClicked)
+        self.existingProjectLayout.addWidget(self.archiveSelectedButton, 0, QtCore.Qt.AlignHCenter)
+
+        self.importArchiveButton = QtWidgets.QPushButton(self.existingProjectBox)
+        self.importArchiveButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.importArchiveButton.setObjectName("importArchiveButton")
+        self.importArchiveButton.clicked.connect(self.importArchiveClicked)
+        self.existingProjectLayout.addWidget(self.importArchiveButton, 0, QtCore.Qt.AlignHCenter)
+
+        self.newProjectLayout_4.addLayout(self.existingProjectLayout, 0, 0, 1, 1)
+        self.projectsLayout.addWidget(self.existingProjectBox)
+        self.verticalLayout_4.addLayout(self.projectsLayout)
+        self.tabWidget.addTab(self.projectsTab, "")
+
+        '''********* Assets Tab ********'''
+        self.assetsTab = QtWidgets.QWidget()
+        self.assetsTab.setObjectName("assetsTab")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.assetsTab)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.assetsLayout = QtWidgets.QVBoxLayout()
+        self.assetsLayout.setObjectName("assetsLayout")
+
+        # Directory Box
+        self.directoryBox = QtWidgets.QGroupBox(self.assetsTab)
+        self.directoryBox.setObjectName("directoryBox")
+        self.verticalLayout_8 = QtWidgets.QVBoxLayout(self.directoryBox)
+        self.verticalLayout_8.setObjectName("verticalLayout_8")
+
+        # Asset search
+        self.assetSearchField = QtWidgets.QLineEdit(self.directoryBox)
+        self.assetSearchField.setObjectName("assetSearchField")
+        self.assetSearchField.setClearButtonEnabled(True)
+        self.assetSearchField.textChanged.connect(self.assetSearchChanged)
+        self.verticalLayout_8.addWidget(self.assetSearchField)
+
+        # search again once typing pauses
+        self.assetSearchTimer = QtCore.QTimer(self.directoryBox)
+        self.assetSearchTimer.setSingleShot(True)
+        self.assetSearchTimer.setInterval(150)
+        self.assetSearchTimer.timeout.connect(self.searchAssets)
+
+        self.assetSearchResults = QtWidgets.QListWidget(self.directoryBox)
+        self.assetSearchResults.setObjectName("assetSearchResults")
+        self.assetSearchResults.setVisible(False)
+        self.assetSearchResults.itemClicked.connect(self.assetSearchResultClicked)
+        self.verticalLayout_8.addWidget(self.assetSearchResults)
+
+        self.assetDirectory = QtWidgets.QTreeView(self.directoryBox)
+        self.assetDirectory.setObjectName("assetDirectory")
+
+        '''***** added for folder directory****'''
+        self.assetDirectory.setModel(self.model)
+
+        self.assetDirectory.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection) # allow multiple things selected
+        self.assetDirectory.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectItems) # selects by path
+        self.assetDirectory.setUniformRowHeights(True)
+        
+        self.verticalLayout_8.addWidget(self.assetDirectory)
+
+        # Temp and Tools folders are hidden unless asked for
+        self.showUtilityCheck = QtWidgets.QCheckBox(self.directoryBox)
+        self.showUtilityCheck.setObjectName("showUtilityCheck")
+        self.showUtilityCheck.toggled.connect(self.model.setShowUtilityFolders)
+        self.verticalLayout_8.addWidget(self.showUtilityCheck)
+
+        # Asset preview, filled in when the current asset's thumbnail is ready
+        self.assetPreview = QtWidgets.QLabel(self.directoryBox)
+        self.assetPreview.setObjectName("assetPreview")
+        self.assetPreview.setAlignment(QtCore.Qt.AlignCenter)
+        self.assetPreview.setFixedHeight(128)
+        self.assetPreview.setVisible(False)
+        self.verticalLayout_8.addWidget(self.assetPreview)
+        self.assetDirectory.selectionModel().currentChanged.connect(self.assetCurrentChanged)
+        self.assetsLayout.addWidget(self.directoryBox)
+
+        # New Asset Box
+        self.newAssetBox = QtWidgets.QGroupBox(self.assetsTab)
+        self.newAssetBox.setObjectName("newAssetBox")
+        self.verticalLayout_9 = QtWidgets.QVBoxLayout(self.newAssetBox)
+        self.verticalLayout_9.setObjectName("verticalLayout_9")
+
+        self.assetTypeLabel = QtWidgets.QLabel(self.newAssetBox)
+        self.assetTypeLabel.setObjectName("assetTypeLabel")
+        self.verticalLayout_9.addWidget(self.assetTypeLabel)
+
+        self.newAssetType = QtWidgets.QComboBox(self.newAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.newAssetType.sizePolicy().hasHeightForWidth())
+        self.newAssetType.setSizePolicy(sizePolicy)
+        self.newAssetType.setMinimumSize(QtCore.QSize(100, 0))
+        self.newAssetType.setObjectName("newAssetType")
+        self.newAssetType.addItem("")
+        self.newAssetType.addItem("")
+        self.newAssetType.addItem("")
+        self.verticalLayout_9.addWidget(self.newAssetType, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem3 = QtWidgets.QSpacerItem(20, 5, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.verticalLayout_9.addItem(spacerItem3)
+
+        """**************Adding in asset software type*************"""
+        self.assetAppLabel = QtWidgets.QLabel(self.newAssetBox)
+        self.assetAppLabel.setObjectName("assetAppLabel")
+        self.verticalLayout_9.addWidget(self.assetAppLabel)
+
+        self.newAssetApp = QtWidgets.QComboBox(self.newAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.newAssetApp.sizePolicy().hasHeightForWidth())
+        self.newAssetApp.setSizePolicy(sizePolicy)
+        self.newAssetApp.setMinimumSize(QtCore.QSize(100, 0))
+        self.newAssetApp.setObjectName("newAssetType")
+        self.newAssetApp.addItem("")
+        self.newAssetApp.addItem("")
+        self.newAssetApp.addItem("")
+        self.verticalLayout_9.addWidget(self.newAssetApp, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem6 = QtWidgets.QSpacerItem(20, 5, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.verticalLayout_9.addItem(spacerItem6)
+
+        self.newAssetNameField = QtWidgets.QLineEdit(self.newAssetBox)
+        self.newAssetNameField.setText("")
+        self.newAssetNameField.setObjectName("newAssetNameField")
+        self.verticalLayout_9.addWidget(self.newAssetNameField)
+
+        # several assets at once from a name list or a numbered range
+        self.bulkAssetCheck = QtWidgets.QCheckBox(self.newAssetBox)
+        self.bulkAssetCheck.setObjectName("bulkAssetCheck")
+        self.bulkAssetCheck.toggled.connect(self.bulkAssetToggled)
+        self.verticalLayout_9.addWidget(self.bulkAssetCheck, 0, QtCore.Qt.AlignHCenter)
+
+        self.createAsset = QtWidgets.QPushButton(self.newAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.createAsset.sizePolicy().hasHeightForWidth())
+        self.createAsset.setSizePolicy(sizePolicy)
+        self.createAsset.setMinimumSize(QtCore.QSize(100, 0))
+        self.createAsset.setObjectName("createAsset")
+        self.createAsset.clicked.connect(self.newAssetClicked)
+
+        self.verticalLayout_9.addWidget(self.createAsset, 0, QtCore.Qt.AlignHCenter)
+
+        self.assetsLayout.addWidget(self.newAssetBox)
+
+        # Selected Asset Box
+        self.selectedAssetBox = QtWidgets.QGroupBox(self.assetsTab)
+        self.selectedAssetBox.setObjectName("selectedAssetBox")
+        self.verticalLayout_10 = QtWidgets.QVBoxLayout(self.selectedAssetBox)
+        self.verticalLayout_10.setObjectName("verticalLayout_10")
+
+        self.openAssetButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.openAssetButton.sizePolicy().hasHeightForWidth())
+        self.openAssetButton.setSizePolicy(sizePolicy)
+        self.openAssetButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.openAssetButton.setObjectName("openAssetButton")
+        self.openAssetButton.clicked.connect(self.openAssetClicked)
+
+        self.verticalLayout_10.addWidget(self.openAssetButton, 0, QtCore.Qt.AlignHCenter)
+
+        # saved versions of the selected asset
+
+        self.saveVersionButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        self.saveVersionButton.setSizePolicy(sizePolicy)
+        self.saveVersionButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.saveVersionButton.setObjectName("saveVersionButton")
+        self.saveVersionButton.clicked.connect(self.saveVersionClicked)
+        self.verticalLayout_10.addWidget(self.saveVersionButton, 0, QtCore.Qt.AlignHCenter)
+
+        self.openVersionButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        self.openVersionButton.setSizePolicy(sizePolicy)
+        self.openVersionButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.openVersionButton.setObjectName("openVersionButton")
+        self.openVersionButton.clicked.connect(self.openVersionClicked)
+        self.verticalLayout_10.addWidget(self.openVersionButton, 0, QtCore.Qt.AlignHCenter)
+
+        self.restoreVersionButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        self.restoreVersionButton.setSizePolicy(sizePolicy)
+        self.restoreVersionButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.restoreVersionButton.setObjectName("restoreVersionButton")
+        self.restoreVersionButton.clicked.connect(self.restoreVersionClicked)
+        self.verticalLayout_10.addWidget(self.restoreVersionButton, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem4 = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.verticalLayout_10.addItem(spacerItem4)
+
+        self.renameAssetField = QtWidgets.QLineEdit(self.selectedAssetBox)
+        self.renameAssetField.setObjectName("renameAssetField")
+        self.verticalLayout_10.addWidget(self.renameAssetField)
+
+        self.renameAssetButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.renameAssetButton.sizePolicy().hasHeightForWidth())
+        self.renameAssetButton.setSizePolicy(sizePolicy)
+        self.renameAssetButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.renameAssetButton.setObjectName("renameAssetButton")
+        self.renameAssetButton.clicked.connect(self.renameAssetClicked)
+
+        self.verticalLayout_10.addWidget(self.renameAssetButton, 0, QtCore.Qt.AlignHCenter)
+
+        spacerItem5 = QtWidgets.QSpacerItem(20, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Fixed)
+        self.verticalLayout_10.addItem(spacerItem5)
+
+        self.deleteAssetButton = QtWidgets.QPushButton(self.selectedAssetBox)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.deleteAssetButton.sizePolicy().hasHeightForWidth())
+        self.deleteAssetButton.setSizePolicy(sizePolicy)
+        self.deleteAssetButton.setMinimumSize(QtCore.QSize(100, 0))
+        self.deleteAssetButton.setObjectName("deleteAssetButton")
+        self.deleteAssetButton.clicked.connect(self.deleteAssetClicked)
+
+        self.verticalLayout_10.addWidget(self.deleteAssetButton, 0, QtCore.Qt.AlignHCenter)
+
+        self.assetsLayout.addWidget(self.selectedAssetBox)
+        self.verticalLayout_5.addLayout(self.assetsLayout)
+
+        self.tabWidget.addTab(self.assetsTab, "")
+
+        '''***** Usage Tab *****'''
+        self.usageTab = QtWidgets.QWidget()
+        self.usageTab.setObjectName("usageTab")
+        self.usageLayout = QtWidgets.QVBoxLayout(self.usageTab)
+        self.usageLayout.setObjectName("usageLayout")
+
+        # group by and scan
+        self.usageControls = QtWidgets.QHBoxLayout()
+        self.usageBreakdown = QtWidgets.QComboBox(self.usageTab)
+        self.usageBreakdown.setObjectName("usageBreakdown")
+        self.usageBreakdown.addItems(BREAKDOWNS)
+        self.usageBreakdown.currentTextChanged.connect(self.showUsage)
+        self.usageControls.addWidget(self.usageBreakdown)
+        self.usageScanButton = QtWidgets.QPushButton(self.usageTab)
+        self.usageScanButton.setObjectName("usageScanButton")
+        self.usageScanButton.clicked.connect(self.scanUsageClicked)
+        self.usageControls.addWidget(self.usageScanButton)
+        self.usageLayout.addLayout(self.usageControls)
+
+        self.usageTree = QtWidgets.QTreeWidget(self.usageTab)
+        self.usageTree.setObjectName("usageTree")
+        self.usageTree.setRootIsDecorated(False)
+        self.usageTree.setUniformRowHeights(True)
+        self.usageTree.setColumnCount(4)
+        self.usageTree.setSortingEnabled(True)
+        self.usageLayout.addWidget(self.usageTree)
+
+        self.usageSummary = QtWidgets.QLabel(self.usageTab)
+        self.usageSummary.setObjectName("usageSummary")
+        self.usageLayout.addWidget(self.usageSummary)
+        self.usageReport = None
+
+        # Temp folder stats, a cleanup preview and the cleanup itself
+        self.tempBox = QtWidgets.QGroupBox(self.usageTab)
+        self.tempBox.setObjectName("tempBox")
+        self.tempLayout = QtWidgets.QVBoxLayout(self.tempBox)
+        self.tempLayout.setObjectName("tempLayout")
+        self.tempStats = QtWidgets.QLabel(self.tempBox)
+        self.tempStats.setObjectName("tempStats")
+        self.tempStats.setWordWrap(True)
+        self.tempLayout.addWidget(self.tempStats)
+
+        self.tempTree = QtWidgets.QTreeWidget(self.tempBox)
+        self.tempTree.setObjectName("tempTree")
+        self.tempTree.setRootIsDecorated(False)
+        self.tempTree.setUniformRowHeights(True)
+        self.tempTree.setColumnCount(4)
+        self.tempTree.setSortingEnabled(True)
+        self.tempTree.setVisible(False)
+        self.tempLayout.addWidget(self.tempTree)
+
+        self.tempControls = QtWidgets.QHBoxLayout()
+        self.tempPreviewButton = QtWidgets.QPushButton(self.tempBox)
+        self.tempPreviewButton.setObjectName("tempPreviewButton")
+        self.tempPreviewButton.clicked.connect(self.tempPreviewClicked)
+        self.tempControls.addWidget(self.tempPreviewButton)
+        self.tempCleanButton = QtWidgets.QPushButton(self.tempBox)
+        self.tempCleanButton.setObjectName("tempCleanButton")
+        self.tempCleanButton.setEnabled(False)
+        self.tempCleanButton.clicked.connect(self.tempCleanClicked)
+        self.tempControls.addWidget(self.tempCleanButton)
+        self.tempLayout.addLayout(self.tempControls)
+        self.usageLayout.addWidget(self.tempBox)
+
+        self.tabWidget.addTab(self.usageTab, "")
+        self.verticalLayout.addWidget(self.tabWidget)
+
+        '''***** Jobs Box *****'''
+        self.jobsBox = QtWidgets.QGroupBox(self.centralwidget)
+        self.jobsBox.setObjectName("jobsBox")
+        self.jobsBox.setVisible(False)
+        self.jobsLayout = QtWidgets.QVBoxLayout(self.jobsBox)
+        self.jobsLayout.setObjectName("jobsLayout")
+        self.verticalLayout.addWidget(self.jobsBox)
+        self.horizontalLayout.addLayout(self.verticalLayout)
+
+        MainWindow.setCentralWidget(self.centralwidget)
+
+        '''***** Status Bar *****'''''
+        self.statusbar = QtWidgets.QStatusBar(MainWindow)
+        self.statusbar.setEnabled(False)
+        self.statusbar.setObjectName("statusbar")
+        MainWindow.setStatusBar(self.statusbar)
+
+        self.retranslateUi(MainWindow)
+        self.tabWidget.setCurrentIndex(0)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+        # nothing touches the disk until the window is up
+        self.tabWidget.setEnabled(False)
+        self.submitJob("Open {}".format(ROOT), [ROOT], lambda job: ensureRoot(ROOT), onDone=self.rootReady)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+
+        '''***** Main Window *****'''
+        MainWindow.setWindowTitle(_translate("MainWindow", "Project Management Tool"))
+
+        '''***** Projects Tab *****'''
+        # New Project
+        self.newProjectBox.setTitle(_translate("MainWindow", "New Project"))
+        self.newProjectLabel.setText(_translate("MainWindow", "Name:"))
+        self.newProjectField.setPlaceholderText(_translate("MainWindow", "ProjectName"))
+        self.createProject.setText(_translate("MainWindow", "Create Project"))
+
+        # Existing Project
+        self.existingProjectBox.setTitle(_translate("MainWindow", "Existing Projects"))
+        self.deleteSelectedButton.setText(_translate("MainWindow", "Delete Selected"))
+        self.renameSelectedField.setPlaceholderText(_translate("MainWindow", "NewProjectName"))
+        self.renameSelectedButton.setText(_translate("MainWindow", "Rename Selected"))
+        self.newFolderField.setPlaceholderText(_translate("MainWindow", "NewFolder"))
+        self.newFolderButton.setText(_translate("MainWindow", "Create New Folder"))
+        self.archiveSelectedButton.setText(_translate("MainWindow", "Archive Selected"))
+        self.importArchiveButton.setText(_translate("MainWindow", "Import Archive"))
+
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.projectsTab), _translate("MainWindow", "Projects"))
+
+        '''***** Asset Tab *****'''
+        # Directory
+        self.directoryBox.setTitle(_translate("MainWindow", "Directory:"))
+        self.assetSearchField.setPlaceholderText(_translate("MainWindow", "Search assets"))
+
+        # New Asset
+        self.newAssetBox.setTitle(_translate("MainWindow", "New Asset:"))
+        self.assetTypeLabel.setText(_translate("MainWindow", "Asset Type:"))
+        self.newAssetType.setItemText(0, _translate("MainWindow", "Model"))
+        self.newAssetType.setItemText(1, _translate("MainWindow", "Rig"))
+        self.newAssetType.setItemText(2, _translate("MainWindow", "Animation"))
+        self.assetAppLabel.setText(_translate("MainWindow", "Asset Application:"))
+        self.newAssetApp.setItemText(0, _translate("MainWindow", "Maya"))
+        self.newAssetApp.setItemText(1, _translate("MainWindow", "Zbrush"))
+        self.newAssetApp.setItemText(2, _translate("MainWindow", "Houdini"))
+        self.newAssetNameField.setPlaceholderText(_translate("MainWindow", "AssetName"))
+        self.createAsset.setText(_translate("MainWindow", "Create Asset"))
+        self.bulkAssetCheck.setText(_translate("MainWindow", "Several (list or range)"))
+
+        # Selected Assets
+        self.selectedAssetBox.setTitle(_translate("MainWindow", "Selected Asset(s):"))
+        self.openAssetButton.setText(_translate("MainWindow", "Open"))
+        self.saveVersionButton.setText(_translate("MainWindow", "Save Version"))
+        self.openVersionButton.setText(_translate("MainWindow", "Open Version"))
+        self.restoreVersionButton.setText(_translate("MainWindow", "Restore Version"))
+        self.renameAssetField.setPlaceholderText(_translate("MainWindow", "NewAssetName"))
+        self.renameAssetButton.setText(_translate("MainWindow", "Rename"))
+        self.deleteAssetButton.setText(_translate("MainWindow", "Delete"))
+        self.showUtilityCheck.setText(_translate("MainWindow", "Show Temp and Tools folders"))
+
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.assetsTab), _translate("MainWindow", "Assets"))
+
+        '''***** Usage Tab *****'''
+        self.usageScanButton.setText(_translate("MainWindow", "Scan"))
+        self.usageTree.setHeaderLabels([_translate("MainWindow", "Name"), _translate("MainWindow", "Size"),
+                                        _translate("MainWindow", "Files"), _translate("MainWindow", "Share")])
+        self.tempBox.setTitle(_translate("MainWindow", "Temp folders"))
+        self.tempStats.setText(_translate("MainWindow", "Temp folders are cleaned up every hour"))
+        self.tempTree.setHeaderLabels([_translate("MainWindow", "Project"), _translate("MainWindow", "Folders"),
+                                       _translate("MainWindow", "Size"), _translate("MainWindow", "To remove")])
+        self.tempPreviewButton.setText(_translate("MainWindow", "Preview Cleanup"))
+        self.tempCleanButton.setText(_translate("MainWindow", "Clean Up"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.usageTab), _translate("MainWindow", "Usage"))
+
+        '''***** Jobs *****'''
+        self.jobsBox.setTitle(_translate("MainWindow", "Jobs"))
+
+    def getPaths(self, treeView):
+        paths = []
+
+        # get selected indexes
+        indexes = [item for item in treeView.selectedIndexes() if item.column() == 0]
+
+        if len(indexes)>0:
+            # get the file path per index
+            for index in indexes:
+                paths.append(self.model.filePath(index))
+                # print(self.model.filePath(index))
+                # print(index)
+        else:
+            paths.append(self.model.filePath(self.projectDirectory.rootIndex()))
+        return paths
+
+    def submitJob(self, name, paths, func, *args, onDone=None):
+        '''run func in the background, paths are locked against overlapping jobs
+
+        onDone is called on the GUI thread with the job once it succeeds
+        '''
+        job = Job(name, paths, func, *args)
+        if onDone:
+            self.jobCallbacks[job] = onDone
+        return self.jobs.submit(job)
+
+    def rootReady(self, job):
+        '''populate the trees and start indexing once the root exists'''
+        # folders are listed in the background as they're expanded
+        rootIndex = self.model.setRootPath(ROOT)
+        self.projectDirectory.setRootIndex(rootIndex)
+        self.assetDirectory.setRootIndex(rootIndex)
+        self.tabWidget.setEnabled(True)
+
+        self.startAssetIndex()
+
+        # throttled so a pass doesn't compete with the user's own work, and only with a tempPolicy to apply
+        tempPolicy = TempPolicy.fromConfig()
+        if tempPolicy.limited:
+            self.tempCollector = TempCollector(ROOT, tempPolicy, opsPerSecond=200,
+                                               onPass=self.tempSignals.collected.emit).start()
+
+        # jobs cut short last time, e.g. by a crash or a lost share
+        interrupted = Journal.unfinished(ROOT)
+        if interrupted:
+            self.statusbar.showMessage("{} interrupted job(s), resume or roll back with: python -m pmt journal list {}".format(len(interrupted), ROOT))
+
+    def jobChanged(self, job):
+        '''add or update the job's row in the jobs box, runs on the GUI thread'''
+        if job not in self.jobRows:
+            # label, progress bar and cancel button per job
+            row = QtWidgets.QWidget(self.jobsBox)
+            rowLayout = QtWidgets.QHBoxLayout(row)
+            rowLayout.setContentsMargins(0, 0, 0, 0)
+
+            label = QtWidgets.QLabel(row)
+            rowLayout.addWidget(label)
+
+            bar = QtWidgets.QProgressBar(row)
+            bar.setMaximumWidth(120)
+            rowLayout.addWidget(bar)
+
+            button = QtWidgets.QPushButton("Cancel", row)
+            button.clicked.connect(lambda *args: self.jobButtonClicked(job))
+            rowLayout.addWidget(button)
+
+            self.jobsLayout.addWidget(row)
+            self.jobsBox.setVisible(True)
+            self.jobRows[job] = (row, label, bar, button)
+
+        row, label, bar, button = self.jobRows[job]
+
+        # 0 maximum shows a busy bar while the amount of work is unknown
+        bar.setMaximum(job.total)
+        bar.setValue(job.done)
+        label.setText("{} ({})".format(job.name, job.message or job.status))
+
+        # show what the job changed, refreshes are coalesced by the model
+        if job.finished:
+            self.model.refresh(job.paths)
+
+        if job.status == Job.DONE:
+            self.statusbar.showMessage("{}: {}".format(job.name, job.message or "done"), 10000)
+            self.removeJobRow(job)
+            if job in self.jobCallbacks:
+                self.jobCallbacks.pop(job)(job)
+        elif job.status == Job.CANCELLED:
+            self.jobCallbacks.pop(job, None)
+            self.statusbar.showMessage("{}: cancelled".format(job.name), 10000)
+            self.removeJobRow(job)
+        elif job.status == Job.FAILED:
+            # keep failed jobs with their error until dismissed
+            self.jobCallbacks.pop(job, None)
+            bar.setMaximum(1)
+            bar.setValue(0)
+            label.setText("{} failed: {}".format(job.name, job.error))
+            label.setToolTip(job.details)
+            button.setText("Dismiss")
+
+    def jobButtonClicked(self, job):
+        if job.finished:
+            self.removeJobRow(job)
+        else:
+            self.jobs.cancel(job)
+
+    def removeJobRow(self, job):
+        row = self.jobRows.pop(job)[0]
+        self.jobsLayout.removeWidget(row)
+        row.deleteLater()
+        self.jobsBox.setVisible(bool(self.jobRows))
+
+    def startAssetIndex(self):
+        '''reconcile the asset index with the disk, then keep it current'''
+        def reconcile(job):
+            self.assetIndex = AssetIndex(ROOT)
+            changed, removed = self.assetIndex.reconcile(lambda done, total: job.setProgress(done, total, "scanning"))
+            job.message = "{} folders updated, {} removed".format(changed, removed)
+
+            # only scenes that changed since the last run are read
+            graph = DependencyGraph(ROOT)
+            graph.updateFromIndex(self.assetIndex, lambda done, total: job.setProgress(done, total, "reading scenes"))
+            self.dependencyGraph = graph
+
+            self.indexWatcher = IndexWatcher(self.assetIndex)
+            self.indexWatcher.listeners.append(self.updateDependencies)
+            self.indexWatcher.start()
+
+        self.submitJob("Index assets", [], reconcile)
+
+    def updateDependencies(self, folders):
+        '''read the scenes in the folders an index pass changed, runs on the index watcher's thread'''
+        try:
+            self.dependencyGraph.updateFolders(folders)
+        except (OSError, sqlite3.Error):
+            # tried again after the next pass
+            pass
+
+    def dependentsOf(self, paths, deleting=False):
+        '''scenes using paths, none until the dependency graph is ready'''
+        if self.dependencyGraph is None:
+            return []
+        return self.dependencyGraph.dependents(paths, ignoreInside=deleting)
+
+    def describeDependents(self, dependents, limit=10):
+        lines = ["{} uses {}".format(os.path.relpath(dependency.scene, ROOT), os.path.relpath(dependency.target, ROOT))
+                 for dependency in dependents[:limit]]
+        if len(dependents) > limit:
+            lines.append("... and {} more".format(len(dependents) - limit))
+        return "\n".join(lines)
+
+    def confirmDelete(self, paths):
+        '''True if paths can go, after warning about the scenes that use them'''
+        dependents = self.dependentsOf(paths, deleting=True)
+        if not dependents:
+            return True
+        scenes = len(set(dependency.scene for dependency in dependents))
+        answer = QtWidgets.QMessageBox.warning(self.centralwidget, "Delete",
+                                               "{} scene(s) use what's being deleted and will miss it:\n\n{}\n\nDelete anyway?".format(scenes, self.describeDependents(dependents)),
+                                               QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.Cancel, QtWidgets.QMessageBox.Cancel)
+        return answer == QtWidgets.QMessageBox.Yes
+
+    def scanUsageClicked(self, *args):
+        '''scan the root in the background, unchanged folders come from the last scan's cache'''
+        def scan(job):
+            report = scanUsage(ROOT, progress=lambda done, total: job.setProgress(done, total, "scanning"))
+            job.message = "{} in {} files, {} folders listed".format(formatBytes(report.totalBytes), report.totalFiles, report.listed)
+            return report
+
+        self.submitJob("Scan usage of {}".format(ROOT), [], scan, onDone=self.usageScanned)
+
+    def usageScanned(self, job):
+        self.usageReport = job.result
+        self.showUsage()
+
+    def showUsage(self, *args):
+        '''fill the usage list with the report grouped by the chosen breakdown'''
+        self.usageTree.clear()
+        if self.usageReport is None:
+            return
+
+        total = self.usageReport.totalBytes or 1
+        items = []
+        for key, files, size in self.usageReport.breakdown(self.usageBreakdown.currentText()):
+            item = UsageItem([key, formatBytes(size), str(files), "{:.1f}%".format(100.0 * size / total)])
+            item.setData(1, QtCore.Qt.UserRole, size)
+            item.setData(2, QtCore.Qt.UserRole, files)
+            item.setData(3, QtCore.Qt.UserRole, size)
+            for column in (1, 2, 3):
+                item.setTextAlignment(column, QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+            items.append(item)
+        self.usageTree.addTopLevelItems(items)
+        self.usageTree.sortItems(1, QtCore.Qt.DescendingOrder)
+        self.usageSummary.setText("{} in {} files".format(formatBytes(self.usageReport.totalBytes), self.usageReport.totalFiles))
+
+    def tempPreviewClicked(self, *args):
+        '''find the Temp folders and what the policy would remove from them, without removing anything'''
+        def plan(job):
+            report = planCollection(ROOT, TempPolicy.fromConfig(), progress=lambda done, total: job.setProgress(done, total, "scanning"))
+            job.message = "{} Temp folders, {} to remove".format(len(report.folders), formatBytes(report.reclaimBytes))
+            return report
+
+        self.submitJob("Preview Temp cleanup", [], plan, onDone=self.tempPlanned)
+
+    def tempPlanned(self, job):
+        self.tempReport = job.result
+        self.showTempReport(self.tempReport)
+        self.tempCleanButton.setEnabled(bool(self.tempReport.doomed))
+
+    def tempCleanClicked(self, *args):
+        '''remove what the preview listed, files written since then are kept'''
+        report = self.tempReport
+        self.tempCleanButton.setEnabled(False)
+        self.submitJob("Clean up {} Temp files".format(len(report.doomed)), [],
+                       lambda job: collect(report, progress=lambda done, total: job.setProgress(done, total)),
+                       onDone=lambda job: self.tempCollected(report, job.result))
+
+    def tempCollected(self, report, result):
+        '''stats of the last cleanup, from the collector or the Clean Up button'''
+        self.tempStats.setText("{} Temp folders held {} in {} files, {} removed at {}{}".format(
+            len(report.folders), formatBytes(report.totalBytes), report.totalFiles, formatBytes(result.bytes),
+            time.strftime("%H:%M", time.localtime()), ", {} in use".format(len(result.skipped)) if result.skipped else ""))
+        if self.tempTree.isVisible():
+            self.showTempReport(report)
+
+    def showTempReport(self, report):
+        self.tempTree.clear()
+        items = []
+        for project, folders, size, reclaim in report.byProject():
+            item = UsageItem([project or "(root)", str(folders), formatBytes(size), formatBytes(reclaim)])
+            item.setData(1, QtCore.Qt.UserRole, folders)
+            item.setData(2, QtCore.Qt.UserRole, size)
+            item.setData(3, QtCore.Qt.UserRole, reclaim)
+            for column in (1, 2, 3):
+                item.setTextAlignment(column, QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+            items.append(item)
+        self.tempTree.addTopLevelItems(items)
+        self.tempTree.sortItems(3, QtCore.Qt.DescendingOrder)
+        self.tempTree.setVisible(True)
+
+    def assetSearchChanged(self, *args):
+        self.assetSearchTimer.start()
+
+    def searchAssets(self):
+        '''fill the results list from the index'''
+        text = self.assetSearchField.text()
+        self.assetSearchResults.clear()
+        self.assetSearchResults.setVisible(bool(text.strip()))
+
+        if self.assetIndex is None:
+            return
+
+        for record in self.assetIndex.search(text):
+            item = QtWidgets.QListWidgetItem("{}  ({})".format(record.name, os.path.relpath(record.folder, ROOT)))
+            item.setData(QtCore.Qt.UserRole, record.path)
+            item.setToolTip(record.path)
+            self.assetSearchResults.addItem(item)
+
+    def assetSearchResultClicked(self, item):
+        # select the asset in the directory tree once the folders down to it are listed
+        self.revealingPath = item.data(QtCore.Qt.UserRole)
+        self.model.revealPath(self.revealingPath, self.assetRevealed)
+
+    def assetRevealed(self, index):
+        # a later click wins
+        if not index.isValid() or self.model.filePath(index) != os.path.abspath(self.revealingPath):
+            return
+        self.assetDirectory.scrollTo(index)
+        self.assetDirectory.setCurrentIndex(index)
+
+    def assetCurrentChanged(self, current, previous):
+        '''ask for the thumbnail of the asset under the cursor'''
+        path = self.model.filePath(current)
+        if not current.isValid() or self.model.isDir(current) or not hasExtractor(path):
+            self.previewPath = None
+            self.assetPreview.setVisible(False)
+            return
+
+        self.previewPath = path
+        self.assetPreview.setText("Loading preview...")
+        self.assetPreview.setVisible(True)
+        self.previews.request([path], self.previewSignals.previewReady.emit)
+
+    def previewReady(self, path, data):
+        # the cursor may have moved on while it was generated
+        if path != self.previewPath:
+            return
+        pixmap = QtGui.QPixmap()
+        if not data or not pixmap.loadFromData(data):
+            self.assetPreview.setText("No preview")
+            return
+        self.assetPreview.setPixmap(pixmap.scaled(self.assetPreview.width(), self.assetPreview.height(),
+                                                  QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation))
+
+    def newProjectClicked(self, *args):
+        # create new project
+        rootDir = self.model.filePath(self.projectDirectory.rootIndex())
+        projectName = self.newProjectField.text()
+        path = os.path.join(rootDir, projectName)
+
+        # no name or an existing project, nothing is queued
+        try:
+            checkNewProject(path)
+        except (ValueError, FileExistsError) as error:
+            QtWidgets.QMessageBox.warning(self.centralwidget, "New Project", "Can't create the project: {}".format(error))
+            return
+
+        def createProject(job):
+            project = Project(path, progress=lambda done, total, phase: job.setProgress(done, total, phase))
+
+            # report how long each scaffolding phase took
+            job.message = ", ".join("{} {:.2f}s".format(phase, secs) for phase, secs in project.scaffoldResult.phases.items())
+
+        self.submitJob("Create project {}".format(projectName), [path], createProject)
+
+        #clear
+        self.newProjectField.clear()
+
+    def deleteFolderClicked(self, *args):
+        # function for deleting paths
+        paths = self.getPaths(self.projectDirectory)
+        if not self.confirmDelete(paths):
+            return
+        self.submitJob("Delete {} folder(s)".format(len(paths)), paths,
+                       lambda job: deleteAll(paths, ROOT, self.trash, lambda done, total: job.setProgress(done, total)))
+    
+    def renameFolderClicked(self, *args):
+        # rename folder
+
+        # get selected folders
+        folders = self.getPaths(self.projectDirectory)
+
+        # rename, once the preview has no conflicts
+        self.renameSelection("folder", folders, self.renameSelectedField.text())
+
+        # clear the field
+        self.renameSelectedField.clear()
+
+    def renameSelection(self, kind, paths, text):
+        '''preview the renames of paths and run them in the background, locking old and new paths'''
+        dialog = RenamePreviewDialog(paths, text, self.centralwidget)
+        if dialog.exec_() != QtWidgets.QDialog.Accepted or dialog.plan is None:
+            return
+
+        plan = dialog.plan
+
+        # scenes using what's renamed can be pointed at the new paths
+        dependents = self.dependentsOf([old for old, new in plan.renames])
+        updateReferences = False
+        if dependents:
+            scenes = len(set(dependency.scene for dependency in dependents))
+            box = QtWidgets.QMessageBox(QtWidgets.QMessageBox.Question, "Rename",
+                                        "{} scene(s) use what's being renamed:\n\n{}".format(scenes, self.describeDependents(dependents)),
+                                        parent=self.centralwidget)
+            update = box.addButton("Update References", QtWidgets.QMessageBox.AcceptRole)
+            box.addButton("Rename Only", QtWidgets.QMessageBox.DestructiveRole)
+            cancel = box.addButton(QtWidgets.QMessageBox.Cancel)
+            box.setDefaultButton(update)
+            box.exec_()
+            if box.clickedButton() == cancel:
+                return
+            updateReferences = box.clickedButton() == update
+
+        def rename(job):
+            applyRenames(plan, ROOT, lambda done, total: job.setProgress(done, total, "renaming"))
+            if updateReferences:
+                scenes, references = rewriteReferences(self.dependencyGraph, plan.renames,
+                                                       lambda done, total: job.setProgress(done, total, "updating scenes"))
+                job.message = "{} reference(s) updated in {} scene(s)".format(references, scenes)
+
+        # the scenes rewritten are locked too
+        paths = [path for rename in plan.renames for path in rename]
+        if updateReferences:
+            paths += sorted(set(dependency.scene for dependency in dependents))
+        self.submitJob("Rename {} {}(s)".format(len(plan.renames), kind), paths, rename)
+
+    def newFolderClicked(self, *args):
+        # create new folder
+
+        # get new folder name
+        name = self.newFolderField.text()
+
+        # get path
+        path = os.path.join(self.getPaths(self.projectDirectory)[0], name)
+
+        # make new folder- automatically makes tools,temp folders with config file
+        self.submitJob("Create folder {}".format(name), [path], lambda job: Folder(path))
+
+        # Clear the field
+        self.newFolderField.clear()
+
+    def archiveSelectedClicked(self, *args):
+        # write each selected project to an archive
+        projects = self.getPaths(self.projectDirectory)
+        if len(projects) == 1:
+            target, _ = QtWidgets.QFileDialog.getSaveFileName(self.centralwidget, "Archive Project", os.path.basename(projects[0]) + ".tar.gz",
+                                                              "Archives (*.tar.gz *.zip)")
+            if not target:
+                return
+            targets = [target]
+        else:
+            # several projects go to one folder, an archive each
+            folder = QtWidgets.QFileDialog.getExistingDirectory(self.centralwidget, "Archive Projects To")
+            if not folder:
+                return
+            targets = [os.path.join(folder, os.path.basename(project) + ".tar.gz") for project in projects]
+
+        for project, target in zip(projects, targets):
+            self.submitJob("Archive {}".format(os.path.basename(project)), [project],
+                           lambda job, project=project, target=target: archiveProject(project, target, progress=lambda done, total: job.setProgress(done, total)))
+
+    def importArchiveClicked(self, *args):
+        # extract an archive into the root
+        source, _ = QtWidgets.QFileDialog.getOpenFileName(self.centralwidget, "Import Archive", "", "Archives (*.tar.gz *.tgz *.zip)")
+        if not source:
+            return
+
+        # the project's name is only known once the archive is read
+        self.submitJob("Import {}".format(os.path.basename(source)), [ROOT],
+                       lambda job: restoreArchive(source, ROOT, lambda done, total: job.setProgress(done, total)))
+
+    def bulkAssetToggled(self, checked):
+        _translate = QtCore.QCoreApplication.translate
+        placeholder = "shot[010-200:10], hero, villain" if checked else "AssetName"
+        self.newAssetNameField.setPlaceholderText(_translate("MainWindow", placeholder))
+
+    def newAssetClicked(self, *args):
+        # get new asset name
+        name = self.newAssetNameField.text()
+
+        # get new asset type
+        assetType = self.newAssetType.currentText()
+
+        assetApp = self.newAssetApp.currentText()
+
+        # several names, written in parallel from the pooled template
+        if self.bulkAssetCheck.isChecked():
+            try:
+                names = expandNames(name)
+            except ValueError as error:
+                self.statusbar.showMessage(str(error), 10000)
+                return
+            folder = self.getPaths(self.assetDirectory)[0]
+
+            def createMany(job):
+                created = createAssets(folder, names, assetApp, assetType,
+                                       progress=lambda done, total: job.setProgress(done, total, "writing"))
+                job.message = "{} created, {} already existed".format(len(created), len(names) - len(created))
+
+            self.submitJob("Create {} asset(s)".format(len(names)), [folder], createMany)
+            self.newAssetNameField.clear()
+            return
+       
+       #make temp asset from file type/filepath
+
+        path = os.path.join(self.getPaths(self.assetDirectory)[0], name)
+
+        self.submitJob("Create asset {}".format(name), [path], lambda job: Asset(path, assetApp, assetType))
+
+    def openAssetClicked(self, *args):
+        assets = self.getPaths(self.assetDirectory)
+
+        # one launch per application where it can take them all, throttled in the background
+        self.submitJob("Open {} asset(s)".format(len(assets)), [],
+                       lambda job: appLauncher.open(assets, lambda done, total: job.setProgress(done, total, "launching")))
+
+
+    def saveVersionClicked(self, *args):
+        # save each selected asset as its next version
+        assets = [path for path in self.getPaths(self.assetDirectory) if os.path.isfile(path)]
+        if not assets:
+            return
+        note, accepted = QtWidgets.QInputDialog.getText(self.centralwidget, "Save Version", "Note (optional):")
+        if not accepted:
+            return
+
+        def save(job):
+            versions = [Asset(path).saveVersion(note) for path in assets]
+            job.message = ", ".join("{} {}".format(os.path.basename(path), version.label) for path, version in zip(assets, versions))
+
+        self.submitJob("Save {} version(s)".format(len(assets)), assets, save)
+
+    def pickVersion(self, title):
+        '''(asset path, version number) picked for the selected asset, None if cancelled'''
+        path = self.getPaths(self.assetDirectory)[0]
+        versions = VersionStore(os.path.dirname(path)).versions(os.path.basename(path)) if os.path.isfile(path) else []
+        if not versions:
+            self.statusbar.showMessage("{} has no saved versions".format(os.path.basename(path)), 10000)
+            return None
+
+        # newest first
+        items = ["{}  {}  {}".format(version.label, time.strftime("%Y-%m-%d %H:%M", time.localtime(version.saved)), version.note).strip()
+                 for version in reversed(versions)]
+        item, accepted = QtWidgets.QInputDialog.getItem(self.centralwidget, title, os.path.basename(path), items, 0, False)
+        if not accepted:
+            return None
+        return path, list(reversed(versions))[items.index(item)].number
+
+    def openVersionClicked(self, *args):
+        # a past version opens from the folder's Temp folder, through the same launcher as Open
+        picked = self.pickVersion("Open Version")
+        if picked:
+            path, number = picked
+            self.submitJob("Open {} v{:03d}".format(os.path.basename(path), number), [],
+                           lambda job: Asset(path).open(number))
+
+    def restoreVersionClicked(self, *args):
+        # the current file is saved as a version before it's replaced
+        picked = self.pickVersion("Restore Version")
+        if picked:
+            path, number = picked
+            self.submitJob("Restore {} v{:03d}".format(os.path.basename(path), number), [path],
+                           lambda job: Asset(path).restoreVersion(number))
+
+    def renameAssetClicked(self, *args):
+        # rename asset
+        assets = self.getPaths(self.assetDirectory)
+        self.renameSelection("asset", assets, self.renameAssetField.text())
+        
+        # clear the field
+        self.renameAssetField.clear()
+
+    def deleteAssetClicked(self, *args):
+        paths = self.getPaths(self.assetDirectory)
+        if not self.confirmDelete(paths):
+            return
+        self.submitJob("Delete {} asset(s)".format(len(paths)), paths,
+                       lambda job: deleteAll(paths, ROOT, None, lambda done, total: job.setProgress(done, total)))
+
+def main():
+    '''show the window right away, the root and index are opened in the background'''
+    app = QtWidgets.QApplication(sys.argv)
+    MainWindow = QtWidgets.QMainWindow()
+    ui = Ui_MainWindow()
+    ui.setupUi(MainWindow)
+    MainWindow.show()
+
+    # startup benchmark hook: report the first event loop turn after show and quit
+    if os.environ.get("PMT_STARTUP_PROBE"):
+        QtCore.QTimer.singleShot(0, lambda: (print("first paint", flush=True), app.quit()))
+
+    exitCode = app.exec_()
+
+    # let running filesystem jobs finish before exiting
+    ui.jobs.shutdown(cancel=False)
+    ui.purger.stop()
+    if ui.tempCollector:
+        ui.tempCollector.stop()
+    ui.model.shutdown()
+    ui.previews.shutdown()
+    if ui.indexWatcher:
+        ui.indexWatcher.stop()
+    if ui.assetIndex:
+        ui.assetIndex.close()
+    if ui.dependencyGraph:
+        ui.dependencyGraph.close()
+    return exitCode
@@ -0,0 +1,556 @@
+'''Persistent SQLite index of every asset under a PMT root'''
+import difflib
+
+import itertools
+
+import logging
+
+import os
+
+import re
+
+import sqlite3
+
+import threading
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.config import ConfigError, getConfig
+
+from pmt.trash import TRASH_NAME, hidePath
+
+from pmt.journal import JOURNAL_NAME
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError: # optional, the index falls back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+log = logging.getLogger(__name__)
+
+INDEX_NAME = ".pmt_index.db"
+
+# folders that never hold assets
+SKIPPED_FOLDERS = ("Temp", "Tools", TRASH_NAME, JOURNAL_NAME)
+
+DEFAULT_WORKERS = 8
+DEFAULT_POLL_INTERVAL = 5 * 60 # seconds between reconciles without watchdog
+DEFAULT_LIMIT = 200
+
+# close words tried for every word of a fuzzy search, how close they must be, and the
+# combinations of them searched
+FUZZY_ALTERNATIVES = 3
+FUZZY_MIN_SCORE = 0.6
+FUZZY_COMBINATIONS = 27
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    nameLower TEXT NOT NULL,
+    project TEXT,
+    folder TEXT NOT NULL,
+    extension TEXT,
+    dcc TEXT,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS assetsName ON assets (nameLower);
+CREATE INDEX IF NOT EXISTS assetsFolder ON assets (folder);
+CREATE INDEX IF NOT EXISTS assetsProject ON assets (project, dcc);
+CREATE INDEX IF NOT EXISTS assetsExtension ON assets (extension);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS words (
+    word TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+# substring search over names, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assetNames USING fts5 (nameLower, content='assets', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS assetsInsert AFTER INSERT ON assets BEGIN
+    INSERT INTO assetNames (rowid, nameLower) VALUES (new.id, new.nameLower);
+END;
+CREATE TRIGGER IF NOT EXISTS assetsDelete AFTER DELETE ON assets BEGIN
+    INSERT INTO assetNames (assetNames, rowid, nameLower) VALUES ('delete', old.id, old.nameLower);
+END;
+CREATE TRIGGER IF NOT EXISTS assetsUpdate AFTER UPDATE OF nameLower ON assets BEGIN
+    INSERT INTO assetNames (assetNames, rowid, nameLower) VALUES ('delete', old.id, old.nameLower);
+    INSERT INTO assetNames (rowid, nameLower) VALUES (new.id, new.nameLower);
+END;
+"""
+
+COLUMNS = ("path", "name", "project", "folder", "extension", "dcc", "size", "mtime")
+
+class AssetRecord():
+    '''one indexed asset'''
+    __slots__ = COLUMNS
+
+    def __init__(self, *values):
+        for column, value in zip(COLUMNS, values):
+            setattr(self, column, value)
+
+    def __repr__(self):
+        return "AssetRecord({})".format(self.path)
+
+# PMT's own files and folders: the index, usage and dedup caches, temporary names
+PMT_PREFIX = ".pmt_"
+
+# words of a name: lowercase runs, capitalized words of camelCase, acronyms and numbers
+WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+
+def nameWords(name, minLength=3):
+    '''lowercase words of a file name without its extension, the ones fuzzy search corrects to'''
+    stem = os.path.splitext(name)[0] if "." in name else name
+    return [word.lower() for word in WORD.findall(stem) if len(word) >= minLength and not word.isdigit()]
+
+def isSkipped(name):
+    return name in SKIPPED_FOLDERS or name.startswith(PMT_PREFIX)
+
+class Crawler():
+    '''parallel os.scandir walk of a root, one directory per task'''
+    def __init__(self, root, workers=DEFAULT_WORKERS):
+        self.root = os.path.abspath(root)
+        self.workers = workers
+
+    def scanDirectory(self, directory):
+        '''(mtime, subfolders, files) of a directory, files are (name, size, mtime)
+
+        files are always listed: one rewritten in place doesn't change the directory's mtime
+        '''
+        mtime = os.stat(directory).st_mtime
+
+        subdirs = []
+        files = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                if isSkipped(entry.name):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    # gone since it was listed, e.g. a DCC's save or autosave temp file
+                    continue
+                files.append((entry.name, stat.st_size, stat.st_mtime))
+        return directory, mtime, subdirs, files
+
+    def crawl(self, progress=None):
+        '''yield scanDirectory results for every directory under the root'''
+        scanned = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            level = [self.root]
+            while level:
+                nextLevel = []
+                for result in pool.map(self._safeScan, level):
+                    if result is None:
+                        continue
+                    nextLevel.extend(result[2])
+                    scanned += 1
+                    yield result
+                if progress:
+                    progress(scanned, scanned + len(nextLevel))
+                level = nextLevel
+
+    def _safeScan(self, directory):
+        try:
+            return self.scanDirectory(directory)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # removed while crawling or unreadable
+            return None
+
+class AssetIndex():
+    '''SQLite index of the assets under a root, with prefix and substring search'''
+    def __init__(self, root, dbPath=None, workers=DEFAULT_WORKERS):
+        self.root = os.path.abspath(root)
+        self.dbPath = dbPath or os.path.join(self.root, INDEX_NAME)
+        self.crawler = Crawler(self.root, workers)
+        self._lock = threading.RLock()
+        self._words = None # set of the words of the names, loaded by words()
+
+        created = not os.path.exists(self.dbPath)
+        self.db = sqlite3.connect(self.dbPath, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.hasFts = True
+        except sqlite3.OperationalError:
+            # sqlite without fts5 trigrams, substring search scans instead
+            self.hasFts = False
+        self.db.commit()
+
+        if created:
+            hidePath(self.dbPath)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def records(self, directory, files):
+        '''index rows for the (name, size, mtime) files of one folder, its config is resolved once'''
+        relative = os.path.relpath(directory, self.root).split(os.sep)
+        project = relative[0] if relative[0] != os.curdir else None
+        dccs = {}
+        config = None
+        rows = []
+        for name, size, mtime in files:
+            extension = os.path.splitext(name)[1].lower() or None
+            if extension not in dccs:
+                if config is None:
+                    config = self.folderConfig(directory)
+                dccs[extension] = self.resolveDcc(config, extension)
+            rows.append((os.path.join(directory, name), name, name.lower(), project, directory, extension, dccs[extension], size, mtime))
+        return rows
+
+    def folderConfig(self, directory):
+        '''the folder's config, False if it has none that can be read'''
+        try:
+            return getConfig(directory)
+        except (ConfigError, OSError):
+            return False
+
+    def resolveDcc(self, config, extension):
+        '''dcc for an extension from a folder's config, None if unknown'''
+        if not extension or not config:
+            return None
+        try:
+            return config.dccForExtension(extension)
+        except ConfigError:
+            return None
+
+    def reconcile(self, progress=None, folders=None):
+        '''bring the index up to date, only rewriting folders whose mtime or files changed
+
+        the folders rewritten or removed are appended to folders if it's given
+        '''
+        with self._lock:
+            known = dict(self.db.execute("SELECT path, mtime FROM folders"))
+            stored = {}
+            for folder, name, size, mtime in self.db.execute("SELECT folder, name, size, mtime FROM assets"):
+                stored.setdefault(folder, {})[name] = (size, mtime)
+
+        seen = set()
+        changed = 0
+        batch = []
+        for directory, mtime, subdirs, files in self.crawler.crawl(progress):
+            seen.add(directory)
+            # files rewritten in place only show in their own size and mtime
+            if known.get(directory) == mtime and stored.get(directory, {}) == dict((name, (size, fileMtime)) for name, size, fileMtime in files):
+                continue
+            changed += 1
+            if folders is not None:
+                folders.append(directory)
+            batch.append((directory, mtime, self.records(directory, files)))
+            if len(batch) >= 256:
+                self._writeFolders(batch)
+                batch = []
+        self._writeFolders(batch)
+
+        # folders that are gone take their assets with them
+        removed = [folder for folder in known if folder not in seen]
+        if folders is not None:
+            folders.extend(removed)
+        with self._lock, self.db:
+            for folder in removed:
+                self.db.execute("DELETE FROM assets WHERE folder = ?", (folder,))
+                self.db.execute("DELETE FROM folders WHERE path = ?", (folder,))
+
+        return changed, len(removed)
+
+    def _writeFolders(self, batch):
+        # replace the rows of every changed folder in one transaction
+        if not batch:
+            return
+        # only words not seen before are written
+        self.words()
+        with self._lock, self.db:
+            for directory, mtime, records in batch:
+                self.db.execute("DELETE FROM assets WHERE folder = ?", (directory,))
+                self.db.executemany("INSERT OR REPLACE INTO assets (path, name, nameLower, project, folder, extension, dcc, size, mtime) "
+                                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+                self.db.execute("INSERT OR REPLACE INTO folders (path, mtime) VALUES (?, ?)", (directory, mtime))
+                # words stay when their names go, a stale one only corrects to nothing
+                self._addWords(record[1] for record in records)
+
+    def refreshFolder(self, directory):
+        '''reindex one folder, used for watch events'''
+        directory = os.path.abspath(directory)
+        try:
+            os.stat(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            # only the folder itself being gone drops its assets
+            self.removeTree(directory)
+            return
+        directory, mtime, subdirs, files = self.crawler.scanDirectory(directory)
+        self._writeFolders([(directory, mtime, self.records(directory, files))])
+
+    def removeTree(self, directory):
+        '''forget a folder and everything below it'''
+        directory = os.path.abspath(directory)
+        pattern = escapeLike(directory + os.sep) + "%"
+        with self._lock, self.db:
+            for table, column in (("assets", "folder"), ("folders", "path")):
+                self.db.execute("DELETE FROM {0} WHERE {1} = ? OR {1} LIKE ? ESCAPE '\\'".format(table, column), (directory, pattern))
+
+    def _select(self, sql, params):
+        with self._lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [AssetRecord(*row) for row in rows]
+
+    def prefixSearch(self, prefix, limit=DEFAULT_LIMIT):
+        '''assets whose name starts with prefix, case insensitive, served by the name index'''
+        prefix = prefix.lower()
+        return self._select("SELECT {} FROM assets WHERE nameLower >= ? AND nameLower < ? ORDER BY nameLower LIMIT ?".format(", ".join(COLUMNS)),
+                            (prefix, prefix + "￿", limit))
+
+    def substringSearch(self, terms, limit=DEFAULT_LIMIT):
+        '''assets whose name contains every term'''
+        terms = [term.lower() for term in terms if term]
+        columns = ", ".join("assets." + column for column in COLUMNS)
+
+        # trigram index serves terms of three or more characters, shorter ones filter its matches
+        longTerms = [term for term in terms if len(term) >= 3] if self.hasFts else []
+        shortTerms = [term for term in terms if term not in longTerms]
+        likes = " AND ".join("assets.nameLower LIKE ? ESCAPE '\\'" for term in shortTerms)
+        likeParams = ["%" + escapeLike(term) + "%" for term in shortTerms]
+
+        if longTerms:
+            match = " AND ".join('"{}"'.format(term.replace('"', '""')) for term in longTerms)
+            sql = "SELECT {} FROM assetNames JOIN assets ON assets.id = assetNames.rowid WHERE assetNames MATCH ?".format(columns)
+            if likes:
+                sql += " AND " + likes
+            return self._select(sql + " LIMIT ?", [match] + likeParams + [limit])
+
+        return self._select("SELECT {} FROM assets WHERE {} LIMIT ?".format(columns, likes), likeParams + [limit])
+
+    def words(self):
+        '''every word of the indexed names, loaded once and kept up to date by _writeFolders'''
+        with self._lock:
+            if self._words is None:
+                rows = self.db.execute("SELECT word FROM words").fetchall()
+                if not rows:
+                    # an index from before the words were kept
+                    self._addWords(row[0] for row in self.db.execute("SELECT DISTINCT name FROM assets"))
+                    self.db.commit()
+                    rows = self.db.execute("SELECT word FROM words").fetchall()
+                self._words = set(row[0] for row in rows)
+            return self._words
+
+    def _addWords(self, names):
+        new = set(word for name in names for word in nameWords(name))
+        if self._words is not None:
+            new -= self._words
+            self._words.update(new)
+        if new:
+            self.db.executemany("INSERT OR IGNORE INTO words (word) VALUES (?)", ((word,) for word in new))
+
+    def fuzzySearch(self, text, limit=DEFAULT_LIMIT):
+        '''assets matching text with typos or letters left out, e.g. "dragn rgi" finds dragon_rig
+
+        each word of text is swapped for the closest words of the indexed names, and the
+        names holding every corrected word are listed, the closest corrections first
+        '''
+        terms = nameWords(text.replace(" ", "_"), minLength=1)
+        if not terms:
+            return []
+        words = list(self.words())
+
+        # (score, word) alternatives of every term, the term itself when names hold it
+        alternatives = []
+        for term in terms:
+            close = difflib.get_close_matches(term, words, FUZZY_ALTERNATIVES, FUZZY_MIN_SCORE) if len(term) >= 3 else []
+            options = [(difflib.SequenceMatcher(None, term, word).ratio(), word) for word in close]
+            if term not in close:
+                options.append((FUZZY_MIN_SCORE, term))
+            alternatives.append(sorted(options, reverse=True))
+
+        combinations = sorted(itertools.islice(itertools.product(*alternatives), FUZZY_COMBINATIONS),
+                              key=lambda combination: -sum(score for score, word in combination))
+        results = []
+        seen = set()
+        for combination in combinations:
+            for record in self.substringSearch([word for score, word in combination], limit - len(results)):
+                if record.path not in seen:
+                    seen.add(record.path)
+                    results.append(record)
+            if len(results) >= limit:
+                break
+        return results
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        '''prefix matches first, then names containing every word of text, then fuzzy matches'''
+        text = text.strip()
+        if not text:
+            return []
+
+        results = self.prefixSearch(text, limit)
+        seen = set(record.path for record in results)
+        for more in (lambda: self.substringSearch(text.split(), limit), lambda: self.fuzzySearch(text, limit)):
+            if len(results) >= limit:
+                break
+            for record in more():
+                if record.path not in seen:
+                    seen.add(record.path)
+                    results.append(record)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def query(self, project=None, dcc=None, extension=None, folder=None, limit=None):
+        '''assets filtered by project, dcc, extension and/or folder subtree'''
+        where, params = [], []
+        if project is not None:
+            where.append("project = ?")
+            params.append(project)
+        if dcc is not None:
+            where.append("dcc = ?")
+            params.append(dcc)
+        if extension is not None:
+            where.append("extension = ?")
+            params.append(extension.lower())
+        if folder is not None:
+            folder = os.path.abspath(folder)
+            where.append("(folder = ? OR folder LIKE ? ESCAPE '\\')")
+            params.extend([folder, escapeLike(folder + os.sep) + "%"])
+
+        sql = "SELECT {} FROM assets".format(", ".join(COLUMNS))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY path"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._select(sql, params)
+
+    def count(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+
+def escapeLike(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class _WatchHandler(FileSystemEventHandler):
+    '''queues the folders touched by watchdog events'''
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.touched(path, event.is_directory)
+
+class IndexWatcher():
+    '''keeps an index current, with watchdog events if available, else by polling
+
+    the index is reconciled with the disk before the watcher starts; with watchdog only the
+    folders its events name are read again, without it the whole root is reconciled every
+    pollInterval seconds. reconcileInterval also reconciles with watchdog running, e.g. for
+    network shares that miss events, None never does
+    '''
+    def __init__(self, index, pollInterval=DEFAULT_POLL_INTERVAL, debounce=0.5, reconcileInterval=None):
+        self.index = index
+        self.pollInterval = pollInterval
+        self.reconcileInterval = reconcileInterval
+        self.debounce = debounce
+        self.listeners = [] # called from the thread after every pass with the folders it changed
+        self._dirty = set() # folders whose files changed
+        self._dirtyTrees = set() # folders created or moved in, reindexed with their subtree
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_WatchHandler(self), self.index.root, recursive=True)
+            self._observer.start()
+        self._thread = threading.Thread(target=self._loop, name="pmt-index-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread:
+            self._thread.join()
+
+    def touched(self, path, isDirectory=False):
+        '''mark the folder holding path, and path itself if it's a folder, for reindexing'''
+        parts = os.path.relpath(path, self.index.root).split(os.sep)
+        if any(isSkipped(part) for part in parts):
+            return
+        with self._lock:
+            self._dirty.add(os.path.dirname(path))
+            if isDirectory:
+                self._dirtyTrees.add(path)
+        self._wake.set()
+
+    def _loop(self):
+        interval = self.pollInterval if self._observer is None else self.reconcileInterval
+        while not self._stop.is_set():
+            woken = self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self._pass(woken)
+            except Exception:
+                # e.g. a locked database or an unreadable folder, the next pass tries again
+                log.exception("index watcher pass failed")
+
+    def _pass(self, woken):
+        if not woken:
+            # the reconcile interval passed without events, catch up by mtime
+            folders = []
+            self.index.reconcile(folders=folders)
+            self._notify(folders)
+            return
+
+        # let a burst of events settle before touching the database
+        time.sleep(self.debounce)
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            trees, self._dirtyTrees = self._dirtyTrees, set()
+
+        folders = list(dirty)
+        try:
+            for folder in dirty:
+                self.index.refreshFolder(folder)
+            for folder in trees:
+                if os.path.isdir(folder):
+                    for directory, mtime, subdirs, files in Crawler(folder, 1).crawl():
+                        self.index.refreshFolder(directory)
+                        folders.append(directory)
+                else:
+                    self.index.removeTree(folder)
+                    folders.append(folder)
+        except Exception:
+            # put them back for the next pass rather than losing the events
+            with self._lock:
+                self._dirty.update(dirty)
+                self._dirtyTrees.update(trees)
+            raise
+        self._notify(folders)
+
+    def _notify(self, folders):
+        if not folders:
+            return
+        for listener in self.listeners:
+            listener(folders)
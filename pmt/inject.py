@@ -0,0 +1,177 @@
+'''Rule-based utility folder injection for copied trees, and resync of existing projects
+
+which directories get Temp/Tools folders is set in ProjectConfig.xml:
+
+<proj>
+  <utility>
+    <exclude>Intermediate</exclude>
+    <exclude>UE4/*/Plugins</exclude>
+    <include>UE4/*/Content*</include>
+  </utility>
+  <dir name="ArtDepot"> ...
+
+a pattern without a slash matches a directory name anywhere, one with a slash the path
+relative to the project. excluded directories are skipped with everything below them;
+with include patterns only matching directories get utilities
+'''
+import json
+
+import os
+
+import re
+
+import xml.etree.ElementTree as ET
+
+from fnmatch import translate
+
+from pmt.scaffold import ScaffoldPlan, ScaffoldEngine, UTILITY_FOLDERS
+
+from pmt.trace import span
+
+# UE folders that are regenerated by the engine, used when ProjectConfig.xml has no rules
+DEFAULT_EXCLUDES = ("Intermediate", "Saved", "DerivedDataCache", "Binaries")
+
+# never get utilities of their own
+ALWAYS_EXCLUDED = UTILITY_FOLDERS + (".*",)
+
+# directories of a project that have their utilities, relative to the project
+MANIFEST_NAME = "utility_manifest.json"
+
+def compilePatterns(patterns):
+    '''one regex for the name patterns and one for the path patterns'''
+    names = [translate(pattern) for pattern in patterns if "/" not in pattern]
+    paths = [translate(pattern.strip("/")) for pattern in patterns if "/" in pattern]
+    return (re.compile("|".join(names)) if names else None, re.compile("|".join(paths)) if paths else None)
+
+def matchesAny(compiled, relPath):
+    names, paths = compiled
+    return bool((names and names.match(relPath.rsplit("/", 1)[-1])) or (paths and paths.match(relPath)))
+
+class InjectionRules():
+    '''include/exclude globs deciding which directories get utility folders'''
+    def __init__(self, include=(), exclude=DEFAULT_EXCLUDES):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self._include = compilePatterns(self.include)
+        self._exclude = compilePatterns(ALWAYS_EXCLUDED + self.exclude)
+
+    @classmethod
+    def fromConfig(cls, projectConfig):
+        '''rules from the utility element of ProjectConfig.xml, the defaults without one'''
+        utility = ET.parse(projectConfig).getroot().find("utility")
+        if utility is None:
+            return cls()
+        include = [elem.text.strip() for elem in utility.iterfind("include") if elem.text]
+        exclude = [elem.text.strip() for elem in utility.iterfind("exclude") if elem.text]
+        return cls(include, exclude)
+
+    def excluded(self, relPath):
+        '''whether a directory and everything below it is skipped'''
+        return matchesAny(self._exclude, relPath)
+
+    def included(self, relPath):
+        '''whether a directory that isn't excluded gets utilities'''
+        return not self.include or matchesAny(self._include, relPath)
+
+class Target():
+    '''a directory that should have utility folders, and the ones it lacks'''
+    def __init__(self, path, relPath, missing, hasConfig):
+        self.path = path
+        self.relPath = relPath
+        self.missing = missing # utility folder names to create
+        self.hasConfig = hasConfig
+
+    def __repr__(self):
+        return "Target({})".format(self.relPath)
+
+def findTargets(start, project, rules, includeStart=False):
+    '''directories under start that the rules select, paths relative to project'''
+    targets = []
+    stack = [(start, os.path.relpath(start, project).replace(os.sep, "/"))]
+    first = True
+    while stack:
+        directory, relPath = stack.pop()
+        try:
+            with os.scandir(directory) as scan:
+                children = [entry for entry in scan if entry.is_dir(follow_symlinks=False)]
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        if (includeStart or not first) and rules.included(relPath):
+            names = set(entry.name for entry in children)
+            missing = [name for name in UTILITY_FOLDERS if name not in names]
+            hasConfig = "Tools" in names and os.path.exists(os.path.join(directory, "Tools", "config.xml"))
+            targets.append(Target(directory, relPath, missing, hasConfig))
+        first = False
+
+        for entry in children:
+            childPath = entry.name if relPath == "." else relPath + "/" + entry.name
+            if not rules.excluded(childPath):
+                stack.append((entry.path, childPath))
+
+    return targets
+
+def injectUtilities(targets, configTemplate, workers=None, progress=None):
+    '''create the missing utility folders and configs of the targets on a worker pool'''
+    plan = ScaffoldPlan(configTemplate)
+    for target in targets:
+        if target.missing or not target.hasConfig:
+            plan.addFolder(target.path, existing=True, utilities=target.missing, config=not target.hasConfig)
+
+    with span("inject.utilities", targets=len(targets), operations=len(plan.operations)):
+        return ScaffoldEngine(workers, progress).run(plan)
+
+def manifestPath(project):
+    return os.path.join(project, "Tools", MANIFEST_NAME)
+
+def readUtilityManifest(project):
+    '''relative paths of the directories given utilities by the last sync, empty if never synced'''
+    try:
+        with open(manifestPath(project)) as manifestFile:
+            return set(json.load(manifestFile)["dirs"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return set()
+
+def writeUtilityManifest(project, relPaths):
+    path = manifestPath(project)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # replace in one step so an interrupted write keeps the old manifest
+    with open(path + ".tmp", "w") as manifestFile:
+        json.dump({"version": 1, "dirs": sorted(relPaths)}, manifestFile, indent=0)
+    os.replace(path + ".tmp", path)
+
+class ResyncReport():
+    '''what a resync found and did'''
+    def __init__(self, added, removed, result=None):
+        self.added = added # targets new since the last sync
+        self.removed = removed # relative paths gone since the last sync
+        self.result = result # ScaffoldResult, None for a dry run
+
+    def __repr__(self):
+        return "ResyncReport(added={}, removed={})".format(len(self.added), len(self.removed))
+
+def resync(project, projectConfig, configTemplate, workers=None, dryRun=False, progress=None):
+    '''give directories added since the last sync their utility folders
+
+    the tree is diffed against the manifest the last sync or the project's creation left
+    in Tools, only directories missing from it are touched
+    '''
+    project = os.path.abspath(project)
+    rules = InjectionRules.fromConfig(projectConfig)
+
+    with span("inject.resync", path=project) as resyncSpan:
+        known = readUtilityManifest(project)
+        targets = findTargets(project, project, rules, includeStart=True)
+        current = set(target.relPath for target in targets)
+
+        added = [target for target in targets if target.relPath not in known]
+        removed = sorted(known - current)
+        resyncSpan.set(dirs=len(targets), added=len(added), removed=len(removed))
+
+        if dryRun:
+            return ResyncReport(added, removed)
+
+        result = injectUtilities(added, configTemplate, workers, progress)
+        writeUtilityManifest(project, current)
+    return ResyncReport(added, removed, result)
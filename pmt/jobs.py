@@ -0,0 +1,196 @@
+'''Background job queue for filesystem operations with path-prefix locking'''
+import os
+
+import threading
+
+import time
+
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+# default number of jobs running at once
+DEFAULT_WORKERS = 4
+
+class JobCancelled(Exception):
+    '''raised inside a job once it has been cancelled'''
+
+class Job():
+    '''a unit of background work on a set of paths'''
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, name, paths, func, *args, **kwargs):
+        self.name = name
+        self.paths = [normalizePath(path) for path in paths] # paths the job reads or writes
+        self.func = func # called as func(job, *args, **kwargs)
+        self.args = args
+        self.kwargs = kwargs
+
+        self.status = Job.PENDING
+        self.done = 0
+        self.total = 0 # 0 while the amount of work is unknown
+        self.message = ""
+        self.result = None
+        self.error = None # one line error message
+        self.details = None # full traceback
+        self.startTime = None
+        self.endTime = None
+        self.listeners = []
+        self._cancelled = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (Job.DONE, Job.FAILED, Job.CANCELLED)
+
+    @property
+    def seconds(self):
+        '''run time, not counting the time spent queued'''
+        if self.startTime is None:
+            return 0.0
+        return (self.endTime or time.perf_counter()) - self.startTime
+
+    def setProgress(self, done, total=None, message=None):
+        '''report progress from inside the job, also the point where cancelling takes effect'''
+        self.checkCancelled()
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        self._notify()
+
+    def forEach(self, items, func):
+        '''call func on every item, reporting progress and honouring cancel between items'''
+        for index, item in enumerate(items):
+            self.setProgress(index, len(items), os.path.basename(str(item)))
+            func(item)
+        self.setProgress(len(items), len(items), "")
+
+    def cancel(self):
+        '''ask the job to stop, pending jobs never start'''
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def checkCancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+
+    def run(self):
+        '''run the job function and record the outcome'''
+        self.status = Job.RUNNING
+        self.startTime = time.perf_counter()
+        self._notify()
+        try:
+            self.checkCancelled()
+            self.result = self.func(self, *self.args, **self.kwargs)
+            self.status = Job.DONE
+        except JobCancelled:
+            self.status = Job.CANCELLED
+        except Exception as error:
+            self.status = Job.FAILED
+            self.error = "{}: {}".format(type(error).__name__, error)
+            self.details = traceback.format_exc()
+        self.endTime = time.perf_counter()
+        self._notify()
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self)
+
+    def __repr__(self):
+        return "Job({}, {})".format(self.name, self.status)
+
+def normalizePath(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def pathsOverlap(first, second):
+    '''true if one path is the other or inside it'''
+    if first == second:
+        return True
+    shorter, longer = sorted((first, second), key=len)
+    return longer.startswith(shorter.rstrip(os.sep) + os.sep)
+
+class JobQueue():
+    '''runs jobs on a worker pool, serializing jobs whose paths overlap'''
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-job")
+        self.pending = [] # jobs in submission order
+        self.running = []
+        self.listeners = [] # called with every job that changes
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, job):
+        '''queue a job, it starts as soon as no earlier job holds an overlapping path'''
+        job.listeners.append(self._jobChanged)
+        with self._lock:
+            self.pending.append(job)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def cancel(self, job):
+        '''cancel a pending or running job'''
+        job.cancel()
+        with self._lock:
+            removed = job in self.pending
+            if removed:
+                self.pending.remove(job)
+                job.status = Job.CANCELLED
+                self._idle.notify_all()
+        if removed:
+            self._notify(job)
+            self._dispatch()
+
+    def _dispatch(self):
+        '''start every pending job that doesn't overlap a running or earlier pending job'''
+        with self._lock:
+            blocked = [path for job in self.running for path in job.paths]
+            for job in list(self.pending):
+                if any(pathsOverlap(path, other) for path in job.paths for other in blocked):
+                    # later jobs on the same paths wait their turn behind this one
+                    blocked.extend(job.paths)
+                    continue
+                self.pending.remove(job)
+                self.running.append(job)
+                blocked.extend(job.paths)
+                self.pool.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            job.run()
+        finally:
+            with self._lock:
+                self.running.remove(job)
+                self._idle.notify_all()
+            self._dispatch()
+
+    def _jobChanged(self, job):
+        self._notify(job)
+
+    def _notify(self, job):
+        for listener in self.listeners:
+            listener(job)
+
+    def wait(self, timeout=None):
+        '''block until every queued job has finished'''
+        with self._lock:
+            return self._idle.wait_for(lambda: not self.pending and not self.running, timeout)
+
+    def shutdown(self, cancel=True):
+        '''stop the queue, cancelling outstanding jobs unless told otherwise'''
+        if cancel:
+            with self._lock:
+                jobs = self.pending + self.running
+            for job in jobs:
+                self.cancel(job)
+        else:
+            self.wait()
+        self.pool.shutdown(wait=True)
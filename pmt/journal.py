@@ -0,0 +1,195 @@
+'''Write-ahead journal of a job's planned steps, so interrupted jobs can resume or roll back
+
+a journal is a JSON lines file in a .pmt_journal folder: a header, the planned steps,
+then batches of completed step numbers. it is written before any step runs and removed
+once the job finishes, so every journal left behind belongs to an interrupted job.
+
+completions are buffered and written every DEFAULT_BATCH_SIZE steps or DEFAULT_BATCH_SECONDS,
+which keeps the journal cheap but means the last few finished steps may not be recorded;
+every step is written so it can safely run again
+'''
+import json
+
+import os
+
+import threading
+
+import time
+
+import uuid
+
+from pmt.trash import hidePath
+
+JOURNAL_NAME = ".pmt_journal"
+
+# completed steps buffered before they're written out
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_BATCH_SECONDS = 0.5
+
+# planned steps per line of the journal file
+PLAN_CHUNK = 1000
+
+class JournalError(ValueError):
+    '''raised for a journal file that can't be read or resumed'''
+
+def journalFolder(directory):
+    return os.path.join(directory, JOURNAL_NAME)
+
+def normalizeTarget(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class Journal():
+    '''planned steps of one job and the ones it has completed'''
+    def __init__(self, path, header, steps, completed=None, resumed=False):
+        self.path = path
+        self.header = header
+        self.steps = steps # lists, the first item is the step's kind
+        self.completed = completed or {} # step number -> result
+        self.resumed = resumed # loaded from an earlier, interrupted run
+        self.batchSize = DEFAULT_BATCH_SIZE
+        self.batchSeconds = DEFAULT_BATCH_SECONDS
+        self._buffer = []
+        self._lastFlush = time.monotonic()
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def id(self):
+        return self.header["id"]
+
+    @property
+    def kind(self):
+        return self.header["kind"]
+
+    @property
+    def target(self):
+        return self.header["target"]
+
+    @classmethod
+    def create(cls, directory, kind, target, steps, **meta):
+        '''write the header and every planned step before the job touches anything'''
+        folder = journalFolder(directory)
+        if not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+            hidePath(folder)
+
+        journalId = "{}-{}".format(time.strftime("%Y%m%d%H%M%S"), uuid.uuid4().hex[:8])
+        header = dict(meta, id=journalId, kind=kind, target=os.path.abspath(target), created=time.time(), steps=len(steps))
+        journal = cls(os.path.join(folder, journalId + ".jsonl"), header, [list(step) for step in steps])
+
+        with open(journal.path, "w") as journalFile:
+            journalFile.write(json.dumps({"header": header}) + "\n")
+            for start in range(0, len(steps), PLAN_CHUNK):
+                journalFile.write(json.dumps({"plan": journal.steps[start:start + PLAN_CHUNK]}) + "\n")
+            journalFile.flush()
+            os.fsync(journalFile.fileno())
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        '''read a journal left by an interrupted job'''
+        header = None
+        steps = []
+        completed = {}
+        with open(path) as journalFile:
+            for line in journalFile:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line of a batch cut short by the crash
+                    break
+                if "header" in record:
+                    header = record["header"]
+                elif "plan" in record:
+                    steps.extend(record["plan"])
+                elif "done" in record:
+                    completed.update((step, result) for step, result in record["done"])
+
+        if header is None or len(steps) != header["steps"]:
+            raise JournalError("incomplete journal {}".format(path))
+        return cls(path, header, steps, completed, resumed=True)
+
+    @classmethod
+    def unfinished(cls, directory):
+        '''journals of interrupted jobs in a directory, oldest first'''
+        journals = []
+        try:
+            names = sorted(os.listdir(journalFolder(directory)))
+        except FileNotFoundError:
+            return journals
+
+        for name in names:
+            if name.endswith(".jsonl"):
+                try:
+                    journals.append(cls.load(os.path.join(journalFolder(directory), name)))
+                except (OSError, JournalError):
+                    # a job that died before its plan was written never touched anything
+                    continue
+        return journals
+
+    @classmethod
+    def find(cls, directory, kind, target):
+        '''newest interrupted journal of a kind of job on target'''
+        target = normalizeTarget(target)
+        matches = [journal for journal in cls.unfinished(directory)
+                   if journal.kind == kind and normalizeTarget(journal.target) == target]
+        return matches[-1] if matches else None
+
+    def isDone(self, step):
+        return step in self.completed
+
+    def pending(self):
+        '''numbers of the steps not recorded as done'''
+        return [step for step in range(len(self.steps)) if step not in self.completed]
+
+    def phase(self, name):
+        '''step number of a ["phase", name] step'''
+        for number, step in enumerate(self.steps):
+            if step[0] == "phase" and step[1] == name:
+                return number
+        raise JournalError("no phase '{}' in journal {}".format(name, self.id))
+
+    def done(self, step, result=None):
+        '''record a completed step, written with the next batch'''
+        with self._lock:
+            self.completed[step] = result
+            self._buffer.append([step, result])
+            due = len(self._buffer) >= self.batchSize or time.monotonic() - self._lastFlush >= self.batchSeconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        '''write the buffered completions'''
+        with self._lock:
+            if not self._buffer:
+                return
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(json.dumps({"done": self._buffer}) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer = []
+            self._lastFlush = time.monotonic()
+
+    def close(self):
+        '''flush and keep the journal, e.g. when the job failed'''
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def complete(self):
+        '''the job finished, nothing left to resume'''
+        with self._lock:
+            self._buffer = []
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __repr__(self):
+        return "Journal({}, {} {}, {}/{} done)".format(self.id, self.kind, self.target, len(self.completed), len(self.steps))
@@ -0,0 +1,286 @@
+'''Opens assets in their applications, grouped per application and throttled
+
+selected assets are grouped by the application version their folder's config resolves
+them to. applications that take several files on the command line get one process per
+group, the others one per file, with at most maxLaunches of them starting at once.
+
+every process started here gets a local port in PMT_IPC_PORT. an application whose
+startup script calls serveOpenRequests (see stubdcc.py) is sent later files over that
+port instead of starting another copy of it
+'''
+import json
+
+import os
+
+import shlex
+
+import socket
+
+import subprocess
+
+import threading
+
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.config import getConfig
+
+from pmt.dedup import breakLink
+
+from pmt.trace import span
+
+# environment variable telling a launched application which port to listen on
+IPC_PORT_VARIABLE = "PMT_IPC_PORT"
+
+# seconds an application counts as starting up unless it answers on its port sooner
+DEFAULT_STARTUP_SECONDS = 20
+
+# seconds between checks on applications that are starting up
+POLL_INTERVAL = 0.1
+
+class LaunchPolicy():
+    '''how an application is started, set with attributes on its dcc element in config.xml
+
+    <dcc name="Photoshop" multiFile="true" maxLaunches="1">
+    '''
+    def __init__(self, multiFile=False, maxLaunches=2, startupSeconds=DEFAULT_STARTUP_SECONDS):
+        self.multiFile = multiFile # every file of a group on one command line
+        self.maxLaunches = maxLaunches # processes starting up at the same time
+        self.startupSeconds = startupSeconds
+
+    @classmethod
+    def forDcc(cls, config, dcc):
+        policy = DEFAULT_POLICIES.get(dcc, cls())
+        element = config.dccs.get(dcc)
+        if element is None:
+            return policy
+
+        multiFile = element.get("multiFile")
+        maxLaunches = element.get("maxLaunches")
+        startupSeconds = element.get("startupSeconds")
+        return cls(policy.multiFile if multiFile is None else multiFile.lower() == "true",
+                   policy.maxLaunches if maxLaunches is None else max(1, int(maxLaunches)),
+                   policy.startupSeconds if startupSeconds is None else float(startupSeconds))
+
+# applications known to open several files from one command line
+DEFAULT_POLICIES = {
+    "Photoshop": LaunchPolicy(multiFile=True, maxLaunches=1),
+}
+
+class Instance():
+    '''a process started by the launcher'''
+    STARTING = "starting"
+    READY = "ready" # answering on its port
+    UNREACHABLE = "unreachable" # running, but never answered
+    EXITED = "exited"
+
+    def __init__(self, application, process, port, startupSeconds):
+        self.application = application
+        self.process = process
+        self.port = port
+        self.started = time.monotonic()
+        self.startupSeconds = startupSeconds
+        self._ready = False
+        self._failed = False # refused files it was sent
+
+    def state(self):
+        if self.process.poll() is not None:
+            return Instance.EXITED
+        if self._failed:
+            return Instance.UNREACHABLE
+        if self._ready:
+            return Instance.READY
+        if self._connect(0.05):
+            self._ready = True
+            return Instance.READY
+        if time.monotonic() - self.started > self.startupSeconds:
+            return Instance.UNREACHABLE
+        return Instance.STARTING
+
+    def send(self, files):
+        '''ask the running application to open files, False if it can't be reached'''
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=5) as connection:
+                connection.sendall((json.dumps({"open": files}) + "\n").encode("utf-8"))
+                reply = connection.makefile("r", encoding="utf-8").readline()
+        except OSError:
+            reply = ""
+
+        # don't send it anything else, start a new copy instead
+        if reply.strip() != "ok":
+            self._failed = True
+            return False
+        return True
+
+    def _connect(self, timeout):
+        try:
+            socket.create_connection(("127.0.0.1", self.port), timeout=timeout).close()
+            return True
+        except OSError:
+            return False
+
+def freePort():
+    '''a local port nothing is listening on right now'''
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def commandFor(application, files):
+    '''command line opening files, application is an executable path or a command'''
+    if os.path.isfile(application):
+        return [application] + list(files)
+    return shlex.split(application, posix=os.name != "nt") + list(files)
+
+class Launcher():
+    '''opens files in their applications, reusing instances it started earlier'''
+    def __init__(self):
+        self.instances = {} # application -> instances started by this launcher
+        self._lock = threading.Lock()
+
+    def group(self, paths):
+        '''application -> (dcc, policy, files) for the assets, in selection order'''
+        groups = {}
+        for path in paths:
+            config = getConfig(os.path.dirname(os.path.abspath(path)))
+
+            # find what dcc the filetype belongs to, and the matching version
+            dcc = config.dccForExtension(os.path.splitext(path)[1])
+            application = config.applicationForExtension(os.path.splitext(path)[1])
+
+            if application not in groups:
+                groups[application] = (dcc, LaunchPolicy.forDcc(config, dcc), [])
+            groups[application][2].append(path)
+        return groups
+
+    def open(self, paths, progress=None):
+        '''open every path, applications are started in parallel with each other
+
+        returns once every file was launched or handed over, progress is called with (done, total)
+        '''
+        # a deduplicated file opened through PMT gets its own copy before anyone saves over it
+        for path in paths:
+            breakLink(path)
+
+        groups = self.group(paths)
+        total = len(paths)
+        done = [0]
+        doneLock = threading.Lock()
+
+        def opened(files):
+            with doneLock:
+                done[0] += len(files)
+                count = done[0]
+            if progress:
+                progress(count, total)
+
+        if len(groups) == 1:
+            application, (dcc, policy, files) = next(iter(groups.items()))
+            self.openGroup(application, policy, files, opened)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(self.openGroup, application, policy, files, opened)
+                       for application, (dcc, policy, files) in groups.items()]
+            for future in futures:
+                future.result()
+
+    def openGroup(self, application, policy, files, opened=None):
+        '''open files that all belong to one application'''
+        batches = [files] if policy.multiFile else [[path] for path in files]
+        for batch in batches:
+            self.openBatch(application, policy, batch)
+            if opened:
+                opened(batch)
+
+    def openBatch(self, application, policy, files):
+        while True:
+            with self._lock:
+                states = [(instance, instance.state()) for instance in self._alive(application)]
+                ready = [instance for instance, state in states if state == Instance.READY]
+                starting = [instance for instance, state in states if state == Instance.STARTING]
+
+                # nothing ready, start another copy if the cap allows
+                if not ready and len(starting) < policy.maxLaunches:
+                    return self.launch(application, files, policy)
+
+            # hand the files to a running copy
+            for instance in ready:
+                with span("launcher.handoff", application=application, files=len(files), pid=instance.process.pid) as handoffSpan:
+                    if instance.send(files):
+                        return instance
+                    handoffSpan.set(failed=True)
+
+            # wait for a copy to finish starting
+            time.sleep(POLL_INTERVAL)
+
+    def launch(self, application, files, policy):
+        '''start the application on files, the caller holds the lock'''
+        port = freePort()
+        environment = dict(os.environ)
+        environment[IPC_PORT_VARIABLE] = str(port)
+
+        with span("launcher.launch", application=application, files=len(files)):
+            process = subprocess.Popen(commandFor(application, files), env=environment)
+
+        instance = Instance(application, process, port, policy.startupSeconds)
+        self.instances.setdefault(application, []).append(instance)
+        return instance
+
+    def _alive(self, application):
+        '''instances of an application that are still running'''
+        alive = [instance for instance in self.instances.get(application, []) if instance.process.poll() is None]
+        self.instances[application] = alive
+        return alive
+
+def serveOpenRequests(openFiles, port=None):
+    '''listen for files sent by the launcher, for an application's startup script
+
+    openFiles is called with a list of paths on a thread of its own, after the launcher
+    was told the files were taken: it waits only a few seconds for that answer and starts
+    another copy of the application if it doesn't get it. returns the listening socket
+    or None when the application wasn't started by PMT
+    '''
+    port = port or os.environ.get(IPC_PORT_VARIABLE)
+    if not port:
+        return None
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", int(port)))
+    server.listen(8)
+
+    def serve():
+        while True:
+            try:
+                connection, address = server.accept()
+            except OSError:
+                # closed
+                return
+            with connection:
+                try:
+                    line = connection.makefile("r", encoding="utf-8").readline()
+                    if not line.strip():
+                        # the launcher checking that we are up
+                        continue
+                    files = json.loads(line)["open"]
+                except (OSError, ValueError, KeyError, TypeError) as error:
+                    try:
+                        connection.sendall("error {}\n".format(error).encode("utf-8"))
+                    except OSError:
+                        pass
+                    continue
+
+                # answer before opening, a slow open would look like a hung application
+                try:
+                    connection.sendall(b"ok\n")
+                except OSError:
+                    # the launcher gave up on us and starts another copy
+                    continue
+
+            threading.Thread(target=openFiles, args=(files,), name="pmt-open-files", daemon=True).start()
+
+    threading.Thread(target=serve, name="pmt-open-requests", daemon=True).start()
+    return server
+
+# shared by every Asset in the process
+appLauncher = Launcher()
@@ -0,0 +1,552 @@
+'''Folder, Project and Asset models, usable without the GUI'''
+import os
+
+import errno
+
+import re
+
+from pathlib import Path
+
+import shutil
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.scaffold import ScaffoldPlan, ScaffoldEngine, Operation
+
+from pmt.inject import InjectionRules, findTargets, injectUtilities, writeUtilityManifest
+
+from pmt.clone import Cloner, AUTO
+
+from pmt.config import getConfig, needsConfig, configMode, configResolver, toolPath, ROOT, COPY
+
+from pmt.templates import templatePool
+
+from pmt.journal import Journal, JournalError
+
+from pmt.trash import Trash
+
+from pmt.launcher import appLauncher
+
+from pmt.versions import VersionStore, moveHistory, removeHistory, openPath
+
+from pmt.trace import span, count, enabled
+
+# assets written at the same time by createAssets
+DEFAULT_ASSET_WORKERS = 8
+
+# kinds of journaled jobs
+PROJECT_JOURNAL = "project"
+RENAME_JOURNAL = "rename"
+DELETE_JOURNAL = "delete"
+
+# journal phases of a project after its scaffold
+UE_PHASES = ("clone", "uproject", "utility")
+
+# roots known to exist in this process
+_readyRoots = set()
+_rootLock = threading.Lock()
+
+def ensureRoot(root=ROOT):
+    '''create the root folder with its config on first use, not at import'''
+    with _rootLock:
+        if root not in _readyRoots:
+            # configs are looked up no further than the root
+            configResolver.addRoot(root)
+            Folder(root)
+            _readyRoots.add(root)
+    return root
+
+#Folders
+class Folder():
+    def __init__(self, path):
+        '''constructor for basic folder class'''
+        
+        self.dir = Path(path).parent # parent directory
+        self.name = os.path.basename(path) # folder name
+        self.path = path # full directory path
+
+        # create the folder if it doesn't exist
+        if not os.path.exists(self.path):
+            self.create()
+
+    def delete(self, trash=None):
+        ''' delete the folder'''
+        with span("Folder.delete", path=self.path) as deleteSpan:
+            # move it into the trash if there is one for this path, it's purged in the background
+            if trash is not None and trash.contains(self.path):
+                try:
+                    deleteSpan.set(method="trash")
+                    return trash.delete(self.path)
+                except OSError as error:
+                    # the trash is on another drive, delete in place instead
+                    if error.errno != errno.EXDEV:
+                        raise
+
+            # recursively deletes folder and children directories
+            deleteSpan.set(method="rmtree")
+            shutil.rmtree(self.path)
+
+    def rename(self, newName):
+        '''rename the folder'''
+        # temporarily store old path
+        oldPath = self.path
+
+        # update name and path variables with new name
+        self.name = newName
+        self.path = os.path.join(self.dir, self.name)
+
+        # rename folder
+        with span("Folder.rename", path=oldPath, target=self.path):
+            os.rename(oldPath, self.path)
+
+    def create(self):
+        ''' Create the folder'''
+        with span("Folder.create", path=self.path):
+            # create folder
+            os.mkdir(self.path)
+            count("mkdirs")
+
+            # create util subfolders
+            self.newUtilitySubfolders(self.path)
+
+    def newUtilitySubfolders(self, path):
+        ''' Create the utility subfolders'''
+        # make Temp folder
+        os.mkdir(os.path.join(path, "Temp"))
+
+        # make tools folder
+        toolsFolder = os.path.join(path, "Tools")
+        os.mkdir(toolsFolder)
+        count("mkdirs", 2)
+
+        # In tools folder, make config file unless it's inherited from a parent folder
+        if needsConfig(path):
+            configTemplate = toolPath("ConfigFileTemplate.xml")
+            configTarget = os.path.join(toolsFolder, "config.xml")
+            shutil.copyfile(configTemplate, configTarget)
+            count("copies")
+
+def checkNewProject(path):
+    '''raise unless path can become a new project or is one whose creation was interrupted
+
+    a new project needs a name and mustn't exist yet, so an artist's project is never written over
+    '''
+    name = os.path.basename(path)
+    if not name.strip():
+        raise ValueError("a project needs a name")
+    if Journal.find(Path(path).parent, PROJECT_JOURNAL, path) is not None:
+        return
+    for existing in (path, os.path.join(path, "UE4", name)):
+        if os.path.exists(existing):
+            raise FileExistsError("{} already exists".format(existing))
+
+class Project(Folder):
+    def __init__(self, path, workers=None, progress=None, cloneStrategy=AUTO):
+        # how the UE4 template gets copied: auto, reflink, hardlink or copy
+        self.cloneStrategy = cloneStrategy
+
+        # refused before a journal is written, only an interrupted run carries on in an existing folder
+        checkNewProject(path)
+
+        # a rollback only removes the project folder if this run made it
+        self.createdRoot = not os.path.exists(path)
+
+        # initialize project folder
+        super().__init__(path)
+
+        self.createDirectory(workers, progress)
+
+    def createDirectory(self, workers=None, progress=None):
+        with span("Project.createDirectory", path=self.path) as projectSpan:
+            # compile the xml Directory file into a flat plan of folders, utility folders and configs
+            projectConfig = toolPath("ProjectConfig.xml")
+            configTemplate = toolPath("ConfigFileTemplate.xml")
+
+            # in layered mode the subfolders inherit the project's config instead of copying it
+            if configMode(projectConfig) != COPY:
+                configTemplate = None
+
+            # an interrupted creation of this project resumes from its journal instead of starting over
+            self.journal = Journal.find(self.dir, PROJECT_JOURNAL, self.path)
+            if self.journal:
+                plan = ScaffoldPlan.fromSteps(self.journal.steps[:self.journal.header["scaffoldSteps"]], self.journal)
+            else:
+                plan = ScaffoldPlan.fromConfig(self.path, projectConfig, configTemplate)
+
+                # every step is in the journal before the first folder is made
+                steps = plan.toSteps() + [["phase", phase] for phase in UE_PHASES]
+                self.journal = Journal.create(self.dir, PROJECT_JOURNAL, self.path, steps, scaffoldSteps=len(plan.operations),
+                                              createdRoot=self.createdRoot, cloneStrategy=self.cloneStrategy)
+            projectSpan.set(resumed=self.journal.resumed)
+
+            try:
+                # run the plan on a thread pool, parents before children
+                self.scaffoldResult = ScaffoldEngine(workers, progress, self.journal).run(plan)
+                projectSpan.set(folders=self.scaffoldResult.created, copies=self.scaffoldResult.copied)
+
+                self.createUEProject(workers)
+
+                # record what has its utilities, a resync then only looks at directories added later
+                folders = [self.path] + [op.path for op in plan.ofKind(Operation.FOLDER)] + [target.path for target in self.utilityTargets]
+                writeUtilityManifest(self.path, [os.path.relpath(folder, self.path).replace(os.sep, "/") for folder in folders])
+            except BaseException:
+                # keep the journal for a resume or rollback
+                self.journal.close()
+                raise
+
+            self.journal.complete()
+
+    def createUEProject(self, workers=None):
+        # copy the UE4 project
+        UESource = toolPath("UE4Project")
+        UE4Project = "UE4Project"
+
+        UESource = toolPath(UE4Project)
+        UERoot= os.path.join(self.path, "UE4")
+        UEPath = os.path.join(UERoot, "{}".format(self.name))
+
+        with span("Project.createUEProject", path=UEPath, strategy=self.cloneStrategy):
+            # clone with reflinks/hardlinks where the filesystem allows, else copy
+            self.cloner = Cloner(self.cloneStrategy)
+            if not self._phaseDone("clone"):
+                # an interrupted clone carries on, skipping the files it finished
+                self.cloner.clone(UESource, UEPath, resume=self._resumed())
+                self._finishPhase("clone")
+
+            # rename the uproject file
+            UEProject = os.path.join(UEPath, "{}.uproject".format(UE4Project))
+            UEProjectName = os.path.join(UEPath, "{}.uproject".format(self.name))
+            if not self._phaseDone("uproject"):
+                # never over a .uproject that is already there
+                if not os.path.exists(UEProjectName):
+                    os.rename(UEProject, UEProjectName)
+                self._finishPhase("uproject")
+
+            #make the config folder setup
+            # get the folder directories in the UE4 project the ProjectConfig.xml rules select,
+            # skipping Intermediate, Saved, DerivedDataCache and Binaries unless told otherwise
+            projectConfig = toolPath("ProjectConfig.xml")
+            with span("Project.ueWalk", path=UERoot) as walkSpan:
+                rules = InjectionRules.fromConfig(projectConfig)
+                self.utilityTargets = findTargets(UERoot, self.path, rules)
+                walkSpan.set(dirs=len(self.utilityTargets))
+
+            # in layered mode the folders inherit the project's config
+            configTemplate = toolPath("ConfigFileTemplate.xml") if configMode(projectConfig) == COPY else None
+
+            # make the config folders on a worker pool, only the missing ones when resuming
+            with span("Project.ueUtility", folders=len(self.utilityTargets)):
+                self.utilityResult = injectUtilities(self.utilityTargets, configTemplate, workers)
+            self._finishPhase("utility")
+
+    def _resumed(self):
+        journal = getattr(self, "journal", None)
+        return journal is not None and journal.resumed
+
+    def _phaseDone(self, phase):
+        journal = getattr(self, "journal", None)
+        return journal is not None and journal.isDone(journal.phase(phase))
+
+    def _finishPhase(self, phase):
+        journal = getattr(self, "journal", None)
+        if journal is not None:
+            journal.done(journal.phase(phase))
+            journal.flush()
+class Asset():
+    def __init__(self, path, app=None, assetType=None):
+        '''constructor for basic asset class'''
+
+        self.dir = Path(path).parent # parent directory
+        self.name = os.path.basename(path) # asset name
+        self.path = path # full path
+
+        # if there's an application, store it
+        if app != None:
+            self.app = app
+
+        # if there's an assetType, store it
+        if assetType != None:
+            self.assetType = assetType
+
+        # create template if it doesn't exist
+        if not os.path.exists(self.path):
+            self.create()
+    def create(self):
+        ''' create template asset '''
+        with span("Asset.create", path=self.path, app=self.app, assetType=self.assetType) as assetSpan:
+            # get the parsed config of the asset's folder
+            config = getConfig(self.dir)
+
+            # get first filetype of the dcc
+            fileType = config.fileType(self.app)
+
+            self.path += fileType
+
+            # find matching template file from tool configuration
+            fileTemplate = config.template(self.app, self.assetType)
+            fileTemplatePath = toolPath(fileTemplate)
+
+            # write the pooled template into proper directory with the proper name
+            templatePool.write(fileTemplatePath, self.path)
+            if enabled():
+                assetSpan.set(copies=1, bytes=os.path.getsize(self.path))
+
+    def delete(self):
+        ''' delete the asset and its saved versions '''
+        with span("Asset.delete", path=self.path):
+            os.remove(self.path)
+            removeHistory(self.path)
+    def rename(self, newName):
+        '''rename the asset'''
+        # temporarily store old path
+        oldPath = self.path
+
+        # update name and path variables with new name
+        self.name = newName
+        self.path = os.path.join(self.dir, self.name)
+
+        # rename asset, its saved versions go with it
+        with span("Asset.rename", path=oldPath, target=self.path):
+            os.rename(oldPath, self.path)
+            moveHistory(oldPath, self.path)
+    def open(self, version=None):
+        ''' open asset, or one of its saved versions'''
+        path = self.path
+        if version is not None:
+            # past versions are written to the folder's Temp folder and opened from there
+            store = VersionStore(self.dir)
+            path = openPath(self.path, store.version(os.path.basename(self.path), version))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            store.materialize(os.path.basename(self.path), version, path)
+
+        with span("Asset.open", path=path):
+            # the launcher finds the dcc and version from the folder's config, and hands the
+            # file to a copy of it PMT started earlier if there is one
+            appLauncher.open([path])
+    def saveVersion(self, note=""):
+        '''save the asset as its next version, returns the Version'''
+        return VersionStore(self.dir).save(self.path, note)
+    def versions(self):
+        '''saved versions of the asset, oldest first'''
+        return VersionStore(self.dir).versions(os.path.basename(self.path))
+    def restoreVersion(self, version):
+        '''replace the asset by a saved version, the current file is saved as a version first'''
+        return VersionStore(self.dir).restore(self.path, version)
+
+def expandNames(text):
+    '''asset names from a comma or newline separated list, [start-end:step] expands to numbers
+
+    "hero, villain" -> hero, villain and "shot[010-030:10]" -> shot010, shot020, shot030,
+    numbers are padded to the width of start
+    '''
+    names = []
+    for token in re.split(r"[,;\n]+", text):
+        token = token.strip()
+        if not token:
+            continue
+
+        match = re.match(r"^(.*)\[(\d+)-(\d+)(?::(\d+))?\](.*)$", token)
+        if not match:
+            names.append(token)
+            continue
+
+        prefix, start, end, step, suffix = match.groups()
+        if int(end) < int(start) or (step is not None and int(step) < 1):
+            raise ValueError("bad range in '{}'".format(token))
+        for number in range(int(start), int(end) + 1, int(step or 1)):
+            names.append("{}{}{}".format(prefix, str(number).zfill(len(start)), suffix))
+    return names
+
+def createAssets(folder, names, app, assetType, workers=DEFAULT_ASSET_WORKERS, progress=None):
+    '''create many assets of one type in a folder at once, returns the created paths
+
+    the config and template are resolved once and the files written in parallel,
+    names whose file already exists are skipped. progress is called with (done, total)
+    '''
+    with span("Asset.createMany", path=folder, app=app, assetType=assetType, assets=len(names)) as bulkSpan:
+        # same lookups as Asset.create, once for every asset
+        config = getConfig(folder)
+        fileType = config.fileType(app)
+        fileTemplatePath = toolPath(config.template(app, assetType))
+        targets = [os.path.join(folder, name + fileType) for name in names]
+
+        def write(target):
+            try:
+                return templatePool.write(fileTemplatePath, target, exclusive=True)
+            except FileExistsError:
+                return None
+
+        created = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(write, target) for target in targets]
+            try:
+                for done, future in enumerate(futures):
+                    path = future.result()
+                    if path:
+                        created.append(path)
+                    if progress:
+                        progress(done + 1, len(futures))
+            except BaseException:
+                # e.g. a cancelled job, don't start the rest
+                for future in futures:
+                    future.cancel()
+                raise
+
+        bulkSpan.set(created=len(created))
+    return created
+
+def renameAll(renames, journalDir, progress=None):
+    '''rename (old path, new path) pairs, journaled in journalDir so an interrupted run can resume or roll back'''
+    journal = Journal.create(journalDir, RENAME_JOURNAL, journalDir, [["rename", old, new] for old, new in renames])
+    runJournal(journal, progress=progress)
+
+def deleteAll(paths, journalDir, trash=None, progress=None):
+    '''delete folders (into the trash if given) and files, journaled like renameAll
+
+    a rollback can only bring back what went into the trash
+    '''
+    trashRoot = trash.root if trash is not None else None
+    journal = Journal.create(journalDir, DELETE_JOURNAL, journalDir, [["delete", path] for path in paths], trash=trashRoot)
+    runJournal(journal, trash, progress)
+
+def runJournal(journal, trash=None, progress=None, workers=None):
+    '''run the steps of a journal that aren't done yet, then remove it'''
+    if journal.kind == PROJECT_JOURNAL:
+        # Project finds its own journal and carries on from it
+        Project(journal.target, workers, progress and (lambda done, total, phase: progress(done, total)),
+                journal.header.get("cloneStrategy", AUTO))
+        return
+
+    if journal.kind == DELETE_JOURNAL and trash is None and journal.header.get("trash"):
+        trash = Trash(journal.header["trash"])
+
+    if journal.kind == RENAME_JOURNAL and journal.resumed:
+        # renames that ran after the last journal write are done, running them again could rename over a path
+        ran = renamesRun(journal)
+        if ran is None:
+            journal.close()
+            raise JournalError("the paths of journal {} changed since it was interrupted, roll it back or remove it".format(journal.id))
+        for number in journal.pending()[:ran]:
+            journal.done(number)
+
+    try:
+        pending = journal.pending()
+        total = len(journal.steps)
+        for index, number in enumerate(pending):
+            step = journal.steps[number]
+            with span("Journal." + step[0], path=step[1]):
+                journal.done(number, _runStep(step, trash))
+            if progress:
+                progress(total - len(pending) + index + 1, total)
+    except BaseException:
+        journal.close()
+        raise
+    journal.complete()
+
+def _runStep(step, trash):
+    '''one rename or delete, a no-op when an interrupted run already did it'''
+    if step[0] == "rename":
+        kind, old, new = step
+        if os.path.lexists(new):
+            # never over another path, only a rename that already ran leaves its new name taken
+            if os.path.lexists(old):
+                raise FileExistsError("can't rename {}, {} exists".format(old, new))
+        else:
+            os.rename(old, new)
+        moveHistory(old, new)
+        return None
+
+    if step[0] == "delete":
+        path = step[1]
+        if not os.path.lexists(path):
+            # the versions of a file removed just before an interruption
+            removeHistory(path)
+            return None
+        if os.path.isdir(path) and not os.path.islink(path):
+            entry = Folder(path).delete(trash)
+            return entry.id if entry is not None else None
+        # a folder's versions go with it, a file's are removed with it
+        os.remove(path)
+        removeHistory(path)
+        return None
+
+    raise JournalError("unknown journal step {}".format(step[0]))
+
+def renamesRun(journal):
+    '''how many pending steps of a rename journal ran after its last write, None if the paths don't tell
+
+    steps run in order, so the ones that ran are the first pending ones. it is the fewest that
+    leave the next step ready to run (its old path there, its new one free) and that can be
+    undone one by one from the paths as they are now
+    '''
+    pending = [journal.steps[number] for number in journal.pending()]
+    for count in range(len(pending) + 1):
+        if count < len(pending):
+            kind, old, new = pending[count]
+            if not os.path.lexists(old) or os.path.lexists(new):
+                continue
+        if _undoable(pending[:count]):
+            return count
+    return None
+
+def _undoable(renames):
+    '''whether renames that ran can be undone from the last, tried in memory on the paths as they are'''
+    present = {} # normcased path -> there after the undos so far
+    def exists(path):
+        key = os.path.normcase(path)
+        return present[key] if key in present else os.path.lexists(path)
+
+    for kind, old, new in reversed(renames):
+        if not exists(new) or exists(old):
+            return False
+        present[os.path.normcase(new)] = False
+        present[os.path.normcase(old)] = True
+    return True
+
+def rollbackJournal(journal, trash=None):
+    '''undo what an interrupted job did, returns the paths it couldn't restore'''
+    failed = []
+    if journal.kind == PROJECT_JOURNAL:
+        if journal.header.get("createdRoot"):
+            # the job made the project folder, everything in it is its own
+            if os.path.exists(journal.target):
+                shutil.rmtree(journal.target)
+        else:
+            # only the folders it made, deepest first
+            folders = [step for number, step in enumerate(journal.steps[:journal.header["scaffoldSteps"]])
+                       if step[0] == Operation.FOLDER and journal.completed.get(number)]
+            for step in sorted(folders, key=lambda step: step[4], reverse=True):
+                shutil.rmtree(step[1], ignore_errors=True)
+
+    elif journal.kind == RENAME_JOURNAL:
+        # the recorded renames and those that ran after the last journal write. the others
+        # never ran, their new name may be another path's old one
+        pending = journal.pending()
+        ran = set(journal.completed) | set(pending[:renamesRun(journal) or 0])
+
+        # undone in reverse, a later rename may have used an earlier one's old name
+        for number in sorted(ran, reverse=True):
+            kind, old, new = journal.steps[number]
+            if os.path.lexists(new) and not os.path.lexists(old):
+                os.rename(new, old)
+            moveHistory(new, old)
+
+    elif journal.kind == DELETE_JOURNAL:
+        if trash is None and journal.header.get("trash"):
+            trash = Trash(journal.header["trash"])
+        for number, (kind, path) in enumerate(journal.steps):
+            if os.path.lexists(path):
+                continue
+            entry = None
+            if trash is not None:
+                entryId = journal.completed.get(number)
+                entry = next((entry for entry in trash.entries() if entry.id == entryId), None) if entryId else trash.find(path)
+            if entry is None:
+                failed.append(path)
+            else:
+                trash.restore(entry)
+
+    journal.complete()
+    return failed
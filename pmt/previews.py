@@ -0,0 +1,272 @@
+'''Thumbnails of assets, generated on a worker pool and cached on disk
+
+image files are decoded and scaled directly, PSD/PSB files give their embedded thumbnail
+so the layers are never read, and other formats can register an extractor:
+
+    registerExtractor((".blend",), blendThumbnail) # path -> encoded image bytes or None
+
+thumbnails are cached as PNG files under PMT_PREVIEW_CACHE (default ~/.pmt/previews)
+keyed by the asset's path, size and mtime, so an edited asset gets a new one. the
+least recently used are removed once the cache grows past its cap
+'''
+import hashlib
+
+import io
+
+import os
+
+import struct
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.trace import span
+
+try:
+    from PIL import Image
+except ImportError: # optional, the GUI scales with Qt instead
+    Image = None
+
+# edge of the square a thumbnail fits in, in pixels
+DEFAULT_SIZE = 256
+
+# total bytes of cached thumbnails
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+DEFAULT_WORKERS = 4
+
+# image files bigger than this aren't read for a preview
+MAX_SOURCE_BYTES = 64 * 2**20
+
+# without a scaler, extracted images up to this size are cached as they are
+MAX_UNSCALED_BYTES = 256 * 2**10
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tga", ".tif", ".tiff", ".webp")
+
+# PSD image resources holding a JPEG thumbnail, 1033 is the one Photoshop 4 wrote
+PSD_THUMBNAIL_RESOURCES = (1036, 1033)
+
+def defaultCacheFolder():
+    return os.environ.get("PMT_PREVIEW_CACHE") or os.path.join(os.path.expanduser("~"), ".pmt", "previews")
+
+def readImage(path):
+    '''the file itself, to be decoded by the scaler'''
+    if os.path.getsize(path) > MAX_SOURCE_BYTES:
+        return None
+    with open(path, "rb") as imageFile:
+        return imageFile.read()
+
+def psdThumbnail(path):
+    '''JPEG thumbnail Photoshop stores in the image resources section'''
+    with open(path, "rb") as psdFile:
+        header = psdFile.read(26)
+        if header[:4] != b"8BPS":
+            return None
+
+        # skip the color mode data
+        length, = struct.unpack(">I", psdFile.read(4))
+        psdFile.seek(length, os.SEEK_CUR)
+
+        length, = struct.unpack(">I", psdFile.read(4))
+        end = psdFile.tell() + length
+        while psdFile.tell() + 12 <= end:
+            signature, resource, nameLength = struct.unpack(">4sHB", psdFile.read(7))
+            if signature != b"8BIM":
+                return None
+            # pascal string name padded to an even length
+            psdFile.seek(nameLength + (nameLength + 1) % 2, os.SEEK_CUR)
+            size, = struct.unpack(">I", psdFile.read(4))
+            if resource in PSD_THUMBNAIL_RESOURCES:
+                # 28 byte header (format, width, height, ...) before the JPEG data
+                return psdFile.read(size)[28:]
+            psdFile.seek(size + size % 2, os.SEEK_CUR)
+    return None
+
+# extension -> function returning encoded image bytes of a path, or None
+extractors = dict.fromkeys(IMAGE_EXTENSIONS, readImage)
+extractors.update({".psd": psdThumbnail, ".psb": psdThumbnail})
+
+def registerExtractor(extensions, extractor):
+    for extension in extensions:
+        extractors[extension.lower()] = extractor
+
+def hasExtractor(path):
+    return os.path.splitext(path)[1].lower() in extractors
+
+def pillowScale(data, size):
+    '''PNG bytes of an encoded image scaled to fit size, with Pillow'''
+    image = Image.open(io.BytesIO(data))
+    # JPEGs decode straight to a smaller size
+    image.draft("RGB", (size, size))
+    image.thumbnail((size, size))
+    output = io.BytesIO()
+    image.convert("RGBA").save(output, "PNG")
+    return output.getvalue()
+
+class PreviewCache():
+    '''thumbnails on disk, a file per key, empty for assets without a preview'''
+    def __init__(self, folder=None, maxBytes=DEFAULT_MAX_BYTES):
+        self.folder = folder or defaultCacheFolder()
+        self.maxBytes = maxBytes
+        self._size = None # bytes in the folder, counted on the first put
+        self._lock = threading.Lock()
+
+    def key(self, path, info, size):
+        source = "{}|{}|{}|{}".format(os.path.normcase(os.path.abspath(path)), info.st_size, info.st_mtime_ns, size)
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def file(self, key):
+        return os.path.join(self.folder, key[:2], key + ".png")
+
+    def get(self, key):
+        '''(found, data), data is None for an asset known to have no preview'''
+        path = self.file(key)
+        try:
+            with open(path, "rb") as previewFile:
+                data = previewFile.read()
+        except FileNotFoundError:
+            return False, None
+
+        # mtime is the last use, trim drops the oldest
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, data or None
+
+    def put(self, key, data):
+        path = self.file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as previewFile:
+            previewFile.write(data or b"")
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.totalBytes()
+            else:
+                self._size += len(data or b"")
+            full = self._size > self.maxBytes
+        if full:
+            self.trim()
+
+    def totalBytes(self):
+        return sum(size for path, size, used in self._files())
+
+    def trim(self, fraction=0.9):
+        '''remove the least recently used thumbnails until the cache is below fraction of the cap'''
+        with self._lock:
+            files = sorted(self._files(), key=lambda item: item[2])
+            total = sum(size for path, size, used in files)
+            for path, size, used in files:
+                if total <= self.maxBytes * fraction:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    continue
+            self._size = total
+
+    def clear(self):
+        with self._lock:
+            for path, size, used in self._files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+    def _files(self):
+        '''(path, size, last use) of every cached thumbnail'''
+        files = []
+        try:
+            folders = [entry.path for entry in os.scandir(self.folder) if entry.is_dir()]
+        except FileNotFoundError:
+            return files
+        for folder in folders:
+            with os.scandir(folder) as scan:
+                for entry in scan:
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((entry.path, info.st_size, info.st_mtime))
+        return files
+
+class PreviewService():
+    '''thumbnails of assets, read from the cache or generated on a worker pool
+
+    scale turns encoded image bytes into a PNG of at most size pixels, Pillow's when installed
+    '''
+    def __init__(self, cache=None, scale=None, size=DEFAULT_SIZE, workers=DEFAULT_WORKERS):
+        self.cache = cache or PreviewCache()
+        self.scale = scale or (pillowScale if Image is not None else None)
+        self.size = size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-preview")
+        self._wanted = set() # paths still worth generating
+        self._queued = set()
+        self._lock = threading.Lock()
+
+    def preview(self, path):
+        '''PNG bytes of a path's thumbnail, None if it has none'''
+        if not hasExtractor(path):
+            return None
+        try:
+            info = os.stat(path)
+        except OSError:
+            return None
+
+        key = self.cache.key(path, info, self.size)
+        found, data = self.cache.get(key)
+        if found:
+            return data
+
+        with span("preview.generate", path=path) as previewSpan:
+            data = self.generate(path)
+            previewSpan.set(bytes=len(data or b""))
+        self.cache.put(key, data)
+        return data
+
+    def previewAll(self, paths):
+        '''thumbnails of many paths on the worker pool, e.g. to fill the cache ahead of time'''
+        return list(self._pool.map(self.preview, paths))
+
+    def generate(self, path):
+        try:
+            source = extractors[os.path.splitext(path)[1].lower()](path)
+            if not source:
+                return None
+            if self.scale is None:
+                return source if len(source) <= MAX_UNSCALED_BYTES else None
+            return self.scale(source, self.size)
+        except (OSError, ValueError, struct.error):
+            # unreadable or damaged, cached as having no preview
+            return None
+
+    def request(self, paths, callback):
+        '''generate thumbnails in the background, callback(path, data) runs on a worker thread
+
+        replaces the earlier requests, paths that are no longer asked for are skipped,
+        so scrolling past assets doesn't queue work for them
+        '''
+        with self._lock:
+            self._wanted = set(paths)
+            paths = [path for path in paths if path not in self._queued]
+            self._queued.update(paths)
+
+        for path in paths:
+            self._pool.submit(self._run, path, callback)
+
+    def _run(self, path, callback):
+        with self._lock:
+            self._queued.discard(path)
+            if path not in self._wanted:
+                return
+        callback(path, self.preview(path))
+
+    def shutdown(self):
+        with self._lock:
+            self._wanted = set()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,259 @@
+'''Batch renames from a pattern, planned and checked in memory before anything moves
+
+a pattern is a template of tokens, applied to each selected path in selection order:
+
+    {name}    the old name without its extension, after the optional regex find/replace
+    {ext}     the old extension without the dot
+    {parent}  the name of the folder holding it
+    {n}       a counter from start by step, {n:3} pads it to 3 digits
+    {date}    today as YYYYMMDD
+
+text tokens take a case as their format, e.g. {name:upper}, {parent:lower} or {name:title}.
+asset extensions are kept. text without tokens works like the rename fields always did:
+the text alone for one path, numbered from 1 for several.
+
+the whole mapping is checked before the first rename: invalid names, two paths getting
+the same name, names already taken on disk and paths inside other renamed folders are
+conflicts and nothing is renamed. renames onto another selected path's old name (chains
+and cycles such as a<->b) go through temporary names in two phases
+'''
+import os
+
+import re
+
+import time
+
+import uuid
+
+from pmt.models import renameAll
+
+from pmt.trace import span
+
+TOKEN = re.compile(r"\{(\w+)(?::([^}]*))?\}")
+
+TEXT_TOKENS = ("name", "ext", "parent", "date")
+
+CASES = {
+    "upper": str.upper,
+    "lower": str.lower,
+    "title": str.title,
+    "capitalize": str.capitalize,
+}
+
+# characters Windows doesn't allow in names
+INVALID_CHARACTERS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+RESERVED_NAMES = set(["CON", "PRN", "AUX", "NUL"] + ["COM{}".format(i) for i in range(1, 10)] + ["LPT{}".format(i) for i in range(1, 10)])
+
+TEMP_PREFIX = ".pmt_rename_"
+
+class RenameError(ValueError):
+    '''raised for a pattern that can't be used, or a plan with conflicts'''
+
+def splitName(path):
+    '''(stem, extension) of a path, folders have no extension'''
+    name = os.path.basename(path)
+    if os.path.isdir(path):
+        return name, ""
+    return os.path.splitext(name)
+
+def invalidReason(name):
+    '''why a name can't be used, None if it can'''
+    if not name or name in (".", ".."):
+        return "empty name"
+    if INVALID_CHARACTERS.search(name):
+        return "invalid character in '{}'".format(name)
+    if name[-1] in " .":
+        return "'{}' ends with a space or dot".format(name)
+    if name.split(".")[0].upper() in RESERVED_NAMES:
+        return "'{}' is a reserved name".format(name)
+    return None
+
+def pathKey(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class RenamePattern():
+    '''how new names are made from old ones'''
+    def __init__(self, template="{name}", find=None, replace="", start=1, step=1):
+        self.template = template
+        self.find = find
+        self.replace = replace
+        self.start = start
+        self.step = step
+
+        try:
+            self._find = re.compile(find) if find else None
+        except re.error as error:
+            raise RenameError("invalid find expression '{}': {}".format(find, error))
+
+        # check the tokens now rather than halfway through a selection
+        for token, spec in TOKEN.findall(template):
+            if token == "n":
+                if spec and not spec.isdigit():
+                    raise RenameError("counter width must be a number, not '{}'".format(spec))
+            elif token not in TEXT_TOKENS:
+                raise RenameError("unknown token {{{}}}".format(token))
+            elif spec and spec not in CASES:
+                raise RenameError("unknown case '{}', use one of {}".format(spec, ", ".join(CASES)))
+
+    @classmethod
+    def fromField(cls, text, count):
+        '''pattern of a GUI rename field, plain text is numbered when several paths are renamed'''
+        if "{" not in text and count > 1:
+            text += "{n}"
+        return cls(text)
+
+    def render(self, path, index):
+        '''new name of the index-th selected path'''
+        stem, extension = splitName(path)
+        if self._find is not None:
+            try:
+                stem = self._find.sub(self.replace, stem)
+            except re.error as error:
+                raise RenameError("invalid replacement '{}': {}".format(self.replace, error))
+
+        values = {
+            "name": stem,
+            "ext": extension[1:],
+            "parent": os.path.basename(os.path.dirname(os.path.abspath(path))),
+            "date": time.strftime("%Y%m%d"),
+        }
+
+        def substitute(match):
+            token, spec = match.groups()
+            if token == "n":
+                number = self.start + index * self.step
+                return str(number).zfill(int(spec)) if spec else str(number)
+            value = values[token]
+            return CASES[spec](value) if spec else value
+
+        return TOKEN.sub(substitute, self.template) + extension
+
+class RenamePlan():
+    '''every rename of a selection, checked before any of them runs'''
+    def __init__(self, renames, conflicts, unchanged):
+        self.renames = renames # (old path, new path)
+        self.conflicts = conflicts # (path, reason)
+        self.unchanged = unchanged # paths whose name stays the same
+        self.chained = set() # old paths renamed through a temporary name
+
+        # a target that is another rename's old name has to wait for it to move
+        sources = set(pathKey(old) for old, new in renames)
+        targets = set(pathKey(new) for old, new in renames)
+        for old, new in renames:
+            if pathKey(new) in sources or pathKey(old) in targets:
+                self.chained.add(old)
+
+    @property
+    def ok(self):
+        return not self.conflicts
+
+    def cycles(self):
+        '''groups of paths that swap names among themselves, e.g. a->b->a'''
+        following = dict((pathKey(old), pathKey(new)) for old, new in self.renames)
+        seen = set()
+        cycles = []
+        for start in following:
+            path = start
+            chain = []
+            while path in following and path not in seen:
+                seen.add(path)
+                chain.append(path)
+                path = following[path]
+            if path in chain:
+                cycles.append(chain[chain.index(path):])
+        return cycles
+
+    def steps(self):
+        '''(old, new) renames to run in order, chained renames go through temporary names'''
+        token = uuid.uuid4().hex[:8]
+        first = []
+        direct = []
+        second = []
+        for index, (old, new) in enumerate(self.renames):
+            if old in self.chained:
+                temp = os.path.join(os.path.dirname(old), "{}{}_{}".format(TEMP_PREFIX, token, index))
+                first.append((old, temp))
+                second.append((temp, new))
+            else:
+                direct.append((old, new))
+        return first + direct + second
+
+    def __repr__(self):
+        return "RenamePlan({} renames, {} conflicts)".format(len(self.renames), len(self.conflicts))
+
+def insideRenamed(key, movingKeys):
+    '''the renamed folder holding a path, None if none of its folders are renamed'''
+    parent = os.path.dirname(key)
+    while os.path.dirname(parent) != parent:
+        if parent in movingKeys:
+            return parent
+        parent = os.path.dirname(parent)
+    return None
+
+def planRenames(paths, pattern):
+    '''map every path to its new name and find the conflicts, without touching anything'''
+    with span("rename.plan", paths=len(paths)) as planSpan:
+        conflicts = []
+        unchanged = []
+        proposed = []
+        for index, path in enumerate(paths):
+            path = os.path.abspath(path)
+            newName = pattern.render(path, index)
+            reason = invalidReason(newName)
+            if reason:
+                conflicts.append((path, reason))
+            elif newName == os.path.basename(path):
+                unchanged.append(path)
+            else:
+                proposed.append((path, os.path.join(os.path.dirname(path), newName)))
+
+        # names freed by paths that move away can be taken by others
+        movingKeys = set(pathKey(old) for old, new in proposed)
+        listings = {} # folder -> normcased names in it, listed once per folder
+        claimed = {} # new path key -> old path that gets it
+        renames = []
+        for old, new in proposed:
+            key = pathKey(new)
+            folder = os.path.dirname(old)
+            newName = os.path.basename(new)
+
+            # moving a folder moves the selected paths inside it
+            outer = insideRenamed(pathKey(old), movingKeys)
+            if outer:
+                conflicts.append((old, "inside {}, which is renamed too".format(outer)))
+                continue
+
+            if key in claimed:
+                conflicts.append((old, "'{}' is also the new name of {}".format(newName, claimed[key])))
+                continue
+            claimed[key] = old
+
+            if folder not in listings:
+                try:
+                    listings[folder] = set(os.path.normcase(name) for name in os.listdir(folder))
+                except FileNotFoundError:
+                    listings[folder] = set()
+            # taken, unless by a path that moves away or by this path itself (a case change)
+            if os.path.normcase(newName) in listings[folder] and key not in movingKeys and key != pathKey(old):
+                conflicts.append((old, "'{}' already exists".format(newName)))
+                continue
+
+            renames.append((old, new))
+
+        plan = RenamePlan(renames, conflicts, unchanged)
+        planSpan.set(renames=len(renames), conflicts=len(conflicts), chained=len(plan.chained))
+    return plan
+
+def applyRenames(plan, journalDir, progress=None):
+    '''run a plan, journaled in journalDir like every multi-path rename'''
+    if not plan.ok:
+        path, reason = plan.conflicts[0]
+        raise RenameError("{} conflict(s), first: {}: {}".format(len(plan.conflicts), path, reason))
+    if plan.renames:
+        renameAll(plan.steps(), journalDir, progress)
+    return plan
+
+def batchRename(paths, pattern, journalDir, progress=None):
+    '''plan and run the renames of paths, nothing is renamed if there is a conflict'''
+    return applyRenames(planRenames(paths, pattern), journalDir, progress)
@@ -0,0 +1,250 @@
+'''Plan-then-execute engine for scaffolding project directories'''
+import os
+
+import shutil
+
+import threading
+
+import time
+
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.trace import span
+
+# default number of filesystem workers, sized for network shares rather than cpu
+DEFAULT_WORKERS = 8
+
+# names of the utility subfolders every folder gets
+UTILITY_FOLDERS = ("Temp", "Tools")
+
+# config copies are written under this name first, a config is never left half written
+PART_PREFIX = ".pmt_part_"
+
+class Operation():
+    '''a single filesystem step in a scaffold plan'''
+    FOLDER = "folder" # user folder, skipped along with its utilities if it already exists
+    MKDIR = "mkdir" # utility subfolder
+    COPY = "copy" # config file copy
+
+    def __init__(self, kind, path, source=None, owner=None, depth=0, existing=False):
+        self.kind = kind
+        self.path = path
+        self.source = source # file copied for COPY operations
+        self.owner = owner # FOLDER operation that must create its path first
+        self.depth = depth # nesting level, folders are created one level at a time
+        self.existing = existing # FOLDER that's already there and only needs its utilities
+        self.step = None # number of the step in a journal
+        self.done = False # finished by an earlier, interrupted run
+        self.created = False
+
+    def __repr__(self):
+        return "Operation({}, {})".format(self.kind, self.path)
+
+class ScaffoldPlan():
+    '''flat list of operations compiled from a directory description'''
+    def __init__(self, configTemplate):
+        self.configTemplate = configTemplate
+        self.operations = []
+        self.compileTime = 0.0
+
+    def addFolder(self, path, depth=0, existing=False, utilities=UTILITY_FOLDERS, config=True):
+        '''add a folder and its utility subfolders/config to the plan
+
+        existing folders, e.g. copied from a template, only get the utilities and config they lack
+        '''
+        folder = Operation(Operation.FOLDER, path, depth=depth, existing=existing)
+        self.operations.append(folder)
+
+        # Temp and Tools folders, then the config inside Tools
+        for name in utilities:
+            self.operations.append(Operation(Operation.MKDIR, os.path.join(path, name), owner=folder))
+
+        # without a template the folder inherits its config from a parent
+        if self.configTemplate and config:
+            configTarget = os.path.join(path, "Tools", "config.xml")
+            self.operations.append(Operation(Operation.COPY, configTarget, self.configTemplate, folder))
+
+        return folder
+
+    def addElement(self, pardir, elem, depth=0):
+        '''recursively add an xml dir element and its children'''
+        path = os.path.join(pardir, elem.get('name'))
+        self.addFolder(path, depth)
+
+        for subelem in elem.iterfind("dir"):
+            self.addElement(path, subelem, depth + 1)
+
+    def ofKind(self, kind):
+        return [op for op in self.operations if op.kind == kind]
+
+    def toSteps(self):
+        '''operations as journal steps: [kind, path, source, owner step, depth, existing]'''
+        numbers = {}
+        steps = []
+        for number, op in enumerate(self.operations):
+            numbers[id(op)] = number
+            op.step = number
+            steps.append([op.kind, op.path, op.source, numbers[id(op.owner)] if op.owner else None, op.depth, op.existing])
+        return steps
+
+    @classmethod
+    def fromSteps(cls, steps, journal):
+        '''rebuild the plan of an interrupted run, marking what the journal says is done
+
+        a folder the journal doesn't have as done but that is on disk was either made just
+        before the crash or there before the job. only a folder inside one the job made can't
+        have been there before, it gets its utilities. any other is left alone like mkdir
+        would have, its own Tools folder and config included
+        '''
+        plan = cls(None)
+        made = {} # folder path -> made by the job
+        for number, step in enumerate(steps):
+            kind, path, source, owner, depth = step[:5]
+            # journals written before the flag have every folder as new
+            existed = len(step) > 5 and bool(step[5])
+            op = Operation(kind, path, source, plan.operations[owner] if owner is not None else None, depth, existed)
+            op.step = number
+            if journal.isDone(number):
+                op.done = True
+                op.created = journal.completed[number]
+            elif kind == Operation.FOLDER and not op.existing and os.path.isdir(path):
+                if made.get(os.path.dirname(path), depth == 0 and journal.header.get("createdRoot", False)):
+                    op.existing = True
+                else:
+                    # there before the job
+                    op.done = True
+            if kind == Operation.FOLDER:
+                # a folder still to make is made by the job, one there from the start isn't
+                made[path] = op.created if op.done else not existed
+            plan.operations.append(op)
+        return plan
+
+    @classmethod
+    def fromConfig(cls, projectPath, projectConfig, configTemplate):
+        '''compile a ProjectConfig.xml file into a plan rooted at projectPath'''
+        with span("scaffold.plan", config=projectConfig) as planSpan:
+            start = time.perf_counter()
+            plan = cls(configTemplate)
+
+            root = ET.parse(projectConfig).getroot()
+            for elem in root.iterfind("dir"):
+                plan.addElement(projectPath, elem)
+
+            plan.compileTime = time.perf_counter() - start
+            planSpan.set(operations=len(plan.operations))
+        return plan
+
+class ScaffoldResult():
+    '''counts and per-phase timings of an executed plan'''
+    def __init__(self):
+        self.phases = {} # phase name -> seconds
+        self.created = 0 # folders created
+        self.skipped = 0 # folders that already existed
+        self.copied = 0 # config files copied
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def __repr__(self):
+        phases = ", ".join("{} {:.3f}s".format(name, secs) for name, secs in self.phases.items())
+        return "ScaffoldResult(created={}, skipped={}, copied={}, {})".format(self.created, self.skipped, self.copied, phases)
+
+class ScaffoldEngine():
+    '''executes a ScaffoldPlan on a bounded thread pool in dependency order'''
+    def __init__(self, workers=DEFAULT_WORKERS, progress=None, journal=None):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.progress = progress # callable(done, total, phase)
+        self.journal = journal # records every finished operation that has a step number
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+
+    def run(self, plan):
+        '''run every operation in the plan, returns a ScaffoldResult'''
+        result = ScaffoldResult()
+        result.phases["plan"] = plan.compileTime
+
+        folders = plan.ofKind(Operation.FOLDER)
+        self._done = sum(1 for op in plan.operations if op.done)
+        self._total = len(plan.operations)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # folders, one depth level at a time so every parent exists first
+            with span("scaffold.folders", folders=len(folders)) as phaseSpan:
+                start = time.perf_counter()
+                for depth in sorted(set(op.depth for op in folders)):
+                    level = [op for op in folders if op.depth == depth and not op.done]
+                    self._runPhase(pool, self._makeFolder, level, "folders")
+                result.phases["folders"] = time.perf_counter() - start
+                phaseSpan.set(mkdirs=len(folders), levels=len(set(op.depth for op in folders)))
+
+            # utility folders and configs only for folders created by this run
+            mkdirs = [op for op in plan.ofKind(Operation.MKDIR) if op.owner.created and not op.done]
+            copies = [op for op in plan.ofKind(Operation.COPY) if op.owner.created and not op.done]
+            # operations skipped with their folder still count towards progress
+            self._done += self._total - self._done - len(mkdirs) - len(copies)
+
+            with span("scaffold.utility", mkdirs=len(mkdirs)):
+                start = time.perf_counter()
+                self._runPhase(pool, self._makeDir, mkdirs, "utility")
+                result.phases["utility"] = time.perf_counter() - start
+
+            with span("scaffold.config", copies=len(copies)) as phaseSpan:
+                start = time.perf_counter()
+                self._runPhase(pool, self._copy, copies, "config")
+                result.phases["config"] = time.perf_counter() - start
+                if copies:
+                    phaseSpan.set(bytes=len(copies) * os.path.getsize(copies[0].source))
+
+        result.created = sum(1 for op in folders if op.created)
+        result.skipped = len(folders) - result.created
+        result.copied = sum(1 for op in copies if op.created)
+        return result
+
+    def _runPhase(self, pool, func, operations, phase):
+        # consume the results so the first error is raised here
+        for op, _ in zip(operations, pool.map(func, operations)):
+            if self.journal and op.step is not None:
+                self.journal.done(op.step, op.created)
+            self._step(phase)
+
+    def _step(self, phase):
+        with self._lock:
+            self._done += 1
+            done = self._done
+        if self.progress:
+            self.progress(done, self._total, phase)
+
+    def _makeFolder(self, op):
+        if op.existing:
+            op.created = True
+            return
+
+        # mkdir doubles as the existence check, existing folders are left untouched
+        try:
+            os.mkdir(op.path)
+            op.created = True
+        except FileExistsError:
+            op.created = False
+
+    def _makeDir(self, op):
+        # already there when an interrupted run made it after its last journal write
+        try:
+            os.mkdir(op.path)
+        except FileExistsError:
+            pass
+        op.created = True
+
+    def _copy(self, op):
+        # a config that's already there is kept, a resumed run only writes the missing ones
+        if os.path.exists(op.path):
+            op.created = False
+            return
+
+        part = os.path.join(os.path.dirname(op.path), PART_PREFIX + os.path.basename(op.path))
+        shutil.copyfile(op.source, part)
+        os.replace(part, op.path)
+        op.created = True
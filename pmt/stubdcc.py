@@ -0,0 +1,43 @@
+'''Stand-in for a DCC application, for trying the launcher without Maya or Photoshop
+
+point a dcc's version in a config.xml at it, e.g.
+<version name="stub">python C:\PMT\pmt\stubdcc.py</version>
+
+every launch and every file handed over by the launcher is appended to the file named
+by PMT_STUB_LOG as a JSON line. it quits after PMT_STUB_LIFETIME seconds (default 30),
+PMT_STUB_STARTUP delays listening like a slow application start
+'''
+import json
+
+import os
+
+import sys
+
+import threading
+
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pmt.launcher import serveOpenRequests
+
+_logLock = threading.Lock()
+
+def log(event, files):
+    logPath = os.environ.get("PMT_STUB_LOG")
+    if not logPath:
+        return
+    with _logLock, open(logPath, "a") as logFile:
+        logFile.write(json.dumps({"event": event, "pid": os.getpid(), "files": files, "time": time.time()}) + "\n")
+
+def main():
+    log("launch", sys.argv[1:])
+
+    # slow startup before it can take requests
+    time.sleep(float(os.environ.get("PMT_STUB_STARTUP", 0)))
+    serveOpenRequests(lambda files: log("open", files))
+
+    time.sleep(float(os.environ.get("PMT_STUB_LIFETIME", 30)))
+
+if __name__ == "__main__":
+    main()
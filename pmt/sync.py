@@ -0,0 +1,427 @@
+'''Mirrors a PMT root into another folder, copying only what changed since the last sync
+
+each root keeps a manifest of what it holds (size, mtime and optionally a content hash of
+every file, and its folders) in .pmt_sync, one file per project so a sync only rewrites the
+projects it touched. the source is scanned with parallel os.scandir workers; the target is
+never walked, its manifest from the last sync says what it holds.
+
+the difference between the two is applied to the target as PMT made it: a file or folder
+that disappeared and reappeared under another name with the same size and mtime (hash
+too, when both sides have one) was renamed, and is renamed on the target rather than
+copied again. deletes remove only files the manifest knows. changed files are copied on a
+worker pool in chunks, under a temporary name until they're complete.
+
+a sync cut short leaves a marker in the target's .pmt_sync; the next sync then scans the
+target instead of trusting its manifest, as it does with verify=True
+'''
+import json
+
+import os
+
+import shutil
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.archive import ArchiveRules
+
+from pmt.dedup import hashFile
+
+from pmt.rename import RenamePlan
+
+from pmt.trace import span
+
+SYNC_NAME = ".pmt_sync"
+
+# inside SYNC_NAME while a sync is writing to a root
+SYNCING_NAME = "syncing"
+
+PROJECTS_FOLDER = "projects"
+
+# manifest shard of the files directly in the root
+ROOT_SHARD = "root.json"
+
+DEFAULT_WORKERS = 8
+
+CHUNK_BYTES = 1 * 2**20
+
+# files are copied next to their target under this prefix, then renamed into place
+TEMP_PREFIX = ".pmt_sync_"
+
+class SyncError(ValueError):
+    '''raised when a target can't be synced'''
+
+def shardOf(relPath, isFolder):
+    '''project a path's manifest entry is kept with, "" for files directly in the root'''
+    if "/" in relPath or isFolder:
+        return relPath.split("/")[0]
+    return ""
+
+def fullPath(root, relPath):
+    return os.path.join(root, *relPath.split("/"))
+
+class Manifest():
+    '''files and folders of a root, by path relative to it with / separators'''
+    def __init__(self, files=None, dirs=None):
+        self.files = files or {} # relative path -> [size, mtime_ns, hash or None]
+        self.dirs = dirs or set()
+
+    @classmethod
+    def load(cls, root):
+        '''the manifest a root was left with, None if it was never synced'''
+        folder = os.path.join(root, SYNC_NAME)
+        shards = [os.path.join(folder, ROOT_SHARD)]
+        try:
+            shards.extend(entry.path for entry in os.scandir(os.path.join(folder, PROJECTS_FOLDER)) if entry.name.endswith(".json"))
+        except FileNotFoundError:
+            return None
+
+        manifest = cls()
+        for path in shards:
+            try:
+                with open(path) as shardFile:
+                    data = json.load(shardFile)
+            except FileNotFoundError:
+                continue
+            except ValueError:
+                # damaged, the caller scans instead
+                return None
+            manifest.files.update(data["files"])
+            manifest.dirs.update(data["dirs"])
+        return manifest
+
+    def shards(self):
+        '''shard name -> {"files", "dirs"}, as saved'''
+        shards = {"": {"files": {}, "dirs": []}}
+        for relPath in self.dirs:
+            shards.setdefault(shardOf(relPath, True), {"files": {}, "dirs": []})["dirs"].append(relPath)
+        for relPath, entry in self.files.items():
+            shards.setdefault(shardOf(relPath, False), {"files": {}, "dirs": []})["files"][relPath] = entry
+        for shard in shards.values():
+            shard["dirs"].sort()
+        return shards
+
+    def save(self, root, previous=None):
+        '''write the shards that differ from previous, remove those of projects that are gone'''
+        folder = os.path.join(root, SYNC_NAME)
+        os.makedirs(os.path.join(folder, PROJECTS_FOLDER), exist_ok=True)
+        shards = self.shards()
+        old = previous.shards() if previous is not None else {}
+
+        for name, shard in shards.items():
+            if old.get(name) == shard:
+                continue
+            path = os.path.join(folder, PROJECTS_FOLDER, name + ".json") if name else os.path.join(folder, ROOT_SHARD)
+            # replaced in one step, a sync cut short keeps the old shard
+            with open(path + ".tmp", "w") as shardFile:
+                json.dump({"version": 1, "files": shard["files"], "dirs": shard["dirs"]}, shardFile, separators=(",", ":"))
+            os.replace(path + ".tmp", path)
+
+        for name in old:
+            if name and name not in shards:
+                try:
+                    os.remove(os.path.join(folder, PROJECTS_FOLDER, name + ".json"))
+                except FileNotFoundError:
+                    pass
+
+def scanTree(root, rules=None, workers=DEFAULT_WORKERS, previous=None, hashes=False, progress=None):
+    '''Manifest of what is under root now
+
+    hashes are taken from previous for files whose size and mtime are unchanged, and only
+    computed for the others when hashes is True
+    '''
+    rules = rules or ArchiveRules()
+    root = os.path.abspath(root)
+    known = previous.files if previous is not None else {}
+
+    def scan(relDir):
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(fullPath(root, relDir) if relDir else root) as entries:
+                for entry in entries:
+                    relPath = relDir + "/" + entry.name if relDir else entry.name
+                    if rules.excluded(relPath):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(relPath)
+                    elif entry.is_file(follow_symlinks=False):
+                        info = entry.stat(follow_symlinks=False)
+                        files.append((relPath, info.st_size, info.st_mtime_ns))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # removed while scanning or unreadable
+            pass
+        return subdirs, files
+
+    def hashOf(relPath):
+        try:
+            return relPath, hashFile(fullPath(root, relPath))
+        except OSError:
+            return relPath, None
+
+    manifest = Manifest()
+    with span("sync.scan", path=root) as scanSpan:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            level = [""]
+            while level:
+                nextLevel = []
+                for subdirs, files in pool.map(scan, level):
+                    for relPath in subdirs:
+                        manifest.dirs.add(relPath)
+                        # emptied folders are kept, without their contents
+                        if not rules.isEmptied(relPath):
+                            nextLevel.append(relPath)
+                    for relPath, size, mtime in files:
+                        entry = known.get(relPath)
+                        digest = entry[2] if entry is not None and entry[0] == size and entry[1] == mtime else None
+                        manifest.files[relPath] = [size, mtime, digest]
+                if progress:
+                    progress(len(manifest.dirs), len(manifest.dirs) + len(nextLevel))
+                level = nextLevel
+
+            unhashed = [relPath for relPath, entry in manifest.files.items() if entry[2] is None] if hashes else []
+            for relPath, digest in pool.map(hashOf, unhashed):
+                manifest.files[relPath][2] = digest
+
+        scanSpan.set(files=len(manifest.files), dirs=len(manifest.dirs), hashed=len(unhashed))
+    return manifest
+
+def sameContent(entry, other):
+    '''whether two manifest entries are the same file content, as far as the manifests tell'''
+    if entry[0] != other[0] or entry[1] != other[1]:
+        return False
+    return entry[2] is None or other[2] is None or entry[2] == other[2]
+
+def pairRenames(removed, added):
+    '''(old, new) pairs of removed and added files that are the same content under another name
+
+    a pair needs to be the only match for its size and mtime, or the only one that also
+    keeps its file name; anything ambiguous is copied instead
+    '''
+    byKey = {}
+    for relPath, entry in removed.items():
+        byKey.setdefault((entry[0], entry[1]), ([], []))[0].append(relPath)
+    for relPath, entry in added.items():
+        key = (entry[0], entry[1])
+        if key in byKey:
+            byKey[key][1].append(relPath)
+
+    pairs = []
+    for olds, news in byKey.values():
+        if not news:
+            continue
+        if len(olds) == 1 and len(news) == 1:
+            candidates = [(olds[0], news[0])]
+        else:
+            # e.g. a renamed folder of files saved in the same second
+            byName = {}
+            for relPath in olds:
+                byName.setdefault(relPath.rsplit("/", 1)[-1], ([], []))[0].append(relPath)
+            for relPath in news:
+                byName.setdefault(relPath.rsplit("/", 1)[-1], ([], []))[1].append(relPath)
+            candidates = [(sameName[0][0], sameName[1][0]) for sameName in byName.values() if len(sameName[0]) == 1 and len(sameName[1]) == 1]
+        pairs.extend((old, new) for old, new in candidates if sameContent(removed[old], added[new]))
+    return pairs
+
+def movedFolder(old, new):
+    '''(old folder, new folder) a file rename would come from, None if only the file's name changed'''
+    oldParts = old.split("/")
+    newParts = new.split("/")
+    # the unchanged end of the path, the file name included
+    common = 0
+    while common < min(len(oldParts), len(newParts)) - 1 and oldParts[-1 - common] == newParts[-1 - common]:
+        common += 1
+    if common == 0:
+        return None
+    return "/".join(oldParts[:-common]), "/".join(newParts[:-common])
+
+def rebase(relPath, old, new):
+    if relPath == old:
+        return new
+    if relPath.startswith(old + "/"):
+        return new + relPath[len(old):]
+    return relPath
+
+class SyncPlan():
+    '''what has to change on a target to make it match the source, in the order it's done'''
+    def __init__(self, source, target):
+        self.source = source # Manifest scanned now
+        self.target = target # Manifest of the target before the sync
+        self.folderRenames = [] # (old, new), outer folders first, each relative to the renames before it
+        self.deletes = [] # files
+        self.mkdirs = [] # folders, parents first
+        self.renames = [] # (old, new) files
+        self.copies = [] # files, new or changed
+        self.rmdirs = [] # folders, deepest first
+
+    @property
+    def empty(self):
+        return not (self.folderRenames or self.deletes or self.mkdirs or self.renames or self.copies or self.rmdirs)
+
+    @property
+    def copyBytes(self):
+        return sum(self.source.files[relPath][0] for relPath in self.copies)
+
+    def __repr__(self):
+        return "SyncPlan({} folder renames, {} renames, {} copies, {} deletes)".format(
+            len(self.folderRenames), len(self.renames), len(self.copies), len(self.deletes))
+
+def planSync(source, target):
+    '''the SyncPlan taking a target from its manifest to the source's'''
+    with span("sync.plan") as planSpan:
+        plan = SyncPlan(source, target)
+        files = dict(target.files)
+        dirs = set(target.dirs)
+
+        # folders renamed as a whole are renamed once, rather than file by file
+        removed = dict((relPath, entry) for relPath, entry in files.items() if relPath not in source.files)
+        added = dict((relPath, entry) for relPath, entry in source.files.items() if relPath not in files)
+        candidates = set(filter(None, (movedFolder(old, new) for old, new in pairRenames(removed, added))))
+        for old, new in sorted(candidates, key=lambda folders: folders[0].count("/")):
+            # through the renames of folders above it
+            for applied in plan.folderRenames:
+                old = rebase(old, *applied)
+            if old == new or old not in dirs or old in source.dirs or new not in source.dirs or new in dirs:
+                continue
+            plan.folderRenames.append((old, new))
+            files = dict((rebase(relPath, old, new), entry) for relPath, entry in files.items())
+            dirs = set(rebase(relPath, old, new) for relPath in dirs)
+
+        # then what's left, on the target as it is after those
+        removed = dict((relPath, entry) for relPath, entry in files.items() if relPath not in source.files)
+        added = dict((relPath, entry) for relPath, entry in source.files.items() if relPath not in files)
+        plan.renames = pairRenames(removed, added)
+        renamedFrom = set(old for old, new in plan.renames)
+        renamedTo = set(new for old, new in plan.renames)
+
+        plan.deletes = sorted(relPath for relPath in removed if relPath not in renamedFrom)
+        plan.copies = sorted(relPath for relPath, entry in source.files.items()
+                             if relPath not in renamedTo and (relPath not in files or files[relPath][:2] != entry[:2]))
+        plan.mkdirs = sorted((relPath for relPath in source.dirs if relPath not in dirs), key=lambda relPath: relPath.count("/"))
+        plan.rmdirs = sorted((relPath for relPath in dirs if relPath not in source.dirs), key=lambda relPath: -relPath.count("/"))
+        planSpan.set(folderRenames=len(plan.folderRenames), renames=len(plan.renames), copies=len(plan.copies), deletes=len(plan.deletes))
+    return plan
+
+class SyncResult():
+    '''what a sync did'''
+    def __init__(self, plan):
+        self.plan = plan
+        self.copied = 0
+        self.bytes = 0
+        self.skipped = [] # (relative path, reason)
+
+def copyFile(source, target, mtime):
+    '''stream source to target in chunks under a temporary name, keeping the source's mtime'''
+    temp = os.path.join(os.path.dirname(target), TEMP_PREFIX + os.path.basename(target))
+    try:
+        with open(source, "rb") as sourceFile, open(temp, "wb") as targetFile:
+            shutil.copyfileobj(sourceFile, targetFile, CHUNK_BYTES)
+        os.utime(temp, ns=(mtime, mtime))
+        os.replace(temp, target)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+def renamePath(old, new):
+    '''rename on the target, a no-op when an interrupted sync already did it'''
+    if os.path.lexists(old) or not os.path.lexists(new):
+        os.rename(old, new)
+
+def syncRoots(source, target, rules=None, workers=DEFAULT_WORKERS, hashes=False, verify=False, dryRun=False, progress=None):
+    '''make target a mirror of source, returns the SyncResult
+
+    progress is called with (files copied, files to copy)
+    '''
+    source = os.path.abspath(source)
+    target = os.path.abspath(target)
+    if os.path.normcase(source) == os.path.normcase(target):
+        raise SyncError("source and target are both {}".format(source))
+    rules = rules or ArchiveRules()
+    marker = os.path.join(target, SYNC_NAME, SYNCING_NAME)
+
+    with span("sync.roots", path=source, target=target) as syncSpan:
+        sourceBefore = Manifest.load(source)
+        sourceManifest = scanTree(source, rules, workers, sourceBefore, hashes)
+
+        targetBefore = None if verify or os.path.exists(marker) else Manifest.load(target)
+        if targetBefore is None:
+            # never synced, cut short, or asked to check: the target says what it holds
+            targetBefore = scanTree(target, rules, workers, Manifest.load(target) or sourceManifest)
+
+        plan = planSync(sourceManifest, targetBefore)
+        result = SyncResult(plan)
+        syncSpan.set(copies=len(plan.copies), bytes=plan.copyBytes)
+        if dryRun:
+            return result
+
+        # the source's manifest keeps the hashes for next time, a read-only source does without
+        try:
+            sourceManifest.save(source, sourceBefore)
+        except OSError:
+            pass
+
+        if plan.empty:
+            return result
+
+        os.makedirs(os.path.dirname(marker), exist_ok=True)
+        with open(marker, "w") as markerFile:
+            markerFile.write(source)
+
+        # renames and deletes in order, a failure stops the sync and leaves the marker
+        for old, new in plan.folderRenames:
+            # a folder can move into one the source just made
+            os.makedirs(os.path.dirname(fullPath(target, new)), exist_ok=True)
+            renamePath(fullPath(target, old), fullPath(target, new))
+        for relPath in plan.deletes:
+            try:
+                os.remove(fullPath(target, relPath))
+            except FileNotFoundError:
+                pass
+        for relPath in plan.mkdirs:
+            os.makedirs(fullPath(target, relPath), exist_ok=True)
+        if plan.renames:
+            # chains and swaps go through temporary names, like pattern renames
+            renamePlan = RenamePlan([(fullPath(target, old), fullPath(target, new)) for old, new in plan.renames], [], [])
+            for old, new in renamePlan.steps():
+                renamePath(old, new)
+
+        def copy(relPath):
+            entry = sourceManifest.files[relPath]
+            try:
+                copyFile(fullPath(source, relPath), fullPath(target, relPath), entry[1])
+            except OSError as error:
+                return relPath, str(error)
+            return relPath, None
+
+        failed = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-sync") as pool:
+            for done, (relPath, reason) in enumerate(pool.map(copy, plan.copies)):
+                if reason:
+                    result.skipped.append((relPath, reason))
+                    failed.add(relPath)
+                else:
+                    result.copied += 1
+                    result.bytes += sourceManifest.files[relPath][0]
+                if progress:
+                    progress(done + 1, len(plan.copies))
+
+        for relPath in plan.rmdirs:
+            try:
+                os.rmdir(fullPath(target, relPath))
+            except OSError as error:
+                # holds files the manifest doesn't know, left as it is
+                result.skipped.append((relPath, error.strerror or str(error)))
+
+        # the target now holds the source's files, except where a copy failed
+        targetAfter = Manifest(dict(sourceManifest.files), set(sourceManifest.dirs))
+        for relPath in failed:
+            if relPath in targetBefore.files:
+                targetAfter.files[relPath] = targetBefore.files[relPath]
+            else:
+                del targetAfter.files[relPath]
+        targetAfter.save(target, targetBefore)
+        os.remove(marker)
+        syncSpan.set(copied=result.copied, skipped=len(result.skipped))
+    return result
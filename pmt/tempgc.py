@@ -0,0 +1,359 @@
+'''Removes old files from the Temp folders PMT gives every folder, by age and size policies
+
+Temp folders are found in one parallel pass over the root, and their files listed in the
+same pass. only Temp folders PMT made are touched: ones next to a Tools folder holding a
+config.xml, or in a folder its project's utility manifest lists. a Temp folder of a UE
+project or one an artist made is left alone. the policy is read from the tempPolicy
+element of ProjectConfig.xml:
+
+  <tempPolicy maxAgeDays="14" maxFolderMB="2048" maxProjectMB="20480">
+    <exclude>ClientDelivery</exclude>
+  </tempPolicy>
+
+files older than maxAgeDays go first, then the oldest files of a Temp folder over
+maxFolderMB, then the oldest of a project's Temp folders together over maxProjectMB.
+excluded projects are name globs and never walked. a limit left out doesn't apply, so
+without a tempPolicy nothing is removed.
+
+a file's age is from when it was written into the Temp folder, the later of its mtime and
+its ctime (creation time on Windows); copies keep the mtime of what they copied, e.g. a
+past version of an asset opened from Temp
+'''
+import os
+
+import stat
+
+import threading
+
+import time
+
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.config import toolPath
+
+from pmt.index import PMT_PREFIX
+
+from pmt.inject import compilePatterns, matchesAny, readUtilityManifest
+
+from pmt.trash import Throttle
+
+from pmt.trace import span
+
+TEMP_NAME = "Temp"
+
+DEFAULT_INTERVAL = 60 * 60 # seconds between collector passes
+
+DEFAULT_WORKERS = 8
+
+# project name of Temp folders directly in the root
+ROOT_PROJECT = ""
+
+class TempPolicy():
+    '''which files in Temp folders are removed'''
+    def __init__(self, maxAge=None, maxFolderBytes=None, maxProjectBytes=None, exclude=()):
+        self.maxAge = maxAge
+        self.maxFolderBytes = maxFolderBytes
+        self.maxProjectBytes = maxProjectBytes
+        self.exclude = tuple(exclude)
+        self._exclude = compilePatterns(self.exclude)
+
+    @classmethod
+    def fromConfig(cls, projectConfig=None):
+        '''policy from the tempPolicy element of ProjectConfig.xml, one removing nothing without it'''
+        projectConfig = projectConfig or toolPath("ProjectConfig.xml")
+        try:
+            element = ET.parse(projectConfig).getroot().find("tempPolicy")
+        except FileNotFoundError:
+            element = None
+        if element is None:
+            return cls()
+
+        def number(name, scale, default=None):
+            value = element.get(name)
+            return default if value is None else float(value) * scale
+
+        return cls(number("maxAgeDays", 24 * 60 * 60), number("maxFolderMB", 2**20), number("maxProjectMB", 2**20),
+                   [elem.text.strip() for elem in element.iterfind("exclude") if elem.text])
+
+    @property
+    def limited(self):
+        '''whether any limit is set, a policy without one removes nothing'''
+        return any(limit is not None for limit in (self.maxAge, self.maxFolderBytes, self.maxProjectBytes))
+
+    def excluded(self, project):
+        return bool(self.exclude) and matchesAny(self._exclude, project)
+
+class TempFolder():
+    '''a Temp folder and what it holds, its subfolders included'''
+    def __init__(self, path, project):
+        self.path = path
+        self.project = project
+        self.files = [] # (path, size, time written)
+        self.dirs = [] # subfolders, removed once they're empty
+
+    @property
+    def bytes(self):
+        return sum(size for path, size, mtime in self.files)
+
+class TempReport():
+    '''the Temp folders of a root and the files the policy removes from them'''
+    def __init__(self, root, policy, folders, doomed, scanned):
+        self.root = root
+        self.policy = policy
+        self.folders = folders
+        self.doomed = doomed # (path, size, time written)
+        self.scanned = scanned # time of the scan
+
+    @property
+    def totalBytes(self):
+        return sum(folder.bytes for folder in self.folders)
+
+    @property
+    def totalFiles(self):
+        return sum(len(folder.files) for folder in self.folders)
+
+    @property
+    def reclaimBytes(self):
+        return sum(size for path, size, mtime in self.doomed)
+
+    def byProject(self):
+        '''[(project, Temp folders, bytes, bytes to remove)] biggest first'''
+        doomed = set(path for path, size, mtime in self.doomed)
+        projects = {}
+        for folder in self.folders:
+            total = projects.setdefault(folder.project, [0, 0, 0])
+            total[0] += 1
+            for path, size, mtime in folder.files:
+                total[1] += size
+                if path in doomed:
+                    total[2] += size
+        return sorted(((project, folders, size, reclaim) for project, (folders, size, reclaim) in projects.items()), key=lambda item: (-item[2], item[0]))
+
+class TempResult():
+    '''what a collection removed'''
+    def __init__(self):
+        self.removed = 0
+        self.bytes = 0
+        self.skipped = [] # (path, reason)
+
+def writtenTime(info):
+    '''when a file was written where it is, copies and restored versions keep an older mtime'''
+    return max(info.st_mtime, info.st_ctime)
+
+def hasToolsConfig(directory):
+    '''whether PMT gave directory its utility folders with a config, layered folders only have Tools'''
+    return os.path.isfile(os.path.join(directory, "Tools", "config.xml"))
+
+def findTempFolders(root, policy=None, workers=DEFAULT_WORKERS, progress=None):
+    '''every Temp folder PMT made under root with its files, from one parallel walk'''
+    policy = policy or TempPolicy()
+    root = os.path.abspath(root)
+    folders = []
+    lock = threading.Lock()
+    manifests = {} # project -> folders its utility manifest lists
+
+    def isPmtTemp(project, directory):
+        '''whether the Temp folder in directory is one PMT made'''
+        if hasToolsConfig(directory):
+            return True
+        if project is None:
+            return False
+        with lock:
+            if project not in manifests:
+                manifests[project] = readUtilityManifest(os.path.join(root, project))
+            known = manifests[project]
+        relPath = os.path.relpath(directory, os.path.join(root, project)).replace(os.sep, "/")
+        return relPath in known
+
+    def scan(item):
+        directory, project, owner = item
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(PMT_PREFIX):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        childProject = project if project is not None else entry.name
+                        if project is None and policy.excluded(entry.name):
+                            continue
+                        childOwner = owner
+                        if owner is None and entry.name == TEMP_NAME and isPmtTemp(project, directory):
+                            childOwner = TempFolder(entry.path, childProject if project is not None else ROOT_PROJECT)
+                            with lock:
+                                folders.append(childOwner)
+                        elif owner is not None:
+                            owner.dirs.append(entry.path)
+                        subdirs.append((entry.path, childProject, childOwner))
+                    elif owner is not None:
+                        info = entry.stat(follow_symlinks=False)
+                        owner.files.append((entry.path, info.st_size, writtenTime(info)))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # removed while scanning or unreadable
+            pass
+        return subdirs
+
+    with span("tempgc.find", path=root) as findSpan:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            level = [(root, None, None)]
+            scanned = 0
+            while level:
+                nextLevel = [subdir for subdirs in pool.map(scan, level) for subdir in subdirs]
+                scanned += len(level)
+                if progress:
+                    progress(scanned, scanned + len(nextLevel))
+                level = nextLevel
+        findSpan.set(dirs=scanned, folders=len(folders))
+    return folders
+
+def planCollection(root, policy=None, workers=DEFAULT_WORKERS, now=None, progress=None):
+    '''TempReport of what the policy removes, without removing anything'''
+    policy = policy or TempPolicy()
+    now = now or time.time()
+    folders = findTempFolders(root, policy, workers, progress)
+
+    doomed = []
+    kept = {} # project -> files kept so far
+    for folder in folders:
+        keep = []
+        for item in folder.files:
+            if policy.maxAge is not None and now - item[2] > policy.maxAge:
+                doomed.append(item)
+            else:
+                keep.append(item)
+
+        # newest files stay, the rest of what doesn't fit goes
+        if policy.maxFolderBytes is not None:
+            keep, over = overLimit(keep, policy.maxFolderBytes)
+            doomed.extend(over)
+        kept.setdefault(folder.project, []).extend(keep)
+
+    if policy.maxProjectBytes is not None:
+        for project, keep in kept.items():
+            keep, over = overLimit(keep, policy.maxProjectBytes)
+            doomed.extend(over)
+
+    return TempReport(os.path.abspath(root), policy, folders, doomed, now)
+
+def overLimit(files, limit):
+    '''(newest files fitting in limit bytes, the rest)'''
+    keep = []
+    over = []
+    total = 0
+    for item in sorted(files, key=lambda item: item[2], reverse=True):
+        total += item[1]
+        if total <= limit:
+            keep.append(item)
+        else:
+            over.append(item)
+    return keep, over
+
+def removeFile(path, throttle=None):
+    if throttle:
+        throttle.wait()
+    try:
+        os.remove(path)
+    except PermissionError:
+        # read-only files on Windows
+        os.chmod(path, stat.S_IWRITE)
+        os.remove(path)
+
+def collect(report, workers=DEFAULT_WORKERS, throttle=None, progress=None):
+    '''remove the files a report dooms, skipping any written since the scan, then the emptied subfolders'''
+    result = TempResult()
+    lock = threading.Lock()
+
+    def remove(item):
+        path, size, written = item
+        reason = None
+        try:
+            if writtenTime(os.stat(path)) != written:
+                reason = "changed since the scan"
+            else:
+                removeFile(path, throttle)
+        except FileNotFoundError:
+            # already gone, e.g. cleaned up by the application
+            size = None
+        except OSError as error:
+            # e.g. held open by the application using it
+            reason = error.strerror or str(error)
+
+        with lock:
+            if reason:
+                result.skipped.append((path, reason))
+            elif size is not None:
+                result.removed += 1
+                result.bytes += size
+            if progress:
+                progress(result.removed + len(result.skipped), len(report.doomed))
+
+    with span("tempgc.collect", path=report.root) as collectSpan:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(remove, report.doomed))
+
+        # subfolders left empty, deepest first; the Temp folders themselves stay
+        for directory in sorted((path for folder in report.folders for path in folder.dirs), key=len, reverse=True):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                continue
+        collectSpan.set(removed=result.removed, bytes=result.bytes, skipped=len(result.skipped))
+    return result
+
+class TempCollector():
+    '''background thread applying a TempPolicy to the Temp folders of a root on a schedule
+
+    onPass(report, result) is called from the thread after every pass
+    '''
+    def __init__(self, root, policy=None, interval=DEFAULT_INTERVAL, workers=DEFAULT_WORKERS, opsPerSecond=None, onPass=None):
+        self.root = root
+        self.policy = policy or TempPolicy()
+        self.interval = interval
+        self.workers = workers
+        self.opsPerSecond = opsPerSecond # None removes at full speed
+        self.onPass = onPass
+        self.lastReport = None
+        self.lastResult = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="pmt-temp-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def wake(self):
+        '''run a pass now instead of at the next interval'''
+        self._wake.set()
+
+    def _loop(self):
+        # the first pass waits too, startup has enough to scan
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.collectOnce()
+            except OSError:
+                # try again next pass, e.g. the root's share went away
+                pass
+
+    def collectOnce(self):
+        throttle = Throttle(self.opsPerSecond) if self.opsPerSecond else None
+        report = planCollection(self.root, self.policy, self.workers)
+        result = collect(report, self.workers, throttle)
+        self.lastReport = report
+        self.lastResult = result
+        if self.onPass:
+            self.onPass(report, result)
+        return report, result
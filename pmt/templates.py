@@ -0,0 +1,111 @@
+'''In-memory pool of template asset files, so creating assets doesn't re-read them'''
+import os
+
+import shutil
+
+import threading
+
+from collections import OrderedDict
+
+from pmt.clone import reflinkOpenFile
+
+from pmt.config import fileStamp
+
+# templates up to this size are kept in memory, bigger ones are reflinked or copied
+DEFAULT_MAX_TEMPLATE_BYTES = 16 * 2**20
+
+# total bytes of template content kept in memory
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+class TemplatePool():
+    '''template contents keyed by path, reloaded when the template file changes
+
+    assets are never hardlinked to their template: artists save over the new file,
+    which would edit the template for everyone. reflinks are copy-on-write so those are used
+    for templates too big to keep in memory
+    '''
+    def __init__(self, maxTemplateBytes=DEFAULT_MAX_TEMPLATE_BYTES, maxBytes=DEFAULT_MAX_BYTES):
+        self.maxTemplateBytes = maxTemplateBytes
+        self.maxBytes = maxBytes
+        self._cache = OrderedDict() # path -> (stamp, bytes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def contents(self, path, stamp=None):
+        '''bytes of a template, None if it is too big to keep in memory'''
+        path = os.path.abspath(path)
+        if stamp is None:
+            stamp = fileStamp(path)
+
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry and entry[0] == stamp:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # stamp is (mtime, size)
+        if stamp[1] > self.maxTemplateBytes:
+            return None
+
+        # read outside the lock so other templates aren't held up
+        with open(path, "rb") as templateFile:
+            data = templateFile.read()
+
+        with self._lock:
+            old = self._cache.pop(path, None)
+            if old:
+                self._size -= len(old[1])
+            self._cache[path] = (stamp, data)
+            self._size += len(data)
+            while self._size > self.maxBytes and len(self._cache) > 1:
+                self._size -= len(self._cache.popitem(last=False)[1][1])
+
+        return data
+
+    def write(self, template, target, exclusive=False):
+        '''create target from a template, exclusive fails if target already exists'''
+        data = self.contents(template)
+
+        # the target is created first so exclusive can't race another writer, and removed if it
+        # can't be filled: a half written file would pass for an existing asset
+        targetFile = open(target, "xb" if exclusive else "wb")
+        try:
+            with targetFile:
+                if data is not None:
+                    targetFile.write(data)
+                else:
+                    self._copyTemplate(template, targetFile)
+        except BaseException:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
+        return target
+
+    def _copyTemplate(self, template, targetFile):
+        '''fill targetFile from a template too big to pool'''
+        with open(template, "rb") as templateFile:
+            try:
+                # share the template's blocks where the filesystem can
+                reflinkOpenFile(templateFile, targetFile)
+            except OSError:
+                shutil.copyfileobj(templateFile, targetFile, 2**20)
+
+    def invalidate(self, path=None):
+        '''drop one template, or everything'''
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                self._size = 0
+            else:
+                old = self._cache.pop(os.path.abspath(path), None)
+                if old:
+                    self._size -= len(old[1])
+
+# shared by every Asset in the process
+templatePool = TemplatePool()
@@ -0,0 +1,252 @@
+'''Timing spans for folder, asset and project operations
+
+off unless PMT_TRACE is set (a Chrome trace file to write, or 1 for the metrics log only)
+or --trace is passed on the command line. while off, span() hands out one shared do-nothing
+span so the instrumented code pays for little more than a function call.
+
+traces open in chrome://tracing or ui.perfetto.dev, the metrics log keeps the duration of
+every operation across runs for the p50/p95 summaries of python -m pmt metrics. both are
+written every FLUSH_EVENTS spans or FLUSH_SECONDS, so a long session holds few spans in
+memory and a crash loses only the last few. the trace is a JSON array closed at exit, the
+viewers open it without the closing bracket too
+'''
+import atexit
+
+import json
+
+import math
+
+import os
+
+import threading
+
+import time
+
+# rotated to metrics.jsonl.1 once it grows past this
+DEFAULT_LOG_BYTES = 8 * 2**20
+
+# spans held before they're written out, whichever comes first
+FLUSH_EVENTS = 256
+FLUSH_SECONDS = 10
+
+def defaultMetricsLog():
+    return os.environ.get("PMT_METRICS_LOG") or os.path.join(os.path.expanduser("~"), ".pmt", "metrics.jsonl")
+
+class Span():
+    '''a timed operation, its attributes end up in the trace event args'''
+    __slots__ = ("tracer", "name", "attrs", "start", "seconds")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+        self.seconds = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount=1):
+        '''count something that happened inside the span, e.g. mkdirs or bytes'''
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def __enter__(self):
+        self.tracer.stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        self.seconds = time.perf_counter() - self.start
+        self.tracer.stack().pop()
+        if excType is not None:
+            self.attrs["error"] = excType.__name__
+        self.tracer.record(self)
+        return False
+
+class NullSpan():
+    '''stands in for a span while tracing is off'''
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracer():
+    '''writes finished spans as Chrome trace events and metrics log lines, a batch at a time'''
+    def __init__(self, traceFile=None, metricsLog=None, maxLogBytes=DEFAULT_LOG_BYTES):
+        self.traceFile = traceFile
+        self.metricsLog = metricsLog
+        self.maxLogBytes = maxLogBytes
+        self.origin = time.perf_counter()
+        self.pending = [] # events not written yet
+        self.threads = {} # thread id -> name, for the trace viewer's lanes
+        self._lastFlush = self.origin
+        self._traceStarted = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._writeLock = threading.Lock() # keeps batches in order
+        self._local = threading.local()
+
+    def stack(self):
+        '''open spans of the calling thread, innermost last'''
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def record(self, span):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": span.name.split(".")[0],
+            "ph": "X",
+            "ts": round((span.start - self.origin) * 1e6, 1),
+            "dur": round(span.seconds * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {key: value if isinstance(value, (int, float, bool)) else str(value) for key, value in span.attrs.items()},
+        }
+        now = time.perf_counter()
+        with self._lock:
+            if thread.ident not in self.threads:
+                self.threads[thread.ident] = thread.name
+                self.pending.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread.ident, "args": {"name": thread.name}})
+            self.pending.append(event)
+            due = len(self.pending) >= FLUSH_EVENTS or now - self._lastFlush >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        '''append the spans recorded since the last flush to the trace file and the metrics log'''
+        with self._writeLock:
+            with self._lock:
+                events, self.pending = self.pending, []
+                self._lastFlush = time.perf_counter()
+            if not events or self._closed:
+                return
+
+            if self.traceFile:
+                # the first batch starts the file, later ones append to it
+                with open(self.traceFile, "a" if self._traceStarted else "w") as traceFile:
+                    for event in events:
+                        traceFile.write((",\n" if self._traceStarted else "[\n") + json.dumps(event))
+                        self._traceStarted = True
+
+            spans = [event for event in events if event["ph"] == "X"]
+            if self.metricsLog and spans:
+                os.makedirs(os.path.dirname(os.path.abspath(self.metricsLog)), exist_ok=True)
+                rollLog(self.metricsLog, self.maxLogBytes)
+                now = time.time()
+                with open(self.metricsLog, "a") as logFile:
+                    for event in spans:
+                        logFile.write(json.dumps({"name": event["name"], "seconds": event["dur"] / 1e6, "time": now}) + "\n")
+
+    def close(self):
+        '''write what's left and end the trace's JSON array'''
+        self.flush()
+        with self._writeLock:
+            if self.traceFile and not self._closed:
+                with open(self.traceFile, "a" if self._traceStarted else "w") as traceFile:
+                    traceFile.write("\n]\n" if self._traceStarted else "[]\n")
+            self._closed = True
+
+# the active tracer, None while tracing is off
+_tracer = None
+
+def span(name, **attrs):
+    '''time a block: with span("Folder.create", path=path) as s: ... s.add("mkdirs")'''
+    if _tracer is None:
+        return NULL_SPAN
+    return Span(_tracer, name, attrs)
+
+def count(key, amount=1):
+    '''add to a counter of the innermost open span on this thread, e.g. count("mkdirs")'''
+    if _tracer is None:
+        return
+    stack = _tracer.stack()
+    if stack:
+        stack[-1].add(key, amount)
+
+def enabled():
+    return _tracer is not None
+
+def enable(traceFile=None, metricsLog=None):
+    '''start recording spans, written in batches, with flush() and at exit'''
+    global _tracer
+    if _tracer is None:
+        atexit.register(close)
+    else:
+        _tracer.close()
+    _tracer = Tracer(traceFile and os.path.abspath(traceFile), metricsLog or defaultMetricsLog())
+    return _tracer
+
+def disable():
+    global _tracer
+    close()
+    _tracer = None
+
+def flush():
+    if _tracer is not None:
+        _tracer.flush()
+
+def close():
+    if _tracer is not None:
+        _tracer.close()
+
+def rollLog(path, maxBytes):
+    '''keep one previous log around once the current one is full'''
+    try:
+        if os.path.getsize(path) > maxBytes:
+            os.replace(path, path + ".1")
+    except FileNotFoundError:
+        pass
+
+def percentile(values, fraction):
+    '''nearest-rank percentile of sorted values'''
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def summarize(metricsLog=None, since=None):
+    '''count, p50, p95, max and total seconds per operation from the metrics log'''
+    metricsLog = metricsLog or defaultMetricsLog()
+    durations = {}
+    for path in (metricsLog + ".1", metricsLog):
+        try:
+            with open(path) as logFile:
+                for line in logFile:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by a crash
+                        continue
+                    if since is None or entry["time"] >= since:
+                        durations.setdefault(entry["name"], []).append(entry["seconds"])
+        except FileNotFoundError:
+            continue
+
+    summary = {}
+    for name, values in sorted(durations.items()):
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "max": values[-1],
+            "total": sum(values),
+        }
+    return summary
+
+# PMT_TRACE=trace.json records a trace, PMT_TRACE=1 only the metrics log
+_setting = os.environ.get("PMT_TRACE", "")
+if _setting and _setting.lower() not in ("0", "false", "no", "off"):
+    enable(None if _setting.lower() in ("1", "true", "yes", "on") else _setting)
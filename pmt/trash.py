@@ -0,0 +1,288 @@
+'''Instant deletes by renaming into a per-root trash, purged in the background'''
+import json
+
+import os
+
+import stat
+
+import threading
+
+import time
+
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+TRASH_NAME = ".pmt_trash"
+
+# default purge policy
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60 # seconds an entry stays restorable
+DEFAULT_MAX_BYTES = 50 * 2**30 # total trash size before the oldest entries go
+DEFAULT_INTERVAL = 60 # seconds between purger passes
+DEFAULT_WORKERS = 4
+
+class TrashEntry():
+    '''a deleted path waiting in the trash'''
+    def __init__(self, trash, entryId, meta):
+        self.trash = trash
+        self.id = entryId
+        self.original = meta["original"]
+        self.deleted = meta["deleted"]
+        self.size = meta.get("size") # filled in by the purger
+
+    @property
+    def folder(self):
+        return os.path.join(self.trash.path, self.id)
+
+    @property
+    def item(self):
+        return os.path.join(self.folder, "item")
+
+    def __repr__(self):
+        return "TrashEntry({}, {})".format(self.id, self.original)
+
+class Trash():
+    '''trash folder at the root of a PMT tree'''
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, TRASH_NAME)
+        self._lock = threading.Lock()
+
+    def contains(self, path):
+        '''whether path can be moved into this trash with a rename'''
+        path = os.path.abspath(path)
+        return path.startswith(self.root + os.sep) and not (path + os.sep).startswith(self.path + os.sep)
+
+    def delete(self, path):
+        '''move path into the trash, returns its entry'''
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+            hidePath(self.path)
+
+        # metadata first, so a crash mid-delete leaves an entry the purger can clean up
+        entryId = "{}-{}".format(time.strftime("%Y%m%d%H%M%S"), uuid.uuid4().hex[:8])
+        meta = {"original": os.path.abspath(path), "deleted": time.time()}
+        entry = TrashEntry(self, entryId, meta)
+        os.mkdir(entry.folder)
+        self._writeMeta(entry)
+
+        # a single rename regardless of how big the tree is
+        try:
+            os.rename(path, entry.item)
+        except OSError:
+            self._discard(entry)
+            raise
+
+        return entry
+
+    def entries(self):
+        '''every entry, oldest first'''
+        entries = []
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return entries
+
+        for name in names:
+            try:
+                with open(os.path.join(self.path, name, "meta.json")) as metaFile:
+                    entries.append(TrashEntry(self, name, json.load(metaFile)))
+            except (OSError, ValueError):
+                # half written entry, the purger removes it
+                continue
+
+        entries.sort(key=lambda entry: entry.deleted)
+        return entries
+
+    def find(self, original):
+        '''newest entry deleted from a path'''
+        original = os.path.abspath(original)
+        matches = [entry for entry in self.entries() if entry.original == original]
+        return matches[-1] if matches else None
+
+    def restore(self, entry, target=None):
+        '''move an entry back to where it was deleted from, or to target'''
+        target = target or entry.original
+        with self._lock:
+            if os.path.exists(target):
+                raise FileExistsError("can't restore {}, the path exists".format(target))
+            os.rename(entry.item, target)
+            self._discard(entry)
+        return target
+
+    def purge(self, entry, workers=DEFAULT_WORKERS, throttle=None):
+        '''permanently remove an entry'''
+        with self._lock:
+            # claim the entry so a restore can't race the purge
+            claimed = entry.folder + ".purging"
+            try:
+                os.rename(entry.folder, claimed)
+            except FileNotFoundError:
+                return
+        removeTree(claimed, workers, throttle)
+
+    def _writeMeta(self, entry):
+        meta = {"original": entry.original, "deleted": entry.deleted, "size": entry.size}
+        with open(os.path.join(entry.folder, "meta.json"), "w") as metaFile:
+            json.dump(meta, metaFile)
+
+    def _discard(self, entry):
+        try:
+            os.remove(os.path.join(entry.folder, "meta.json"))
+            os.rmdir(entry.folder)
+        except OSError:
+            pass
+
+def hidePath(path):
+    '''hide the trash in Explorer, dot names are hidden elsewhere'''
+    if os.name == "nt":
+        import ctypes
+        ctypes.windll.kernel32.SetFileAttributesW(path, 0x02) # FILE_ATTRIBUTE_HIDDEN
+
+def treeSize(path):
+    '''total size of the files under path'''
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as scan:
+                for entry in scan:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return total
+
+class Throttle():
+    '''limits filesystem operations per second across threads'''
+    def __init__(self, opsPerSecond):
+        self.interval = 1.0 / opsPerSecond
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+def _unlink(path, throttle):
+    if throttle:
+        throttle.wait()
+    try:
+        os.unlink(path)
+    except PermissionError:
+        # read-only files on Windows
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+def removeTree(path, workers=DEFAULT_WORKERS, throttle=None):
+    '''remove a tree, one directory's files per task, then the directories deepest first'''
+    if not os.path.isdir(path) or os.path.islink(path):
+        _unlink(path, throttle)
+        return
+
+    directories = []
+    lock = threading.Lock()
+
+    def clearDirectory(directory):
+        subdirs = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    _unlink(entry.path, throttle)
+        with lock:
+            directories.append(directory)
+        return subdirs
+
+    # breadth first, every directory level cleared in parallel
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        level = [path]
+        while level:
+            level = [subdir for subdirs in pool.map(clearDirectory, level) for subdir in subdirs]
+
+    for directory in sorted(directories, key=len, reverse=True):
+        os.rmdir(directory)
+
+class TrashPurger():
+    '''background thread applying the age and size limits to a trash'''
+    def __init__(self, trash, maxAge=DEFAULT_MAX_AGE, maxBytes=DEFAULT_MAX_BYTES,
+                 interval=DEFAULT_INTERVAL, workers=DEFAULT_WORKERS, opsPerSecond=None):
+        self.trash = trash
+        self.maxAge = maxAge
+        self.maxBytes = maxBytes
+        self.interval = interval
+        self.workers = workers
+        self.opsPerSecond = opsPerSecond # None purges at full speed
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="pmt-trash-purger", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def wake(self):
+        '''run a pass now instead of at the next interval'''
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.purgeOnce()
+            except OSError:
+                # try again next pass, e.g. a file held open by another program
+                pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def expired(self, now=None):
+        '''entries over the age limit, then the oldest ones over the size limit'''
+        now = now or time.time()
+        entries = self.trash.entries()
+        for entry in entries:
+            if entry.size is None:
+                entry.size = treeSize(entry.item)
+                self.trash._writeMeta(entry)
+
+        expired = [entry for entry in entries if now - entry.deleted > self.maxAge]
+        kept = [entry for entry in entries if entry not in expired]
+
+        total = sum(entry.size for entry in kept)
+        while kept and total > self.maxBytes:
+            entry = kept.pop(0)
+            total -= entry.size
+            expired.append(entry)
+
+        return expired
+
+    def purgeOnce(self):
+        '''one purge pass, returns the purged entries'''
+        throttle = Throttle(self.opsPerSecond) if self.opsPerSecond else None
+        expired = self.expired()
+        for entry in expired:
+            if self._stop.is_set():
+                break
+            self.trash.purge(entry, self.workers, throttle)
+
+        # leftovers of interrupted deletes and purges, old enough not to be in progress
+        for name in os.listdir(self.trash.path) if os.path.isdir(self.trash.path) else []:
+            folder = os.path.join(self.trash.path, name)
+            incomplete = name.endswith(".purging") or not os.path.exists(os.path.join(folder, "meta.json"))
+            if incomplete and time.time() - os.path.getmtime(folder) > self.interval:
+                removeTree(folder, self.workers, throttle)
+
+        return expired
@@ -0,0 +1,503 @@
+'''Lazy tree model of a PMT root for the directory views, in place of QFileSystemModel
+
+a folder is listed with os.scandir on a background thread the first time it's expanded,
+and its rows are added PAGE_SIZE at a time as the view scrolls (fetchMore), so a folder
+with tens of thousands of entries opens right away. utility folders and PMT's hidden
+dot folders are dropped while listing rather than by a proxy model.
+
+nothing is listed on the GUI thread: revealPath lists the folders down to a path on the
+pool and hands back its index once they're in. there is no file watcher: listings are refreshed after jobs through refresh(), and the
+folders that are listed are checked for a new mtime every few seconds. refreshes are
+coalesced on a timer and applied as one signal per run of added or removed rows
+'''
+import os
+
+import threading
+
+from collections import OrderedDict
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import QtCore, QtWidgets
+
+from pmt.scaffold import UTILITY_FOLDERS
+
+from pmt.trace import span
+
+# rows added per fetchMore
+PAGE_SIZE = 500
+
+# folder listings kept for re-listing unchanged folders
+DEFAULT_CACHE_DIRS = 512
+
+DEFAULT_WORKERS = 4
+
+# milliseconds refreshes are collected before they're applied
+DEFAULT_REFRESH_DELAY = 200
+
+# milliseconds between mtime checks of the listed folders, 0 turns them off
+DEFAULT_POLL_INTERVAL = 5000
+
+COLUMNS = ("Name", "Size", "Type", "Date Modified")
+
+def sortKey(name, isDir):
+    '''folders first, then by name like Explorer'''
+    return (not isDir, name.lower(), name)
+
+def scanDirectory(path):
+    '''(stamp, entries) of a folder, entries are sorted (name, isDir) pairs'''
+    try:
+        stamp = os.stat(path).st_mtime_ns
+        entries = []
+        with os.scandir(path) as scan:
+            for entry in scan:
+                try:
+                    entries.append((entry.name, entry.is_dir()))
+                except OSError:
+                    continue
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return None, []
+    entries.sort(key=lambda entry: sortKey(*entry))
+    return stamp, entries
+
+def formatSize(size):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return "{} {}".format(size, unit) if unit == "bytes" else "{:.1f} {}".format(size, unit)
+        size /= 1024.0
+
+class DirectoryCache():
+    '''listings of the most recently listed folders, reused while a folder's mtime is unchanged'''
+    def __init__(self, maxDirs=DEFAULT_CACHE_DIRS):
+        self.maxDirs = maxDirs
+        self._listings = OrderedDict() # path -> (stamp, entries)
+        self._lock = threading.Lock()
+
+    def get(self, path, stamp):
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is None or listing[0] != stamp:
+                return None
+            self._listings.move_to_end(path)
+            return listing[1]
+
+    def put(self, path, stamp, entries):
+        with self._lock:
+            if stamp is None:
+                self._listings.pop(path, None)
+                return
+            self._listings[path] = (stamp, entries)
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.maxDirs:
+                self._listings.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+class Node():
+    '''a file or folder in the tree'''
+    __slots__ = ("name", "path", "isDir", "parent", "row", "children", "pending",
+                 "loading", "stamp", "size", "mtime", "alive")
+
+    def __init__(self, name, path, isDir, parent, row=0):
+        self.name = name
+        self.path = path
+        self.isDir = isDir
+        self.parent = parent
+        self.row = row
+        self.children = None # shown rows, None until the folder is listed
+        self.pending = [] # listed entries waiting for fetchMore
+        self.loading = False
+        self.stamp = None # mtime of the folder when it was listed
+        self.size = None # read when the row is first shown
+        self.mtime = None
+        self.alive = True
+
+    def key(self):
+        return sortKey(self.name, self.isDir)
+
+class ScanSignals(QtCore.QObject):
+    '''carries listings and changed folders from the worker threads to the GUI thread'''
+    listed = QtCore.pyqtSignal(object, object, object, object) # node, generation, stamp, entries
+    changed = QtCore.pyqtSignal(object) # folder paths whose mtime moved
+    polled = QtCore.pyqtSignal() # an mtime check finished
+
+class ProjectTreeModel(QtCore.QAbstractItemModel):
+    '''the parts of QFileSystemModel the views use: filePath, index(path) and setRootPath'''
+    def __init__(self, parent=None, workers=DEFAULT_WORKERS, cacheDirs=DEFAULT_CACHE_DIRS,
+                 pollInterval=DEFAULT_POLL_INTERVAL):
+        super().__init__(parent)
+        self.showUtilityFolders = False
+        self.cache = DirectoryCache(cacheDirs)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmt-tree")
+        self._top = Node("", "", True, None) # invisible, its only child is the root
+        self._top.children = []
+        self._folders = {} # path -> listed folder node, for refreshes
+        self._generation = 0 # bumped on resets, older listings are dropped
+        self._dirty = set()
+        self._polling = False
+        self._waiting = {} # folder path -> (path, callback, column) to reveal once it's listed
+        self._icons = QtWidgets.QFileIconProvider()
+        self._folderIcon = self._icons.icon(QtWidgets.QFileIconProvider.Folder)
+        self._fileIcon = self._icons.icon(QtWidgets.QFileIconProvider.File)
+
+        self._signals = ScanSignals()
+        self._signals.listed.connect(self._listed)
+        self._signals.changed.connect(self.refresh)
+        self._signals.polled.connect(self._polled)
+
+        self._refreshTimer = QtCore.QTimer(self)
+        self._refreshTimer.setSingleShot(True)
+        self._refreshTimer.setInterval(DEFAULT_REFRESH_DELAY)
+        self._refreshTimer.timeout.connect(self._applyRefresh)
+
+        self._pollTimer = QtCore.QTimer(self)
+        self._pollTimer.timeout.connect(self._poll)
+        if pollInterval:
+            self._pollTimer.start(pollInterval)
+
+    '''***** QFileSystemModel compatibility *****'''
+    def setRootPath(self, path):
+        '''show path as the only top level row, returns its index'''
+        path = os.path.abspath(path)
+        self.beginResetModel()
+        self._generation += 1
+        for node in self._top.children:
+            self._forget(node)
+        self._top.children = [Node(path, path, True, self._top)]
+        self.endResetModel()
+        return self.createIndex(0, 0, self._top.children[0])
+
+    def rootPath(self):
+        return self._top.children[0].path if self._top.children else ""
+
+    def filePath(self, index):
+        node = self._node(index)
+        return node.path if node is not self._top else ""
+
+    def fileName(self, index):
+        return self._node(index).name
+
+    def isDir(self, index):
+        return self._node(index).isDir
+
+    def setShowUtilityFolders(self, show):
+        '''show or hide Temp and Tools folders, from the cached listings where possible'''
+        if show == self.showUtilityFolders:
+            return
+        self.showUtilityFolders = show
+        # rows are added or dropped in place so the views keep what's expanded
+        for node in list(self._folders.values()):
+            self._list(node)
+
+    def refresh(self, paths):
+        '''list folders again, and the folders holding them, once refreshes stop coming in'''
+        for path in paths:
+            path = os.path.abspath(path)
+            self._dirty.add(path)
+            self._dirty.add(os.path.dirname(path))
+        self._refreshTimer.start()
+
+    def shutdown(self):
+        self._pollTimer.stop()
+        self._pool.shutdown(wait=False)
+
+    '''***** QAbstractItemModel *****'''
+    def index(self, row, column=0, parent=QtCore.QModelIndex()):
+        # QFileSystemModel also looks up paths with index(path)
+        if isinstance(row, str):
+            return self.pathIndex(row, column)
+
+        node = self._node(parent)
+        if node.children is None or not 0 <= row < len(node.children) or not 0 <= column < len(COLUMNS):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._top:
+            return QtCore.QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(COLUMNS)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        if not node.isDir:
+            return False
+        # unlisted folders get an expand arrow, listing every folder up front is what stalls
+        if node.children is None:
+            return True
+        return bool(node.children or node.pending)
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node.isDir and (node.children is None or bool(node.pending))
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.children is None:
+            self._list(node)
+        elif node.pending:
+            self._showPage(node)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        column = index.column()
+
+        if role == QtCore.Qt.DecorationRole and column == 0:
+            return self._folderIcon if node.isDir else self._fileIcon
+        if role == QtCore.Qt.ToolTipRole and column == 0:
+            return node.path
+        if role == QtCore.Qt.TextAlignmentRole and column == 1:
+            return int(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        if role != QtCore.Qt.DisplayRole:
+            return None
+
+        if column == 0:
+            return node.name
+        if column == 2:
+            extension = os.path.splitext(node.name)[1]
+            return "Folder" if node.isDir else "{} File".format(extension[1:].upper()) if extension else "File"
+
+        # only rows on screen are ever stat'ed
+        if node.mtime is None:
+            try:
+                info = os.stat(node.path)
+                node.size, node.mtime = info.st_size, info.st_mtime
+            except OSError:
+                node.size, node.mtime = 0, 0
+        if column == 1:
+            return "" if node.isDir else formatSize(node.size)
+        return QtCore.QLocale().toString(QtCore.QDateTime.fromMSecsSinceEpoch(int(node.mtime * 1000)), QtCore.QLocale.ShortFormat)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def pathIndex(self, path, column=0):
+        '''index of a path in the folders listed so far, revealPath lists the others'''
+        node, folder = self._find(path)
+        if node is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def revealPath(self, path, callback, column=0):
+        '''call back with the index of a path once the folders down to it are listed on the pool
+
+        the index is invalid when the path isn't under the root or isn't there
+        '''
+        node, folder = self._find(path)
+        if folder is None:
+            callback(self.createIndex(node.row, column, node) if node is not None else QtCore.QModelIndex())
+            return
+        self._waiting.setdefault(folder.path, []).append((path, callback, column))
+        self._list(folder)
+
+    '''***** listing *****'''
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._top
+
+    def _indexOf(self, node):
+        if node is self._top:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _find(self, path):
+        '''(node, None) for a listed path, (None, folder) when folder has to be listed first'''
+        if not self._top.children:
+            return None, None
+        node = self._top.children[0]
+        relPath = os.path.relpath(os.path.abspath(path), node.path)
+        if relPath.startswith(os.pardir):
+            return None, None
+
+        for name in ([] if relPath == os.curdir else relPath.split(os.sep)):
+            if node.children is None:
+                return None, node
+            match = [child for child in node.children if child.name == name]
+            while not match and any(entry[0] == name for entry in node.pending):
+                self._showPage(node)
+                match = [child for child in node.children if child.name == name]
+            if not match:
+                # a folder being listed again may have it once it's done
+                return None, node if node.loading else None
+            node = match[0]
+        return node, None
+
+    def _visible(self, name, isDir):
+        if name.startswith("."):
+            return False
+        return self.showUtilityFolders or not (isDir and name in UTILITY_FOLDERS)
+
+    def _list(self, node, force=False):
+        '''list a folder on the pool, the rows are added once it's done'''
+        if node.loading:
+            return
+        node.loading = True
+        generation = self._generation
+
+        def work():
+            with span("tree.list", path=node.path) as listSpan:
+                try:
+                    stamp = os.stat(node.path).st_mtime_ns
+                except OSError:
+                    stamp = None
+                entries = None if force or stamp is None else self.cache.get(node.path, stamp)
+                if entries is None:
+                    stamp, entries = scanDirectory(node.path)
+                    self.cache.put(node.path, stamp, entries)
+                else:
+                    listSpan.set(cached=True)
+                listSpan.set(entries=len(entries))
+            self._signals.listed.emit(node, generation, stamp, entries)
+
+        self._pool.submit(work)
+
+    def _listed(self, node, generation, stamp, entries):
+        node.loading = False
+        if generation == self._generation and node.alive:
+            self._apply(node, stamp, entries)
+
+        # carry on down to paths waiting for this folder, in the tree as it is now
+        for path, callback, column in self._waiting.pop(node.path, []):
+            self.revealPath(path, callback, column)
+
+    def _apply(self, node, stamp, entries):
+        '''bring a folder's rows in line with a listing, one signal per run of changed rows'''
+        node.loading = False
+        node.stamp = stamp
+        entries = [entry for entry in entries if self._visible(*entry)]
+        parentIndex = self._indexOf(node)
+
+        if node.children is None:
+            node.children = []
+            node.pending = entries
+            self._folders[node.path] = node
+            self._showPage(node)
+            return
+
+        # drop rows gone from the disk, from the bottom so row numbers stay valid
+        names = set(entry[0] for entry in entries)
+        children = node.children
+        row = len(children) - 1
+        while row >= 0:
+            if children[row].name in names:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and children[row].name not in names:
+                row -= 1
+            self.beginRemoveRows(parentIndex, row + 1, last)
+            for child in children[row + 1:last + 1]:
+                self._forget(child)
+            del children[row + 1:last + 1]
+            self._renumber(node, row + 1)
+            self.endRemoveRows()
+
+        # the rows shown are the top of the sorted listing, new entries below them wait for fetchMore
+        shown = set(child.name for child in children)
+        lastKey = children[-1].key() if children else None
+        pending = []
+        position = 0
+        run = []
+        for name, isDir in entries:
+            if name in shown:
+                self._insertRun(node, parentIndex, position, run)
+                position += len(run) + 1
+                run = []
+            elif lastKey is not None and sortKey(name, isDir) < lastKey:
+                run.append((name, isDir))
+            else:
+                pending.append((name, isDir))
+        self._insertRun(node, parentIndex, position, run)
+        node.pending = pending
+
+        # sizes and dates are read again when they're next shown
+        for child in children:
+            child.mtime = None
+        if children:
+            self.dataChanged.emit(self.createIndex(0, 1, children[0]), self.createIndex(len(children) - 1, len(COLUMNS) - 1, children[-1]))
+        if not children:
+            self._showPage(node)
+
+    def _insertRun(self, node, parentIndex, position, entries):
+        if not entries:
+            return
+        self.beginInsertRows(parentIndex, position, position + len(entries) - 1)
+        node.children[position:position] = [Node(name, os.path.join(node.path, name), isDir, node) for name, isDir in entries]
+        self._renumber(node, position)
+        self.endInsertRows()
+
+    def _showPage(self, node):
+        '''add the next page of listed entries as rows'''
+        if not node.pending:
+            return
+        page, node.pending = node.pending[:PAGE_SIZE], node.pending[PAGE_SIZE:]
+        start = len(node.children)
+        self.beginInsertRows(self._indexOf(node), start, start + len(page) - 1)
+        node.children.extend(Node(name, os.path.join(node.path, name), isDir, node, start + row)
+                             for row, (name, isDir) in enumerate(page))
+        self.endInsertRows()
+
+    def _renumber(self, node, start):
+        for row in range(start, len(node.children)):
+            node.children[row].row = row
+
+    def _forget(self, node):
+        '''a node left the tree, with everything listed below it'''
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            node.alive = False
+            if node.children is not None:
+                self._folders.pop(node.path, None)
+                stack.extend(child for child in node.children if child.isDir)
+
+    '''***** refreshing *****'''
+    def _applyRefresh(self):
+        dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            node = self._folders.get(path)
+            if node is not None and node.alive:
+                self._list(node, force=True)
+
+    def _poll(self):
+        '''check the listed folders' mtimes on the pool, changed ones are refreshed'''
+        if self._polling or not self._folders:
+            return
+        self._polling = True
+        stamps = [(path, node.stamp) for path, node in self._folders.items()]
+
+        def work():
+            # the flag is only touched on the GUI thread
+            try:
+                changed = []
+                for path, stamp in stamps:
+                    try:
+                        if os.stat(path).st_mtime_ns != stamp:
+                            changed.append(path)
+                    except OSError:
+                        changed.append(path)
+                if changed:
+                    self._signals.changed.emit(changed)
+            finally:
+                self._signals.polled.emit()
+
+        self._pool.submit(work)
+
+    def _polled(self):
+        self._polling = False
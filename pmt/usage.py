@@ -0,0 +1,205 @@
+'''Disk usage of a PMT root, by project, DCC folder, extension and kind of data
+
+a root is scanned level by level with parallel os.scandir workers. what each directory
+holds directly (file count and bytes per extension) is cached in .pmt_usage.json at the
+root, keyed by the directory's mtime: a later scan still visits every directory, but only
+lists and stats the files of directories where something was added, removed or renamed.
+files rewritten in place don't change their folder's mtime, a full scan picks them up
+'''
+import json
+
+import os
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pmt.inject import DEFAULT_EXCLUDES
+
+from pmt.journal import JOURNAL_NAME
+
+from pmt.trash import TRASH_NAME
+
+from pmt.trace import span
+
+USAGE_NAME = ".pmt_usage.json"
+
+DEFAULT_WORKERS = 8
+
+# what a breakdown can group by
+BREAKDOWNS = ("project", "folder", "extension", "kind")
+
+# kinds of data, the first one a directory's path matches
+TEMP = "Temp"
+TOOLS = "Tools"
+TRASH = "Trash"
+GENERATED = "UE generated" # rebuilt by the engine, see inject.DEFAULT_EXCLUDES
+DATA = "Data"
+
+def kindOf(parts):
+    '''kind of the files directly in a directory with these path parts'''
+    for part in parts:
+        if part == TEMP:
+            return TEMP
+        if part == TOOLS:
+            return TOOLS
+        if part in (TRASH_NAME, JOURNAL_NAME):
+            return TRASH
+        if part in DEFAULT_EXCLUDES:
+            return GENERATED
+    return DATA
+
+class DirectoryUsage():
+    '''what a directory holds directly, its subfolders are counted on their own'''
+    __slots__ = ("mtime", "subdirs", "extensions")
+
+    def __init__(self, mtime, subdirs, extensions):
+        self.mtime = mtime # st_mtime_ns when it was listed
+        self.subdirs = subdirs # names
+        self.extensions = extensions # lowercase extension -> [files, bytes]
+
+    def toJson(self):
+        return {"m": self.mtime, "d": self.subdirs, "f": self.extensions}
+
+    @classmethod
+    def fromJson(cls, data):
+        return cls(data["m"], data["d"], data["f"])
+
+class UsageReport():
+    '''per-directory usage of a root and the totals grouped different ways'''
+    def __init__(self, root, directories, listed=0):
+        self.root = root
+        self.directories = directories # relative path ("" for the root) -> DirectoryUsage
+        self.listed = listed # directories that had to be listed, the rest came from the cache
+
+    @property
+    def totalBytes(self):
+        return sum(size for usage in self.directories.values() for files, size in usage.extensions.values())
+
+    @property
+    def totalFiles(self):
+        return sum(files for usage in self.directories.values() for files, size in usage.extensions.values())
+
+    def breakdown(self, by="project"):
+        '''[(key, files, bytes)] biggest first
+
+        project is the first folder under the root, folder a project's DCC folder such as
+        MyProject/ArtDepot/Maya, kind tells Temp, Tools, the trash and regenerated UE data
+        from everything else
+        '''
+        if by not in BREAKDOWNS:
+            raise ValueError("can't break usage down by '{}', use one of {}".format(by, ", ".join(BREAKDOWNS)))
+
+        totals = {}
+        for relPath, usage in self.directories.items():
+            parts = relPath.split("/") if relPath else []
+            if by == "project":
+                key = parts[0] if parts else "(root)"
+            elif by == "folder":
+                key = "/".join(parts[:3]) or "(root)"
+            elif by == "kind":
+                key = kindOf(parts)
+            else:
+                key = None
+
+            for extension, (files, size) in usage.extensions.items():
+                total = totals.setdefault(key or extension or "(none)", [0, 0])
+                total[0] += files
+                total[1] += size
+
+        return sorted(((key, files, size) for key, (files, size) in totals.items()), key=lambda item: (-item[2], item[0]))
+
+def cachePath(root):
+    return os.path.join(root, USAGE_NAME)
+
+def loadCache(root):
+    '''relative path -> DirectoryUsage from the last scan, empty if there was none'''
+    try:
+        with open(cachePath(root)) as cacheFile:
+            data = json.load(cacheFile)
+        return dict((relPath, DirectoryUsage.fromJson(entry)) for relPath, entry in data["dirs"].items())
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+def saveCache(root, directories):
+    path = cachePath(root)
+    # replace in one step so a scan cut short keeps the old cache
+    with open(path + ".tmp", "w") as cacheFile:
+        json.dump({"version": 1, "dirs": dict((relPath, usage.toJson()) for relPath, usage in directories.items())}, cacheFile, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+def listDirectory(path, mtime=None):
+    '''DirectoryUsage of a directory from its entries, symlinks aren't followed'''
+    if mtime is None:
+        mtime = os.stat(path).st_mtime_ns
+    subdirs = []
+    extensions = {}
+    with os.scandir(path) as scan:
+        for entry in scan:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                size = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+            if entry.name == USAGE_NAME or entry.name == USAGE_NAME + ".tmp":
+                continue
+            total = extensions.setdefault(os.path.splitext(entry.name)[1].lower(), [0, 0])
+            total[0] += 1
+            total[1] += size
+    return DirectoryUsage(mtime, subdirs, extensions)
+
+def scanUsage(root, workers=DEFAULT_WORKERS, full=False, progress=None, cache=True):
+    '''usage of every directory under root, reusing cached directories whose mtime is unchanged
+
+    progress is called with (scanned, scanned + known to go) after every level
+    '''
+    root = os.path.abspath(root)
+    known = {} if full or not cache else loadCache(root)
+    directories = {}
+    listed = [0]
+    lock = threading.Lock()
+
+    def scan(relPath):
+        path = os.path.join(root, *relPath.split("/")) if relPath else root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            usage = known.get(relPath)
+            if usage is None or usage.mtime != mtime:
+                usage = listDirectory(path, mtime)
+                with lock:
+                    listed[0] += 1
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            # removed while scanning or unreadable
+            return relPath, None
+        return relPath, usage
+
+    with span("usage.scan", path=root) as scanSpan:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            level = [""]
+            while level:
+                nextLevel = []
+                for relPath, usage in pool.map(scan, level):
+                    if usage is None:
+                        continue
+                    directories[relPath] = usage
+                    nextLevel.extend(relPath + "/" + name if relPath else name for name in usage.subdirs)
+                if progress:
+                    progress(len(directories), len(directories) + len(nextLevel))
+                level = nextLevel
+
+        scanSpan.set(dirs=len(directories), listed=listed[0])
+        if cache:
+            try:
+                saveCache(root, directories)
+            except OSError:
+                # e.g. a read-only share, the next scan lists everything again
+                pass
+    return UsageReport(root, directories, listed[0])
+
+def formatBytes(size):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return "{:.0f} {}".format(size, unit) if unit == "B" else "{:.1f} {}".format(size, unit)
+        size /= 1024.0
@@ -0,0 +1,333 @@
+'''Saved versions of assets, kept in a store per folder that doesn't duplicate unchanged data
+
+every folder's versions live in its .pmt_versions folder, one history per asset:
+
+  .pmt_versions/assets/rig.ma/versions.json   the versions, newest last
+  .pmt_versions/assets/rig.ma/v003.ma         a version cloned with a reflink
+  .pmt_versions/objects/3f/3fa2...            content-addressed chunks shared by every asset
+
+where the filesystem has reflinks (btrfs, XFS, APFS, ReFS) a version is a clone of the
+file, made in constant time and sharing its blocks until the asset is written. anywhere
+else the file is cut into CHUNK_BYTES chunks stored by their hash, so a chunk that didn't
+change since any earlier version, of any asset in the folder, isn't written again. a file
+with the same size and mtime as its newest version is never read at all.
+
+hardlinks aren't used, a DCC saving in place would change the version with the asset.
+saving, pruning and restoring are serialized per folder, a prune collecting chunks must not
+remove one a concurrent save found already stored
+'''
+import hashlib
+
+import json
+
+import os
+
+import shutil
+
+import threading
+
+import time
+
+from pmt.clone import REFLINK, AUTO, reflinkFile, supportedStrategies
+
+from pmt.trash import hidePath
+
+from pmt.trace import span
+
+VERSIONS_NAME = ".pmt_versions"
+
+OBJECTS_NAME = "objects"
+
+HISTORIES_NAME = "assets"
+
+HISTORY_NAME = "versions.json"
+
+CHUNKS = "chunks"
+
+STRATEGIES = (AUTO, REFLINK, CHUNKS)
+
+CHUNK_BYTES = 4 * 2**20
+
+# written under this prefix, then renamed into place
+TEMP_PREFIX = ".pmt_part_"
+
+class VersionError(ValueError):
+    '''raised for a version that doesn't exist or can't be saved'''
+
+class Version():
+    '''a saved version of an asset'''
+    def __init__(self, number, saved, size, mtime, note="", snapshot=None, chunks=None):
+        self.number = number
+        self.saved = saved # time it was saved
+        self.size = size
+        self.mtime = mtime # st_mtime_ns of the asset when it was saved
+        self.note = note
+        self.snapshot = snapshot # file name of a reflinked copy in the history folder
+        self.chunks = chunks # digests of the content, without a snapshot
+
+    @property
+    def label(self):
+        return "v{:03d}".format(self.number)
+
+    def toJson(self):
+        data = {"number": self.number, "saved": self.saved, "size": self.size, "mtime": self.mtime, "note": self.note}
+        if self.snapshot:
+            data["snapshot"] = self.snapshot
+        else:
+            data["chunks"] = self.chunks
+        return data
+
+    @classmethod
+    def fromJson(cls, data):
+        return cls(data["number"], data["saved"], data["size"], data["mtime"], data.get("note", ""), data.get("snapshot"), data.get("chunks"))
+
+    def __repr__(self):
+        return "Version({}, {} bytes)".format(self.label, self.size)
+
+# one lock per .pmt_versions folder, shared by every VersionStore of it in the process
+_locks = {}
+_locksLock = threading.Lock()
+
+def folderLock(path):
+    '''the lock serializing changes to the version store at path'''
+    key = os.path.normcase(os.path.abspath(path))
+    with _locksLock:
+        if key not in _locks:
+            _locks[key] = threading.RLock()
+        return _locks[key]
+
+def hashChunk(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+def tempPath(path):
+    return os.path.join(os.path.dirname(path), TEMP_PREFIX + os.path.basename(path))
+
+def writeAtomically(path, write):
+    '''write(fileobj) to a temporary name, then rename it to path'''
+    temp = tempPath(path)
+    try:
+        with open(temp, "wb") as tempFile:
+            write(tempFile)
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+class VersionStore():
+    '''the versions of the assets in one folder'''
+    def __init__(self, folder, strategy=AUTO):
+        if strategy not in STRATEGIES:
+            raise VersionError("unknown strategy '{}', use one of {}".format(strategy, ", ".join(STRATEGIES)))
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, VERSIONS_NAME)
+        self.strategy = strategy
+        self._lock = folderLock(self.path)
+
+    def ensure(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(os.path.join(self.path, OBJECTS_NAME), exist_ok=True)
+            hidePath(self.path)
+
+    def resolvedStrategy(self):
+        '''REFLINK or CHUNKS, probing the filesystem once for AUTO'''
+        if self.strategy == AUTO:
+            self.ensure()
+            self.strategy = REFLINK if REFLINK in supportedStrategies(self.folder, self.path) else CHUNKS
+        return self.strategy
+
+    def historyDir(self, name):
+        return os.path.join(self.path, HISTORIES_NAME, name)
+
+    def versions(self, name):
+        '''every Version of an asset, oldest first'''
+        try:
+            with open(os.path.join(self.historyDir(name), HISTORY_NAME)) as historyFile:
+                return [Version.fromJson(data) for data in json.load(historyFile)["versions"]]
+        except FileNotFoundError:
+            return []
+
+    def version(self, name, number):
+        for version in self.versions(name):
+            if version.number == number:
+                return version
+        raise VersionError("{} has no version {}".format(name, number))
+
+    def _saveHistory(self, name, versions):
+        path = os.path.join(self.historyDir(name), HISTORY_NAME)
+        data = json.dumps({"version": 1, "versions": [version.toJson() for version in versions]}, indent=1).encode()
+        writeAtomically(path, lambda historyFile: historyFile.write(data))
+
+    def objectPath(self, digest):
+        return os.path.join(self.path, OBJECTS_NAME, digest[:2], digest)
+
+    def save(self, path, note=""):
+        '''save the asset at path as its next version, returns the Version'''
+        name = os.path.basename(path)
+        with self._lock, span("versions.save", path=path) as saveSpan:
+            info = os.stat(path)
+            versions = self.versions(name)
+            latest = versions[-1] if versions else None
+            number = latest.number + 1 if latest else 1
+            self.ensure()
+            os.makedirs(self.historyDir(name), exist_ok=True)
+
+            if latest and (latest.size, latest.mtime) == (info.st_size, info.st_mtime_ns):
+                # unchanged since the last version, it shares that version's data
+                version = Version(number, time.time(), info.st_size, info.st_mtime_ns, note, latest.snapshot, latest.chunks)
+                saveSpan.set(unchanged=True)
+            elif self.resolvedStrategy() == REFLINK:
+                snapshot = "v{:03d}{}".format(number, os.path.splitext(name)[1])
+                reflinkFile(path, os.path.join(self.historyDir(name), snapshot))
+                version = Version(number, time.time(), info.st_size, info.st_mtime_ns, note, snapshot=snapshot)
+                saveSpan.set(strategy=REFLINK)
+            else:
+                chunks, written = self._writeChunks(path)
+                version = Version(number, time.time(), info.st_size, info.st_mtime_ns, note, chunks=chunks)
+                saveSpan.set(strategy=CHUNKS, chunks=len(chunks), written=written)
+
+            self._saveHistory(name, versions + [version])
+        return version
+
+    def _writeChunks(self, path):
+        '''(digests, chunks written) of a file stored as chunks, chunks already stored are skipped'''
+        digests = []
+        written = 0
+        with open(path, "rb") as assetFile:
+            while True:
+                data = assetFile.read(CHUNK_BYTES)
+                if not data and digests:
+                    break
+                digest = hashChunk(data)
+                digests.append(digest)
+                target = self.objectPath(digest)
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    writeAtomically(target, lambda chunkFile: chunkFile.write(data))
+                    written += 1
+                if len(data) < CHUNK_BYTES:
+                    break
+        return digests, written
+
+    def materialize(self, name, number, target):
+        '''write version number of asset name to target, returns the Version'''
+        with self._lock:
+            version = self.version(name, number)
+            with span("versions.materialize", path=target, version=version.label):
+                if version.snapshot:
+                    snapshot = os.path.join(self.historyDir(name), version.snapshot)
+                    try:
+                        # another clone of the clone, still sharing blocks
+                        reflinkFile(snapshot, tempPath(target))
+                        os.replace(tempPath(target), target)
+                    except OSError:
+                        # e.g. restored onto another filesystem
+                        writeAtomically(target, lambda targetFile: self._copyFile(snapshot, targetFile))
+                else:
+                    writeAtomically(target, lambda targetFile: self._joinChunks(version.chunks, targetFile))
+                os.utime(target, ns=(version.mtime, version.mtime))
+        return version
+
+    def _copyFile(self, source, targetFile):
+        with open(source, "rb") as sourceFile:
+            shutil.copyfileobj(sourceFile, targetFile, CHUNK_BYTES)
+
+    def _joinChunks(self, chunks, targetFile):
+        for digest in chunks:
+            try:
+                with open(self.objectPath(digest), "rb") as chunkFile:
+                    targetFile.write(chunkFile.read())
+            except FileNotFoundError:
+                raise VersionError("chunk {} of the version is missing from {}".format(digest, self.path))
+
+    def restore(self, path, number):
+        '''put version number back at path, the current file is saved as a version first unless it is one'''
+        name = os.path.basename(path)
+        with self._lock:
+            version = self.version(name, number)
+            versions = self.versions(name)
+            if os.path.exists(path):
+                info = os.stat(path)
+                # e.g. an earlier restore, still as it was put back
+                if not any((saved.size, saved.mtime) == (info.st_size, info.st_mtime_ns) for saved in versions):
+                    self.save(path, "before restoring {}".format(version.label))
+            return self.materialize(name, number, path)
+
+    def prune(self, name, keep):
+        '''forget all but the newest keep versions of an asset, returns the bytes freed'''
+        with self._lock:
+            versions = self.versions(name)
+            if len(versions) <= keep:
+                return 0
+            dropped, kept = versions[:len(versions) - keep], versions[len(versions) - keep:]
+            self._saveHistory(name, kept)
+
+            freed = 0
+            keptSnapshots = set(version.snapshot for version in kept)
+            for version in dropped:
+                if version.snapshot and version.snapshot not in keptSnapshots:
+                    snapshot = os.path.join(self.historyDir(name), version.snapshot)
+                    try:
+                        freed += os.path.getsize(snapshot)
+                        os.remove(snapshot)
+                    except FileNotFoundError:
+                        pass
+                    keptSnapshots.add(version.snapshot)
+            return freed + self._collectChunks()
+
+    def remove(self, name):
+        '''forget every version of a deleted asset, returns the bytes freed'''
+        with self._lock:
+            history = self.historyDir(name)
+            if not os.path.isdir(history):
+                return 0
+            chunked = any(version.chunks for version in self.versions(name))
+            freed = sum(entry.stat().st_size for entry in os.scandir(history) if entry.is_file())
+            shutil.rmtree(history)
+            return freed + (self._collectChunks() if chunked else 0)
+
+    def _collectChunks(self):
+        '''remove chunks no version of any asset in the folder uses'''
+        used = set()
+        try:
+            histories = [entry.name for entry in os.scandir(os.path.join(self.path, HISTORIES_NAME)) if entry.is_dir()]
+        except FileNotFoundError:
+            histories = []
+        for name in histories:
+            for version in self.versions(name):
+                used.update(version.chunks or ())
+
+        freed = 0
+        for directory, dirs, files in os.walk(os.path.join(self.path, OBJECTS_NAME)):
+            for digest in files:
+                if digest not in used:
+                    path = os.path.join(directory, digest)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+def moveHistory(old, new):
+    '''move the history of an asset renamed from old to new, a no-op if it has none
+
+    chunks are shared within a folder, so histories only follow renames inside one
+    '''
+    if os.path.dirname(os.path.abspath(old)) != os.path.dirname(os.path.abspath(new)):
+        return
+    store = VersionStore(os.path.dirname(os.path.abspath(old)))
+    source = store.historyDir(os.path.basename(old))
+    target = store.historyDir(os.path.basename(new))
+    with folderLock(store.path):
+        if os.path.isdir(source) and not os.path.exists(target):
+            os.rename(source, target)
+
+def removeHistory(path):
+    '''forget the versions of a deleted asset, a no-op if it has none'''
+    path = os.path.abspath(path)
+    return VersionStore(os.path.dirname(path)).remove(os.path.basename(path))
+
+def openPath(path, version):
+    '''where version of the asset at path is written to be opened: the folder's Temp folder'''
+    stem, extension = os.path.splitext(os.path.basename(path))
+    return os.path.join(os.path.dirname(os.path.abspath(path)), "Temp", "{}_{}{}".format(stem, version.label, extension))
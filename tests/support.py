@@ -0,0 +1,73 @@
+'''Scratch roots and tool folders for the tests, PMT_ROOT is pointed at one before pmt is imported'''
+import atexit
+
+import os
+
+import shutil
+
+import tempfile
+
+import unittest
+
+SCRATCH = tempfile.mkdtemp(prefix="pmt_tests")
+atexit.register(shutil.rmtree, SCRATCH, True)
+
+os.environ["PMT_ROOT"] = os.path.join(SCRATCH, "PMTTemp")
+
+import pmt.config
+
+import pmt.models
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROJECT_CONFIG = """<proj>
+  <utility>
+    <exclude>Intermediate</exclude>
+  </utility>
+  <dir name="ArtDepot">
+    <dir name="Maya">
+    </dir>
+  </dir>
+  <dir name="UE4">
+  </dir>
+</proj>
+"""
+
+# relative path -> content of the fake UE4 template
+UE_FILES = {
+    "UE4Project.uproject": b"{}",
+    "Content/A/a.uasset": b"template a",
+    "Content/A/b.uasset": b"template b",
+    "Content/B/c.uasset": b"template c",
+    "Intermediate/cache.bin": b"cache",
+}
+
+def writeFile(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as dataFile:
+        dataFile.write(data)
+
+def readFile(path):
+    with open(path, "rb") as dataFile:
+        return dataFile.read()
+
+def makeToolDir(path):
+    '''tool folder with the shipped config and templates, a small project layout and UE template'''
+    os.makedirs(path)
+    shutil.copyfile(os.path.join(REPO, "ConfigFileTemplate.xml"), os.path.join(path, "ConfigFileTemplate.xml"))
+    shutil.copytree(os.path.join(REPO, "TemplateAssets"), os.path.join(path, "TemplateAssets"))
+    with open(os.path.join(path, "ProjectConfig.xml"), "w") as configFile:
+        configFile.write(PROJECT_CONFIG)
+    for relPath, data in UE_FILES.items():
+        writeFile(os.path.join(path, "UE4Project", relPath), data)
+
+class ScratchTestCase(unittest.TestCase):
+    '''a test with its own PMT root and tool folder, removed afterwards'''
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp(dir=SCRATCH)
+        self.addCleanup(shutil.rmtree, self.scratch, True)
+        self.toolDir = os.path.join(self.scratch, "tool")
+        makeToolDir(self.toolDir)
+        pmt.config.TOOL_DIR = self.toolDir
+        self.addCleanup(setattr, pmt.config, "TOOL_DIR", None)
+        self.root = pmt.models.ensureRoot(os.path.join(self.scratch, "PMTTemp"))
@@ -0,0 +1,127 @@
+'''Archiving projects to .tar.gz and .zip and restoring them, and what a failed run leaves behind'''
+import gzip
+
+import io
+
+import os
+
+import unittest
+
+import zipfile
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+import pmt.archive
+
+from pmt.archive import ArchiveError, ArchiveRules, ParallelGzipWriter, archiveProject, restoreArchive
+
+# relative path -> content of the project archived
+PROJECT_FILES = {
+    "ArtDepot/Maya/rig.ma": b"rig " * 1000,
+    "ArtDepot/Maya/Tools/config.xml": b"<configuration/>",
+    "ArtDepot/Maya/big.mb": os.urandom(300000),
+    "UE4/P1/P1.uproject": b"{}",
+    "UE4/P1/Content/hero.uasset": os.urandom(5000),
+    "empty.txt": b"",
+}
+
+# relative path -> content left out of the archive
+LEFT_OUT = {
+    "ArtDepot/Maya/Temp/rig_v001.ma": b"materialized version",
+    "UE4/P1/Intermediate/cache.bin": b"cache",
+    "ArtDepot/.pmt_versions/assets/rig.ma/versions.json": b"{}",
+    "ArtDepot/Maya/notes.bak": b"excluded by a pattern",
+}
+
+class ArchiveTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = os.path.join(self.scratch, "P1")
+        for relPath, data in list(PROJECT_FILES.items()) + list(LEFT_OUT.items()):
+            writeFile(os.path.join(self.project, relPath), data)
+        os.makedirs(os.path.join(self.project, "Empty"))
+        self.mtime = 1600000000
+        os.utime(os.path.join(self.project, "ArtDepot/Maya/rig.ma"), (self.mtime, self.mtime))
+
+        # big files are streamed rather than read ahead
+        patcher = mock.patch.object(pmt.archive, "READ_AHEAD_FILE_BYTES", 100000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rules = ArchiveRules(exclude=pmt.archive.DEFAULT_EXCLUDES + ("*.bak",))
+        self.restored = os.path.join(self.scratch, "restored")
+
+    def roundTrip(self, extension):
+        archive = os.path.join(self.scratch, "P1" + extension)
+        progress = []
+        files = archiveProject(self.project, archive, self.rules, workers=2, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(files, len(PROJECT_FILES))
+        self.assertEqual(progress[-1], (files, files))
+        self.assertEqual([name for name in os.listdir(self.scratch) if name.startswith(".pmt_part_")], [])
+
+        project = restoreArchive(archive, self.restored)
+        self.assertEqual(project, os.path.join(self.restored, "P1"))
+        for relPath, data in PROJECT_FILES.items():
+            self.assertEqual(readFile(os.path.join(project, relPath)), data)
+        for relPath in LEFT_OUT:
+            self.assertFalse(os.path.exists(os.path.join(project, relPath)))
+
+        # Temp comes back empty, the other folders as they were
+        self.assertEqual(os.listdir(os.path.join(project, "ArtDepot/Maya/Temp")), [])
+        self.assertTrue(os.path.isdir(os.path.join(project, "Empty")))
+        self.assertAlmostEqual(os.path.getmtime(os.path.join(project, "ArtDepot/Maya/rig.ma")), self.mtime, delta=2)
+        return archive
+
+    def testTarRoundTrip(self):
+        self.roundTrip(".tar.gz")
+
+    def testZipRoundTrip(self):
+        archive = self.roundTrip(".zip")
+        with zipfile.ZipFile(archive) as zipFile:
+            self.assertEqual(zipFile.getinfo("P1/UE4/P1/Content/hero.uasset").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zipFile.getinfo("P1/ArtDepot/Maya/rig.ma").compress_type, zipfile.ZIP_DEFLATED)
+
+    def testRestoreRefusesExistingProject(self):
+        archive = os.path.join(self.scratch, "P1.zip")
+        archiveProject(self.project, archive, self.rules)
+        with self.assertRaises(ArchiveError):
+            restoreArchive(archive, self.scratch)
+        self.assertEqual(readFile(os.path.join(self.project, "ArtDepot/Maya/notes.bak")), b"excluded by a pattern")
+
+    def testRestoreRefusesUnsafeNames(self):
+        archive = os.path.join(self.scratch, "evil.zip")
+        with zipfile.ZipFile(archive, "w") as zipFile:
+            zipFile.writestr("P2/../../escaped.txt", b"outside")
+        with self.assertRaises(ArchiveError):
+            restoreArchive(archive, self.restored)
+        self.assertFalse(os.path.exists(os.path.join(self.scratch, "escaped.txt")))
+
+    def testFailedArchiveKeepsTheOldOne(self):
+        for extension in (".tar.gz", ".zip"):
+            archive = os.path.join(self.scratch, "P1" + extension)
+            writeFile(archive, b"last week's archive")
+
+            # the disk fills up while the files are written
+            copying = mock.patch.object(pmt.archive.shutil, "copyfileobj", side_effect=OSError("disk full"))
+            adding = mock.patch.object(pmt.archive.tarfile.TarFile, "addfile", side_effect=OSError("disk full"))
+            with copying, adding, self.assertRaises(OSError):
+                archiveProject(self.project, archive, self.rules, workers=2)
+            self.assertEqual(readFile(archive), b"last week's archive")
+            self.assertEqual([name for name in os.listdir(self.scratch) if name.startswith(".pmt_part_")], [])
+
+    def testUnknownFormat(self):
+        with self.assertRaises(ArchiveError):
+            archiveProject(self.project, os.path.join(self.scratch, "P1.rar"))
+
+class GzipWriterTests(unittest.TestCase):
+    def testMembersReadAsOneStream(self):
+        data = os.urandom(5000) + b"a" * 20000
+        output = io.BytesIO()
+        with ParallelGzipWriter(output, workers=3, blockBytes=1000) as writer:
+            for start in range(0, len(data), 777):
+                writer.write(data[start:start + 777])
+        self.assertEqual(gzip.decompress(output.getvalue()), data)
+
+if __name__ == "__main__":
+    unittest.main()
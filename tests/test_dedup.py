@@ -0,0 +1,69 @@
+'''Linking duplicates: only files unchanged since they were hashed, never different content'''
+import os
+
+import time
+
+import unittest
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+from pmt.dedup import HARDLINK, findDuplicates, dedupe, breakLink
+
+class DedupTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.keeper = os.path.join(self.root, "A", "source.fbx")
+        self.duplicate = os.path.join(self.root, "B", "source.fbx")
+        writeFile(self.keeper, b"mesh" * 1000)
+        writeFile(self.duplicate, b"mesh" * 1000)
+
+    def find(self):
+        report = findDuplicates(self.root, minBytes=1, workers=2)
+        self.assertEqual([group.paths for group in report.groups], [[self.keeper, self.duplicate]])
+        return report
+
+    def testLinksDuplicates(self):
+        result = dedupe(self.find(), HARDLINK)
+        self.assertEqual(result.linked, 1)
+        self.assertTrue(os.path.samefile(self.keeper, self.duplicate))
+
+    def testChangedKeeperSkipsGroup(self):
+        report = self.find()
+        time.sleep(0.05)
+        writeFile(self.keeper, b"edit" * 1000)
+
+        result = dedupe(report, HARDLINK)
+        self.assertEqual(result.linked, 0)
+        self.assertEqual(len(result.skipped), 1)
+        self.assertEqual(readFile(self.duplicate), b"mesh" * 1000)
+
+    def testDifferentBytesAreNeverLinked(self):
+        # an edit that keeps the size and mtime still isn't linked over
+        report = self.find()
+        info = os.stat(self.keeper)
+        writeFile(self.keeper, b"edit" * 1000)
+        os.utime(self.keeper, ns=(info.st_atime_ns, info.st_mtime_ns))
+
+        result = dedupe(report, HARDLINK)
+        self.assertEqual(result.linked, 0)
+        self.assertEqual(readFile(self.duplicate), b"mesh" * 1000)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.duplicate))), ["source.fbx"])
+
+    def testChangedDuplicateIsSkipped(self):
+        report = self.find()
+        time.sleep(0.05)
+        writeFile(self.duplicate, b"edit" * 1000)
+
+        result = dedupe(report, HARDLINK)
+        self.assertEqual(result.linked, 0)
+        self.assertEqual(readFile(self.duplicate), b"edit" * 1000)
+
+    def testBreakLink(self):
+        dedupe(self.find(), HARDLINK)
+        self.assertTrue(breakLink(self.duplicate))
+        self.assertFalse(os.path.samefile(self.keeper, self.duplicate))
+        self.assertEqual(readFile(self.duplicate), b"mesh" * 1000)
+        self.assertFalse(breakLink(self.duplicate))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+'''Asset index: reconciling with the disk, search, and the watcher's passes'''
+import os
+
+import threading
+
+import time
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, writeFile
+
+import pmt.index
+
+from pmt.index import AssetIndex, IndexWatcher, nameWords
+
+class IndexTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = os.path.join(self.root, "Hero", "ArtDepot", "Maya")
+        for name in ("heroRig.ma", "heroModel.ma", "villainRig.ma", "dragon_castle_rig.ma", "notes.txt"):
+            writeFile(os.path.join(self.folder, name), b"x")
+        self.index = AssetIndex(self.root, workers=2)
+        self.addCleanup(self.index.close)
+        self.index.reconcile()
+
+    def names(self, records):
+        return [record.name for record in records]
+
+    def testReconcile(self):
+        records = self.index.query(project="Hero", extension=".ma")
+        self.assertEqual(len(records), 4)
+        self.assertEqual(set(record.dcc for record in records), {"Maya"})
+
+        # a file written in place doesn't change its folder's mtime
+        info = os.stat(self.folder)
+        writeFile(os.path.join(self.folder, "heroRig.ma"), b"saved again")
+        os.utime(self.folder, ns=(info.st_atime_ns, info.st_mtime_ns))
+        self.assertEqual(self.index.reconcile(), (1, 0))
+        sizes = dict((record.name, record.size) for record in self.index.query(folder=self.folder))
+        self.assertEqual(sizes["heroRig.ma"], len(b"saved again"))
+
+    def testConfigResolvedOncePerFolder(self):
+        writeFile(os.path.join(self.folder, "more.ma"), b"x")
+        with mock.patch.object(pmt.index, "getConfig", wraps=pmt.index.getConfig) as getConfig:
+            self.index.refreshFolder(self.folder)
+        self.assertEqual(getConfig.call_count, 1)
+
+    def testRemovedFolder(self):
+        for name in os.listdir(self.folder):
+            os.remove(os.path.join(self.folder, name))
+        os.rmdir(self.folder)
+        self.index.reconcile()
+        self.assertEqual(self.index.query(project="Hero", extension=".ma"), [])
+
+    def testSearch(self):
+        self.assertEqual(self.names(self.index.search("hero"))[:2], ["heroModel.ma", "heroRig.ma"])
+        self.assertEqual(sorted(self.names(self.index.search("rig"))), ["dragon_castle_rig.ma", "heroRig.ma", "villainRig.ma"])
+
+    def testFuzzySearch(self):
+        self.assertEqual(nameWords("heroRig_v003.ma"), ["hero", "rig"])
+        self.assertEqual(self.names(self.index.search("dragn rgi")), ["dragon_castle_rig.ma"])
+        self.assertEqual(self.names(self.index.search("vilan")), ["villainRig.ma"])
+        self.assertEqual(self.index.search("zebra"), [])
+
+    def testWordsOfAnOlderIndex(self):
+        with self.index.db:
+            self.index.db.execute("DELETE FROM words")
+        index = AssetIndex(self.root)
+        self.addCleanup(index.close)
+        self.assertIn("dragon", index.words())
+
+class WatcherTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = AssetIndex(self.root, workers=2)
+        self.addCleanup(self.index.close)
+        self.index.reconcile()
+
+    def runLoop(self, watcher, seconds=0.2):
+        thread = threading.Thread(target=watcher._loop)
+        thread.start()
+        time.sleep(seconds)
+        watcher._stop.set()
+        watcher._wake.set()
+        thread.join()
+
+    def testNoReconcileWhileWatching(self):
+        watcher = IndexWatcher(self.index, pollInterval=0.01, debounce=0)
+        watcher._observer = object() # events arrive, polling isn't needed
+        with mock.patch.object(self.index, "reconcile") as reconcile:
+            self.runLoop(watcher)
+        reconcile.assert_not_called()
+
+    def testPollingReconciles(self):
+        watcher = IndexWatcher(self.index, pollInterval=0.01, debounce=0)
+        with mock.patch.object(self.index, "reconcile") as reconcile:
+            self.runLoop(watcher)
+        self.assertTrue(reconcile.called)
+
+    def testPassNotifiesChangedFolders(self):
+        watcher = IndexWatcher(self.index, debounce=0)
+        changed = []
+        watcher.listeners.append(changed.append)
+        folder = os.path.join(self.root, "Hero")
+        writeFile(os.path.join(folder, "Sub", "rig.ma"), b"x")
+        watcher.touched(folder, isDirectory=True)
+        watcher._pass(True)
+
+        self.assertEqual(sorted(changed[0]), sorted([self.root, folder, os.path.join(folder, "Sub")]))
+        self.assertEqual(self.index.search("rig")[0].path, os.path.join(folder, "Sub", "rig.ma"))
+
+    def testFailedPassKeepsFolders(self):
+        watcher = IndexWatcher(self.index, debounce=0)
+        watcher.touched(os.path.join(self.root, "Hero", "rig.ma"))
+        with mock.patch.object(self.index, "refreshFolder", side_effect=OSError("share went away")):
+            with self.assertRaises(OSError):
+                watcher._pass(True)
+        self.assertEqual(watcher._dirty, {os.path.join(self.root, "Hero")})
+
+if __name__ == "__main__":
+    unittest.main()
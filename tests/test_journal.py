@@ -0,0 +1,118 @@
+'''Journaled renames and deletes: resuming and rolling back, also when the last steps weren't written'''
+import os
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+import pmt.models
+
+from pmt.journal import Journal, JournalError
+
+from pmt.models import deleteAll, renameAll, rollbackJournal, runJournal
+
+from pmt.trash import Trash
+
+class Interrupted(Exception):
+    pass
+
+def interruptAfter(steps):
+    '''a _runStep that stops the journal after a number of steps'''
+    runStep = pmt.models._runStep
+    done = []
+
+    def run(step, trash):
+        if len(done) >= steps:
+            raise Interrupted()
+        done.append(step)
+        return runStep(step, trash)
+    return run
+
+class JournalTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = os.path.join(self.root, "Art")
+        self.a, self.b, self.c = [self.make(name) for name in ("a.ma", "b.ma", "c.ma")]
+        self.temp = os.path.join(self.folder, ".pmt_rename_0")
+
+    def make(self, name):
+        path = os.path.join(self.folder, name)
+        writeFile(path, name.encode())
+        return path
+
+    def contents(self):
+        return dict((name, readFile(os.path.join(self.folder, name))) for name in sorted(os.listdir(self.folder)))
+
+    def swap(self):
+        '''a and b swap names through a temporary one'''
+        return [(self.a, self.temp), (self.b, self.a), (self.temp, self.b)]
+
+    def interrupt(self, job, steps, written=True):
+        '''run job until steps are done, without any journal writes unless written'''
+        with mock.patch.object(pmt.models, "_runStep", interruptAfter(steps)):
+            with mock.patch.object(Journal, "flush", Journal.flush if written else lambda journal: None):
+                with self.assertRaises(Interrupted):
+                    job()
+        journal, = Journal.unfinished(self.root)
+        self.assertEqual(len(journal.completed), steps if written else 0)
+        return journal
+
+    def testRenameResumes(self):
+        for steps in range(3):
+            for written in (True, False):
+                journal = self.interrupt(lambda: renameAll(self.swap(), self.root), steps, written)
+                runJournal(journal)
+                self.assertEqual(self.contents(), {"a.ma": b"b.ma", "b.ma": b"a.ma", "c.ma": b"c.ma"})
+                self.assertEqual(Journal.unfinished(self.root), [])
+
+                # back for the next round
+                renameAll(self.swap(), self.root)
+
+    def testRenameRollsBack(self):
+        original = self.contents()
+        for steps in range(3):
+            for written in (True, False):
+                journal = self.interrupt(lambda: renameAll(self.swap(), self.root), steps, written)
+                self.assertEqual(rollbackJournal(journal), [])
+                self.assertEqual(self.contents(), original)
+                self.assertEqual(Journal.unfinished(self.root), [])
+
+    def testRenameNeverOverwrites(self):
+        with self.assertRaises(FileExistsError):
+            renameAll([(self.a, self.b)], self.root)
+        self.assertEqual(self.contents(), {"a.ma": b"a.ma", "b.ma": b"b.ma", "c.ma": b"c.ma"})
+
+    def testChangedPathsAreNotResumed(self):
+        journal = self.interrupt(lambda: renameAll(self.swap(), self.root), 1, written=False)
+        # the renamed file was removed since, nothing tells how far the run got
+        os.remove(self.temp)
+
+        with self.assertRaises(JournalError):
+            runJournal(journal)
+        self.assertEqual(self.contents(), {"b.ma": b"b.ma", "c.ma": b"c.ma"})
+        self.assertEqual(len(Journal.unfinished(self.root)), 1)
+
+    def testDeleteRollsBackFromTrash(self):
+        trash = Trash(self.root)
+        sub = os.path.join(self.folder, "Sub")
+        writeFile(os.path.join(sub, "d.ma"), b"d")
+
+        journal = self.interrupt(lambda: deleteAll([sub, self.c], self.root, trash), 1)
+        self.assertFalse(os.path.exists(sub))
+        self.assertEqual(rollbackJournal(journal), [])
+        self.assertEqual(readFile(os.path.join(sub, "d.ma")), b"d")
+
+        journal = self.interrupt(lambda: deleteAll([sub, self.c], self.root, trash), 1)
+        runJournal(journal)
+        self.assertFalse(os.path.exists(sub))
+        self.assertFalse(os.path.exists(self.c))
+
+    def testDeleteWithoutTrashReportsWhatIsGone(self):
+        journal = self.interrupt(lambda: deleteAll([self.c, self.b], self.root), 1)
+        self.assertEqual(rollbackJournal(journal), [self.c])
+        self.assertTrue(os.path.exists(self.b))
+
+if __name__ == "__main__":
+    unittest.main()
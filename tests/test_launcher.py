@@ -0,0 +1,159 @@
+'''Launcher grouping, the launch cap and handing files to a running copy, with pmt/stubdcc.py as the application'''
+import json
+
+import os
+
+import socket
+
+import sys
+
+import threading
+
+import time
+
+import unittest
+
+from xml.sax.saxutils import escape
+
+from tests.support import REPO, ScratchTestCase, writeFile
+
+from pmt.launcher import Instance, Launcher, serveOpenRequests, freePort
+
+STUB = os.path.join(REPO, "pmt", "stubdcc.py")
+
+def stubCommand(name):
+    # a different command line per dcc, so each is its own application
+    return escape('"{}" "{}" --{}'.format(sys.executable, STUB, name))
+
+CONFIG = """<configuration>
+  <applications>
+    <dcc name="Single" maxLaunches="2">
+      <version name="stub">{single}</version>
+      <fileType>.one</fileType>
+    </dcc>
+    <dcc name="Multi" multiFile="true">
+      <version name="stub">{multi}</version>
+      <fileType>.many</fileType>
+    </dcc>
+  </applications>
+</configuration>
+"""
+
+class LauncherTest(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        writeFile(os.path.join(self.scratch, "Tools", "config.xml"),
+                  CONFIG.format(single=stubCommand("single"), multi=stubCommand("multi")).encode("utf-8"))
+        self.art = os.path.join(self.scratch, "Art")
+        self.log = os.path.join(self.scratch, "stub.jsonl")
+
+        environment = {"PMT_STUB_LOG": self.log, "PMT_STUB_STARTUP": "0.5", "PMT_STUB_LIFETIME": "20"}
+        for name, value in environment.items():
+            self.addCleanup(self.restoreVariable, name, os.environ.get(name))
+            os.environ[name] = value
+
+        self.launcher = Launcher()
+        self.addCleanup(self.stopInstances)
+
+    def restoreVariable(self, name, value):
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+    def stopInstances(self):
+        for instances in self.launcher.instances.values():
+            for instance in instances:
+                instance.process.kill()
+                instance.process.wait()
+
+    def asset(self, name):
+        path = os.path.join(self.art, name)
+        writeFile(path, b"asset")
+        return path
+
+    def events(self, count, timeout=15):
+        '''the stub's log once it holds count events'''
+        deadline = time.monotonic() + timeout
+        while True:
+            events = []
+            if os.path.exists(self.log):
+                with open(self.log) as logFile:
+                    events = [json.loads(line) for line in logFile if line.strip()]
+            if len(events) >= count or time.monotonic() > deadline:
+                return events
+            time.sleep(0.05)
+
+    def testGroupsByApplication(self):
+        paths = [self.asset("a.one"), self.asset("b.many"), self.asset("c.ONE")]
+        groups = self.launcher.group(paths)
+
+        self.assertEqual(len(groups), 2)
+        byDcc = dict((dcc, (policy, files)) for dcc, policy, files in groups.values())
+        self.assertEqual(byDcc["Single"][1], [paths[0], paths[2]])
+        self.assertEqual(byDcc["Multi"][1], [paths[1]])
+        self.assertFalse(byDcc["Single"][0].multiFile)
+        self.assertEqual(byDcc["Single"][0].maxLaunches, 2)
+        self.assertTrue(byDcc["Multi"][0].multiFile)
+
+    def testMultiFileGroupIsOneProcess(self):
+        paths = [self.asset("a.many"), self.asset("b.many"), self.asset("c.many")]
+        self.launcher.open(paths)
+
+        events = self.events(1)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["event"], "launch")
+        self.assertEqual(events[0]["files"][1:], paths)
+
+    def testLaunchCapHandsTheRestOver(self):
+        paths = [self.asset("{}.one".format(name)) for name in "abcd"]
+        self.launcher.open(paths)
+
+        events = self.events(4)
+        launches = [event for event in events if event["event"] == "launch"]
+        opens = [event for event in events if event["event"] == "open"]
+        self.assertEqual(len(launches), 2)
+        self.assertEqual(sorted(event["files"][1:] for event in launches), [[paths[0]], [paths[1]]])
+        self.assertEqual(sorted(path for event in opens for path in event["files"]), paths[2:])
+
+        # the handed over files went to copies PMT started
+        self.assertTrue(set(event["pid"] for event in opens) <= set(event["pid"] for event in launches))
+
+class OpenRequestTest(unittest.TestCase):
+    def testSlowOpenIsAcknowledgedFirst(self):
+        opening = threading.Event()
+        release = threading.Event()
+        received = []
+
+        def openFiles(files):
+            received.append(files)
+            opening.set()
+            release.wait(10)
+
+        port = freePort()
+        server = serveOpenRequests(openFiles, port)
+        self.addCleanup(server.close)
+        self.addCleanup(release.set)
+
+        instance = Instance("stub", None, port, 5)
+        started = time.monotonic()
+        self.assertTrue(instance.send(["a.ma"]))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(opening.wait(5))
+        self.assertEqual(received, [["a.ma"]])
+
+        # still taking files while the first open hasn't returned
+        self.assertTrue(instance.send(["b.ma"]))
+
+    def testBadRequestIsRefused(self):
+        port = freePort()
+        server = serveOpenRequests(lambda files: None, port)
+        self.addCleanup(server.close)
+
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+            connection.sendall(b"not json\n")
+            reply = connection.makefile("r", encoding="utf-8").readline()
+        self.assertTrue(reply.startswith("error"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+'''Project creation: refusing existing projects, interrupting, resuming and rolling back'''
+import os
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, UE_FILES, readFile, writeFile
+
+from pmt.clone import Cloner, COPY
+
+from pmt.journal import Journal
+
+from pmt.models import Project, PROJECT_JOURNAL, checkNewProject, rollbackJournal
+
+class Interrupted(Exception):
+    pass
+
+def interruptAfter(files):
+    '''a Cloner.copyFile that stops the clone after a number of files'''
+    copyFile = Cloner.copyFile
+    copied = []
+
+    def copy(cloner, src, dst):
+        if len(copied) >= files:
+            raise Interrupted()
+        copied.append(dst)
+        return copyFile(cloner, src, dst)
+    return copy
+
+class ProjectTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "P1")
+        self.ueProject = os.path.join(self.path, "UE4", "P1")
+
+    def interrupt(self, files=2):
+        with mock.patch.object(Cloner, "copyFile", interruptAfter(files)):
+            with self.assertRaises(Interrupted):
+                Project(self.path, cloneStrategy=COPY)
+        return Journal.find(self.root, PROJECT_JOURNAL, self.path)
+
+    def testCreate(self):
+        Project(self.path, cloneStrategy=COPY)
+        self.assertTrue(os.path.isfile(os.path.join(self.ueProject, "P1.uproject")))
+        self.assertFalse(os.path.exists(os.path.join(self.ueProject, "UE4Project.uproject")))
+        self.assertTrue(os.path.isdir(os.path.join(self.path, "ArtDepot", "Maya", "Tools")))
+        self.assertIsNone(Journal.find(self.root, PROJECT_JOURNAL, self.path))
+
+    def testExistingProjectIsRefused(self):
+        Project(self.path, cloneStrategy=COPY)
+        edited = os.path.join(self.ueProject, "Content", "A", "a.uasset")
+        writeFile(edited, b"artist's work")
+
+        for attempt in range(2):
+            with self.assertRaises(FileExistsError):
+                Project(self.path, cloneStrategy=COPY)
+            # nothing to resume from, so a second run is refused too
+            self.assertIsNone(Journal.find(self.root, PROJECT_JOURNAL, self.path))
+        self.assertEqual(readFile(edited), b"artist's work")
+
+    def testExistingUEProjectIsRefused(self):
+        writeFile(os.path.join(self.ueProject, "P1.uproject"), b"mine")
+        with self.assertRaises(FileExistsError):
+            Project(self.path, cloneStrategy=COPY)
+        self.assertEqual(readFile(os.path.join(self.ueProject, "P1.uproject")), b"mine")
+
+    def testEmptyNameIsRefused(self):
+        with self.assertRaises(ValueError):
+            checkNewProject(os.path.join(self.root, ""))
+        with self.assertRaises(ValueError):
+            checkNewProject(os.path.join(self.root, "  "))
+
+    def testInterruptLeavesJournal(self):
+        journal = self.interrupt()
+        self.assertIsNotNone(journal)
+        journal.close()
+        self.assertFalse(os.path.exists(os.path.join(self.ueProject, "P1.uproject")))
+        # no file shows up under its name half written
+        names = [name for directory, dirs, files in os.walk(self.ueProject) for name in files]
+        self.assertEqual(len(names), len(set(names)))
+
+    def testResumeCreatesOnlyMissingFiles(self):
+        self.interrupt().close()
+        copied = [os.path.join(directory, name) for directory, dirs, files in os.walk(self.ueProject) for name in files]
+        self.assertTrue(copied)
+        writeFile(copied[0], b"edited after the interruption")
+
+        Project(self.path, cloneStrategy=COPY)
+        self.assertEqual(readFile(copied[0]), b"edited after the interruption")
+        for relPath, data in UE_FILES.items():
+            if relPath.endswith(".uproject"):
+                continue
+            path = os.path.join(self.ueProject, relPath)
+            if path != copied[0]:
+                self.assertEqual(readFile(path), data)
+        self.assertTrue(os.path.isfile(os.path.join(self.ueProject, "P1.uproject")))
+        self.assertIsNone(Journal.find(self.root, PROJECT_JOURNAL, self.path))
+
+    def testResumeKeepsExistingUProject(self):
+        self.interrupt().close()
+        writeFile(os.path.join(self.ueProject, "P1.uproject"), b"mine")
+
+        Project(self.path, cloneStrategy=COPY)
+        self.assertEqual(readFile(os.path.join(self.ueProject, "P1.uproject")), b"mine")
+
+    def testRollbackRemovesCreatedProject(self):
+        journal = self.interrupt()
+        self.assertEqual(rollbackJournal(journal), [])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(Journal.find(self.root, PROJECT_JOURNAL, self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+'''Pattern renames: rendering, conflicts, two-phase swaps and chains, interrupted and rolled back'''
+import os
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+import pmt.models
+
+from pmt.journal import Journal
+
+from pmt.models import rollbackJournal, runJournal
+
+from pmt.rename import RenameError, RenamePattern, TEMP_PREFIX, batchRename, planRenames
+
+from pmt.versions import VersionStore
+
+class Interrupted(Exception):
+    pass
+
+def interruptAfter(steps):
+    '''a _runStep that stops the journal after a number of steps'''
+    runStep = pmt.models._runStep
+    done = []
+
+    def run(step, trash):
+        if len(done) >= steps:
+            raise Interrupted()
+        done.append(step)
+        return runStep(step, trash)
+    return run
+
+class PatternTests(unittest.TestCase):
+    def testTokens(self):
+        pattern = RenamePattern("{parent}_{name:upper}_{n:3}")
+        self.assertEqual(pattern.render(os.path.join("Art", "rig.ma"), 0), "Art_RIG_001.ma")
+        self.assertEqual(pattern.render(os.path.join("Art", "rig.ma"), 11), "Art_RIG_012.ma")
+        self.assertEqual(RenamePattern("{name}", find=r"_v\d+$", replace="").render("rig_v003.ma", 0), "rig.ma")
+        self.assertEqual(RenamePattern("{name}_{n}", start=10, step=5).render("a.ma", 2), "a_20.ma")
+
+    def testField(self):
+        self.assertEqual(RenamePattern.fromField("hero", 1).render("rig.ma", 0), "hero.ma")
+        self.assertEqual(RenamePattern.fromField("hero", 3).render("rig.ma", 1), "hero2.ma")
+
+    def testBadPatterns(self):
+        for template in ("{nope}", "{n:x}", "{name:sideways}"):
+            with self.assertRaises(RenameError):
+                RenamePattern(template)
+        with self.assertRaises(RenameError):
+            RenamePattern(find="(")
+
+class RenameTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = os.path.join(self.scratch, "Art")
+        self.journalDir = self.scratch
+
+    def make(self, *names):
+        paths = [os.path.join(self.folder, name) for name in names]
+        for path in paths:
+            writeFile(path, os.path.basename(path).encode())
+        return paths
+
+    def contents(self):
+        return dict((name, readFile(os.path.join(self.folder, name))) for name in os.listdir(self.folder)
+                    if not name.startswith("."))
+
+    def testConflictsRenameNothing(self):
+        a, b, taken = self.make("a.ma", "b.ma", "taken.ma")
+        self.assertFalse(planRenames([a], RenamePattern("taken")).ok)
+        self.assertFalse(planRenames([a, b], RenamePattern("same")).ok)
+        self.assertFalse(planRenames([a], RenamePattern("bad?name")).ok)
+        self.assertFalse(planRenames([a], RenamePattern("CON")).ok)
+
+        with self.assertRaises(RenameError):
+            batchRename([a, b], RenamePattern("same"), self.journalDir)
+        self.assertEqual(sorted(self.contents()), ["a.ma", "b.ma", "taken.ma"])
+
+    def testInsideRenamedFolder(self):
+        inner, = self.make("sub/inner.ma")
+        plan = planRenames([os.path.join(self.folder, "sub"), inner], RenamePattern("{name}_x"))
+        self.assertEqual([path for path, reason in plan.conflicts], [inner])
+
+    def testSwapGoesThroughTemporaryNames(self):
+        a, b = self.make("a.ma", "b.ma")
+        plan = planRenames([a, b], PatternMap({a: "b.ma", b: "a.ma"}))
+        self.assertTrue(plan.ok)
+        self.assertEqual(len(plan.cycles()), 1)
+        steps = plan.steps()
+        self.assertEqual(len(steps), 4)
+        self.assertTrue(all(os.path.basename(new).startswith(TEMP_PREFIX) for old, new in steps[:2]))
+
+        batchRename([a, b], PatternMap({a: "b.ma", b: "a.ma"}), self.journalDir)
+        self.assertEqual(self.contents(), {"a.ma": b"b.ma", "b.ma": b"a.ma"})
+        self.assertEqual(Journal.unfinished(self.journalDir), [])
+
+    def testChain(self):
+        a, b = self.make("a.ma", "b.ma")
+        batchRename([a, b], PatternMap({a: "b.ma", b: "c.ma"}), self.journalDir)
+        self.assertEqual(self.contents(), {"b.ma": b"a.ma", "c.ma": b"b.ma"})
+
+    def testInterruptedSwapResumes(self):
+        a, b = self.make("a.ma", "b.ma")
+        with mock.patch.object(pmt.models, "_runStep", interruptAfter(3)):
+            with self.assertRaises(Interrupted):
+                batchRename([a, b], PatternMap({a: "b.ma", b: "a.ma"}), self.journalDir)
+
+        journal, = Journal.unfinished(self.journalDir)
+        runJournal(journal)
+        self.assertEqual(self.contents(), {"a.ma": b"b.ma", "b.ma": b"a.ma"})
+        self.assertEqual(Journal.unfinished(self.journalDir), [])
+
+    def testInterruptedSwapRollsBack(self):
+        a, b = self.make("a.ma", "b.ma")
+        for steps in range(4):
+            with mock.patch.object(pmt.models, "_runStep", interruptAfter(steps)):
+                with self.assertRaises(Interrupted):
+                    batchRename([a, b], PatternMap({a: "b.ma", b: "a.ma"}), self.journalDir)
+
+            journal, = Journal.unfinished(self.journalDir)
+            self.assertEqual(rollbackJournal(journal), [])
+            self.assertEqual(self.contents(), {"a.ma": b"a.ma", "b.ma": b"b.ma"})
+            self.assertEqual(os.listdir(self.folder), [name for name in os.listdir(self.folder) if not name.startswith(TEMP_PREFIX)])
+
+    def testVersionsFollow(self):
+        a, = self.make("a.ma")
+        store = VersionStore(self.folder, "chunks")
+        store.save(a)
+        batchRename([a], RenamePattern("hero"), self.journalDir)
+        self.assertEqual(store.versions("a.ma"), [])
+        self.assertEqual(len(store.versions("hero.ma")), 1)
+
+class PatternMap(RenamePattern):
+    '''a pattern giving each path a fixed new name'''
+    def __init__(self, names):
+        super().__init__()
+        self.names = names
+
+    def render(self, path, index):
+        return self.names[path]
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+'''Scaffold plans resumed from a journal: folders there before the run are left alone'''
+import os
+
+import unittest
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+from pmt.journal import Journal
+
+from pmt.scaffold import ScaffoldPlan, ScaffoldEngine
+
+class ScaffoldTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.projectConfig = os.path.join(self.toolDir, "ProjectConfig.xml")
+        self.configTemplate = os.path.join(self.toolDir, "ConfigFileTemplate.xml")
+        self.path = os.path.join(self.root, "P1")
+        self.art = os.path.join(self.path, "ArtDepot")
+        self.maya = os.path.join(self.art, "Maya")
+
+    def journaledPlan(self, createdRoot):
+        '''a plan and its journal, as a run left them when it stopped before its first step'''
+        plan = ScaffoldPlan.fromConfig(self.path, self.projectConfig, self.configTemplate)
+        journal = Journal.create(self.root, "project", self.path, plan.toSteps(), createdRoot=createdRoot)
+        return plan, journal
+
+    def resume(self, journal):
+        journal.close()
+        journal = Journal.load(journal.path)
+        plan = ScaffoldPlan.fromSteps(journal.steps, journal)
+        result = ScaffoldEngine(2, journal=journal).run(plan)
+        journal.complete()
+        return result
+
+    def testRunCopiesConfigs(self):
+        plan = ScaffoldPlan.fromConfig(self.path, self.projectConfig, self.configTemplate)
+        os.mkdir(self.path)
+        result = ScaffoldEngine(2).run(plan)
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.copied, 3)
+        for folder in (self.art, self.maya, os.path.join(self.path, "UE4")):
+            self.assertTrue(os.path.isdir(os.path.join(folder, "Temp")))
+            self.assertEqual(readFile(os.path.join(folder, "Tools", "config.xml")), readFile(self.configTemplate))
+            self.assertEqual(os.listdir(os.path.join(folder, "Tools")), ["config.xml"])
+
+    def testResumeLeavesFoldersThatWereThere(self):
+        mine = os.path.join(self.art, "Tools", "config.xml")
+        writeFile(mine, b"mine")
+        plan, journal = self.journaledPlan(createdRoot=False)
+
+        result = self.resume(journal)
+        self.assertEqual(readFile(mine), b"mine")
+        self.assertFalse(os.path.exists(os.path.join(self.art, "Temp")))
+
+        # folders inside it that it lacked are made with their utilities
+        self.assertTrue(os.path.isfile(os.path.join(self.maya, "Tools", "config.xml")))
+        self.assertEqual(result.copied, 2)
+
+    def testResumeFinishesFoldersMadeBeforeTheCrash(self):
+        # the job made the project and ArtDepot but stopped before journaling them
+        os.makedirs(self.art)
+        plan, journal = self.journaledPlan(createdRoot=True)
+
+        self.resume(journal)
+        self.assertTrue(os.path.isdir(os.path.join(self.art, "Temp")))
+        self.assertEqual(readFile(os.path.join(self.art, "Tools", "config.xml")), readFile(self.configTemplate))
+        self.assertTrue(os.path.isfile(os.path.join(self.maya, "Tools", "config.xml")))
+
+    def testResumeNeverOverwritesConfigs(self):
+        os.mkdir(self.path)
+        plan, journal = self.journaledPlan(createdRoot=True)
+
+        # the folders were made and journaled, one config was edited before the copies ran
+        for op in plan.ofKind("folder"):
+            os.mkdir(op.path)
+            journal.done(op.step, True)
+        mine = os.path.join(self.maya, "Tools", "config.xml")
+        writeFile(mine, b"mine")
+
+        result = self.resume(journal)
+        self.assertEqual(readFile(mine), b"mine")
+        self.assertEqual(result.copied, 2)
+        self.assertEqual(readFile(os.path.join(self.art, "Tools", "config.xml")), readFile(self.configTemplate))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+'''Temp folder collection: which folders count, the opt-in policy and file ages'''
+import os
+
+import time
+
+import unittest
+
+from tests.support import ScratchTestCase, writeFile
+
+from pmt.inject import writeUtilityManifest
+
+from pmt.models import Folder
+
+from pmt.tempgc import TempPolicy, planCollection, collect
+
+from pmt.versions import VersionStore, CHUNKS
+
+DAY = 24 * 60 * 60
+
+def age(path, days):
+    '''set back the mtime of path, its ctime stays now'''
+    old = time.time() - days * DAY
+    os.utime(path, (old, old))
+
+class TempCollectionTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = Folder(os.path.join(self.root, "P1"))
+        self.temp = os.path.join(self.folder.path, "Temp")
+        self.policy = TempPolicy(maxAge=14 * DAY)
+
+    def plan(self, policy=None, now=None):
+        report = planCollection(self.root, policy or self.policy, 2, now=now)
+        return report, sorted(path for path, size, written in report.doomed)
+
+    def testNoPolicyRemovesNothing(self):
+        self.assertFalse(TempPolicy().limited)
+        self.assertFalse(TempPolicy.fromConfig(os.path.join(self.toolDir, "ProjectConfig.xml")).limited)
+        writeFile(os.path.join(self.temp, "old.tmp"), b"x")
+        report, doomed = self.plan(TempPolicy(), now=time.time() + 365 * DAY)
+        self.assertEqual(doomed, [])
+
+    def testOldFilesInPmtTempGo(self):
+        path = os.path.join(self.temp, "old.tmp")
+        writeFile(path, b"x")
+        report, doomed = self.plan(now=time.time() + 15 * DAY)
+        self.assertEqual(doomed, [path])
+        result = collect(report, 2)
+        self.assertEqual(result.removed, 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.isdir(self.temp))
+
+    def testForeignTempFoldersAreLeftAlone(self):
+        # e.g. a UE project's own Temp, or one an artist made
+        foreign = os.path.join(self.folder.path, "UE4", "P1", "Saved", "Temp", "old.tmp")
+        handmade = os.path.join(self.folder.path, "Work", "Temp", "old.tmp")
+        for path in (foreign, handmade):
+            writeFile(path, b"x")
+        report, doomed = self.plan(now=time.time() + 15 * DAY)
+        self.assertEqual([folder.path for folder in report.folders if folder.project == "P1"], [self.temp])
+        self.assertEqual(doomed, [])
+
+    def testManifestListedLayeredFolder(self):
+        # a layered folder has Tools without a config, the utility manifest vouches for it
+        layered = os.path.join(self.folder.path, "Layered")
+        os.makedirs(os.path.join(layered, "Tools"))
+        path = os.path.join(layered, "Temp", "old.tmp")
+        writeFile(path, b"x")
+        report, doomed = self.plan(now=time.time() + 15 * DAY)
+        self.assertEqual(doomed, [])
+
+        writeUtilityManifest(self.folder.path, [".", "Layered"])
+        report, doomed = self.plan(now=time.time() + 15 * DAY)
+        self.assertEqual(doomed, [path])
+
+    def testAgeCountsFromWritingIntoTemp(self):
+        # a copy keeping an old mtime was only just written into Temp
+        path = os.path.join(self.temp, "copy.ma")
+        writeFile(path, b"x")
+        age(path, 30)
+        report, doomed = self.plan()
+        self.assertEqual(doomed, [])
+
+    def testOpenedVersionIsKept(self):
+        asset = os.path.join(self.folder.path, "rig.ma")
+        writeFile(asset, b"rig")
+        age(asset, 60)
+        store = VersionStore(self.folder.path, CHUNKS)
+        store.save(asset)
+        opened = os.path.join(self.temp, "rig_v001.ma")
+        store.materialize("rig.ma", 1, opened)
+        self.assertLess(os.stat(opened).st_mtime, time.time() - 30 * DAY)
+
+        report, doomed = self.plan()
+        self.assertEqual(doomed, [])
+        self.assertTrue(os.path.exists(opened))
+
+    def testSizeLimitKeepsNewest(self):
+        old = os.path.join(self.temp, "old.tmp")
+        new = os.path.join(self.temp, "new.tmp")
+        writeFile(old, b"x" * 100)
+        time.sleep(0.05)
+        writeFile(new, b"x" * 100)
+        report, doomed = self.plan(TempPolicy(maxFolderBytes=150))
+        self.assertEqual(doomed, [old])
+
+    def testChangedSinceScanIsSkipped(self):
+        path = os.path.join(self.temp, "old.tmp")
+        writeFile(path, b"x")
+        report, doomed = self.plan(now=time.time() + 15 * DAY)
+        time.sleep(0.05)
+        writeFile(path, b"written again")
+        result = collect(report, 2)
+        self.assertEqual(result.removed, 0)
+        self.assertEqual(len(result.skipped), 1)
+        self.assertTrue(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+'''Template writes: exclusive creation and no half written assets left behind'''
+import os
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+import pmt.templates
+
+from pmt.models import createAssets
+
+from pmt.templates import TemplatePool
+
+class TemplateTests(ScratchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = os.path.join(self.scratch, "template.ma")
+        writeFile(self.template, b"template" * 100)
+        self.target = os.path.join(self.scratch, "asset.ma")
+
+    def testPooledAndBigTemplates(self):
+        for pool in (TemplatePool(), TemplatePool(maxTemplateBytes=10)):
+            target = self.target + str(pool.maxTemplateBytes)
+            pool.write(self.template, target, exclusive=True)
+            self.assertEqual(readFile(target), b"template" * 100)
+            with self.assertRaises(FileExistsError):
+                pool.write(self.template, target, exclusive=True)
+
+    def testFailedPooledWriteLeavesNothing(self):
+        pool = TemplatePool()
+        with mock.patch.object(pool, "contents", return_value="not bytes"):
+            with self.assertRaises(TypeError):
+                pool.write(self.template, self.target, exclusive=True)
+        self.assertFalse(os.path.exists(self.target))
+
+    def testFailedBigWriteLeavesNothing(self):
+        pool = TemplatePool(maxTemplateBytes=10)
+        with mock.patch.object(pmt.templates, "reflinkOpenFile", side_effect=OSError()), \
+             mock.patch.object(pmt.templates.shutil, "copyfileobj", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                pool.write(self.template, self.target, exclusive=True)
+        self.assertFalse(os.path.exists(self.target))
+
+    def testCreateAssetsAfterAFailure(self):
+        folder = os.path.join(self.root, "Assets")
+        os.makedirs(folder)
+        with mock.patch.object(pmt.templates.templatePool, "contents", return_value="not bytes"):
+            with self.assertRaises(TypeError):
+                createAssets(folder, ["rig"], "Maya", "Rig", workers=1)
+        self.assertEqual(os.listdir(folder), [])
+
+        created = createAssets(folder, ["rig"], "Maya", "Rig", workers=1)
+        self.assertEqual(created, [os.path.join(folder, "rig.ma")])
+        self.assertGreater(os.path.getsize(created[0]), 0)
+
+if __name__ == "__main__":
+    unittest.main()
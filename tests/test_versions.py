@@ -0,0 +1,164 @@
+'''Version store: saving, restoring, pruning and removing versions, with the chunk store and reflinks'''
+import os
+
+import unittest
+
+from unittest import mock
+
+from tests.support import ScratchTestCase, readFile, writeFile
+
+import pmt.versions
+
+from pmt.clone import REFLINK, supportedStrategies
+
+from pmt.versions import CHUNKS, VersionError, VersionStore, moveHistory, removeHistory
+
+class VersionTests(ScratchTestCase):
+    strategy = CHUNKS
+
+    def setUp(self):
+        super().setUp()
+        # small chunks, so a few bytes span several of them
+        patcher = mock.patch.object(pmt.versions, "CHUNK_BYTES", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.folder = os.path.join(self.scratch, "Maya")
+        self.asset = os.path.join(self.folder, "rig.ma")
+        self.store = VersionStore(self.folder, self.strategy)
+        self.mtime = 1600000000 * 10**9
+
+    def write(self, data, path=None):
+        '''write an asset with an mtime of its own, a save notices every change'''
+        path = path or self.asset
+        writeFile(path, data)
+        self.mtime += 10**9
+        os.utime(path, ns=(self.mtime, self.mtime))
+        return path
+
+    def objects(self):
+        return sorted(name for directory, dirs, files in os.walk(os.path.join(self.store.path, "objects")) for name in files)
+
+    def testSaveAndMaterialize(self):
+        self.write(b"first version")
+        first = self.store.save(self.asset, "one")
+        self.write(b"second version!")
+        second = self.store.save(self.asset)
+
+        self.assertEqual([version.number for version in self.store.versions("rig.ma")], [1, 2])
+        self.assertEqual(self.store.version("rig.ma", 1).note, "one")
+
+        target = os.path.join(self.scratch, "out.ma")
+        self.store.materialize("rig.ma", 1, target)
+        self.assertEqual(readFile(target), b"first version")
+        self.assertEqual(os.stat(target).st_mtime_ns, first.mtime)
+        self.store.materialize("rig.ma", 2, target)
+        self.assertEqual(readFile(target), b"second version!")
+        self.assertEqual(os.stat(target).st_mtime_ns, second.mtime)
+
+    def testUnknownVersion(self):
+        self.write(b"data")
+        self.store.save(self.asset)
+        with self.assertRaises(VersionError):
+            self.store.materialize("rig.ma", 7, os.path.join(self.scratch, "out.ma"))
+        with self.assertRaises(VersionError):
+            VersionStore(self.folder, "copy")
+
+    def testUnchangedSaveSharesData(self):
+        self.write(b"same contents")
+        first = self.store.save(self.asset)
+        objects = self.objects()
+
+        # the asset is neither read nor cloned again
+        with mock.patch.object(self.store, "_writeChunks", side_effect=AssertionError("read the asset")), \
+             mock.patch.object(pmt.versions, "reflinkFile", side_effect=AssertionError("cloned the asset")):
+            second = self.store.save(self.asset)
+        self.assertEqual((second.snapshot, second.chunks), (first.snapshot, first.chunks))
+        self.assertEqual(self.objects(), objects)
+
+    def testRestoreSavesTheCurrentFileFirst(self):
+        self.write(b"original")
+        self.store.save(self.asset)
+        self.write(b"edited since")
+
+        self.store.restore(self.asset, 1)
+        self.assertEqual(readFile(self.asset), b"original")
+        versions = self.store.versions("rig.ma")
+        self.assertEqual(len(versions), 2)
+        self.assertEqual(versions[1].note, "before restoring v001")
+
+        # the edit can be brought back
+        self.store.restore(self.asset, 2)
+        self.assertEqual(readFile(self.asset), b"edited since")
+        self.assertEqual(len(self.store.versions("rig.ma")), 2)
+
+    def testFailedMaterializeLeavesTargetAlone(self):
+        self.write(b"some data here")
+        self.store.save(self.asset)
+        if self.strategy == CHUNKS:
+            os.remove(os.path.join(self.store.path, "objects", self.objects()[0][:2], self.objects()[0]))
+        else:
+            os.remove(os.path.join(self.store.historyDir("rig.ma"), self.store.version("rig.ma", 1).snapshot))
+        target = self.write(b"keep me", os.path.join(self.scratch, "out.ma"))
+
+        with self.assertRaises((VersionError, OSError)):
+            self.store.materialize("rig.ma", 1, target)
+        self.assertEqual(readFile(target), b"keep me")
+        self.assertEqual(os.listdir(self.scratch).count(".pmt_part_out.ma"), 0)
+
+    def testPruneKeepsWhatNewerVersionsUse(self):
+        for data in (b"aaaabbbb", b"aaaacccc", b"aaaadddd"):
+            self.write(data)
+            self.store.save(self.asset)
+
+        freed = self.store.prune("rig.ma", 1)
+        self.assertGreater(freed, 0)
+        self.assertEqual([version.number for version in self.store.versions("rig.ma")], [3])
+
+        target = os.path.join(self.scratch, "out.ma")
+        self.store.materialize("rig.ma", 3, target)
+        self.assertEqual(readFile(target), b"aaaadddd")
+        self.assertEqual(self.store.prune("rig.ma", 1), 0)
+
+    def testRemoveKeepsOtherAssetsChunks(self):
+        self.write(b"sharedAAunique1")
+        self.store.save(self.asset)
+        other = self.write(b"sharedAAunique2", os.path.join(self.folder, "other.ma"))
+        self.store.save(other)
+
+        self.assertGreater(removeHistory(self.asset), 0)
+        self.assertEqual(self.store.versions("rig.ma"), [])
+        target = os.path.join(self.scratch, "out.ma")
+        self.store.materialize("other.ma", 1, target)
+        self.assertEqual(readFile(target), b"sharedAAunique2")
+        self.assertEqual(removeHistory(os.path.join(self.folder, "never.ma")), 0)
+
+    def testHistoryFollowsRenames(self):
+        self.write(b"data")
+        self.store.save(self.asset)
+        renamed = os.path.join(self.folder, "rig_final.ma")
+        os.rename(self.asset, renamed)
+        moveHistory(self.asset, renamed)
+
+        self.assertEqual(self.store.versions("rig.ma"), [])
+        self.assertEqual(len(self.store.versions("rig_final.ma")), 1)
+
+        # a history already there under the new name is kept
+        self.write(b"new rig")
+        self.store.save(self.asset)
+        moveHistory(self.asset, renamed)
+        self.assertEqual(len(self.store.versions("rig.ma")), 1)
+        self.assertEqual(len(self.store.versions("rig_final.ma")), 1)
+
+class ReflinkVersionTests(VersionTests):
+    strategy = REFLINK
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(self.folder)
+        self.store.ensure()
+        if REFLINK not in supportedStrategies(self.folder, self.store.path):
+            self.skipTest("no reflinks on this filesystem")
+
+if __name__ == "__main__":
+    unittest.main()